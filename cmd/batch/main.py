@@ -0,0 +1,328 @@
+"""Offline bulk inference over JSONL with the same agent stack as the server.
+
+Reads prompts from a JSONL file, routes and runs them through the agents
+configured for the server (AGENTS_FILE / OPENAI_* settings) with bounded
+concurrency, and appends one JSON result per line as rows complete. The
+output file doubles as the checkpoint: re-running with the same output
+skips rows whose id is already there, so an interrupted run resumes
+where it stopped.
+
+Input rows: {"id": "...", "message": "...", "agent": "...", "context": {...}}
+("prompt" is accepted for "message"; id defaults to the line number).
+Output rows: {"id", "agent", "response", "error", "latency_ms"}.
+
+Usage:
+    python -m cmd.batch.main prompts.jsonl results.jsonl --concurrency 32
+    python -m cmd.batch.main prompts.jsonl results.jsonl --batch-size 8 --retry-errors
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from internal.config.config import load_config
+from internal.agents.registry import AgentRegistry
+from internal.agents.capability_index import CapabilityIndex
+from internal.agents.agent_config import create_agent, default_agent_specs, load_agents_file
+from internal.agents.http_pool import HTTPClientPool
+from internal.agents.router import AgentRouter
+from internal.agents.rules import RuleEngine
+
+logger = logging.getLogger("batch")
+
+# Sentinel telling a worker that the input is exhausted
+_DONE = None
+
+
+def read_rows(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream input rows.
+
+    Args:
+        path: Input JSONL file
+
+    Yields:
+        (row id, row) for each valid line; invalid lines are logged and skipped
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {line_number}: invalid JSON ({e})")
+                continue
+            if not isinstance(row, dict) or not (row.get("message") or row.get("prompt")):
+                logger.warning(f"Skipping line {line_number}: no message")
+                continue
+            yield str(row.get("id", line_number)), row
+
+
+def load_checkpoint(path: str, retry_errors: bool = False) -> Set[str]:
+    """
+    Collect the ids already present in an output file.
+
+    Args:
+        path: Output JSONL file (may not exist yet)
+        retry_errors: Do not count rows that ended in an error
+
+    Returns:
+        Ids of completed rows
+    """
+    completed: Set[str] = set()
+    if not Path(path).exists():
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by an interrupted run
+                continue
+            if retry_errors and row.get("error"):
+                continue
+            completed.add(str(row.get("id")))
+    return completed
+
+
+class ResultWriter:
+    """Append results to the output file, flushing every row."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a+", encoding="utf-8")
+        # Terminate a line cut off by an interrupted run
+        self._file.seek(0, 2)
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Progress:
+    """Throughput and progress counters of a run."""
+
+    def __init__(self, total: Optional[int], skipped: int):
+        """
+        Args:
+            total: Rows to run in this invocation (None if not counted)
+            skipped: Rows already completed by an earlier run
+        """
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.errors = 0
+        self.response_chars = 0
+        self.latencies: List[float] = []
+        self.started_at = time.perf_counter()
+
+    def record(self, latency: float, response: str, failed: bool) -> None:
+        self.done += 1
+        self.errors += int(failed)
+        self.response_chars += len(response)
+        self.latencies.append(latency)
+
+    def report(self) -> Dict[str, Any]:
+        """Current progress as a dictionary."""
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        ordered = sorted(self.latencies)
+        report = {
+            "done": self.done,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 1),
+            "rows_per_second": round(rate, 2),
+            "chars_per_second": round(self.response_chars / elapsed, 1) if elapsed > 0 else 0.0,
+            "latency_p50_ms": round(ordered[len(ordered) // 2] * 1000.0, 1) if ordered else None,
+            "latency_p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000.0, 1) if ordered else None,
+        }
+        if self.total is not None:
+            report["total"] = self.total
+            remaining = self.total - self.done
+            report["eta_s"] = round(remaining / rate, 1) if rate > 0 else None
+        return report
+
+    def log(self) -> None:
+        report = self.report()
+        total = f"/{report['total']}" if "total" in report else ""
+        eta = f", eta {report['eta_s']}s" if report.get("eta_s") is not None else ""
+        logger.info(f"{report['done']}{total} rows ({report['errors']} errors), "
+                    f"{report['rows_per_second']} rows/s, p50 {report['latency_p50_ms']}ms{eta}")
+
+
+def build_router(config) -> Tuple[AgentRouter, HTTPClientPool]:
+    """
+    Register the configured agents, as the server does.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        Router over the registered agents and the shared HTTP pool
+    """
+    agents_document = load_agents_file(config.agents_file) if config.agents_file else {}
+    capability_index = CapabilityIndex() if config.routing_strategy == "semantic" else None
+    registry = AgentRegistry(capability_index, default_agent=config.default_agent)
+    router = AgentRouter(registry, strategy=config.routing_strategy,
+                         semantic_min_score=config.semantic_routing_min_score,
+                         rules=RuleEngine.from_document(agents_document))
+    http_pool = HTTPClientPool(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections,
+        keepalive_expiry=config.http_keepalive_expiry_seconds,
+        max_per_host=config.http_max_connections_per_host,
+        http2=config.http2,
+        connect_timeout=config.http_connect_timeout_seconds
+    )
+    shared = {"http_client": http_pool.client}
+    for spec in agents_document.get("agents") or default_agent_specs():
+        registry.register(create_agent(spec, config, shared, lazy=False))
+        if spec.default and not registry.default_agent:
+            registry.default_agent = spec.name
+    return router, http_pool
+
+
+async def _run_row(router: AgentRouter, row_id: str, row: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Route and run one row; failures are reported in the result, not raised."""
+    message = row.get("message") or row.get("prompt")
+    context = dict(row.get("context") or {})
+    started = time.perf_counter()
+    agent_name, response, error = "", "", None
+    try:
+        agent = await router.route(message, context, row.get("agent"))
+        if agent is None:
+            error = "No available agent found"
+        else:
+            agent_name = agent.metadata.name
+            response = await asyncio.wait_for(agent.process(message, context), timeout or None)
+            # Agents report failures as "Error: ..." responses
+            if response.startswith("Error:"):
+                error, response = response, ""
+    except asyncio.TimeoutError:
+        error = f"Timed out after {timeout}s"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "id": row_id,
+        "agent": agent_name,
+        "response": response,
+        "error": error,
+        "latency_ms": round((time.perf_counter() - started) * 1000.0, 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run all pending rows and return the final progress report."""
+    config = load_config()
+    if args.batch_size is not None:
+        config.batch_max_size = args.batch_size
+    if args.batch_wait_ms is not None:
+        config.batch_max_wait_ms = args.batch_wait_ms
+
+    completed = load_checkpoint(args.output, args.retry_errors)
+    total = None
+    if not args.no_count:
+        total = sum(1 for row_id, _ in read_rows(args.input) if row_id not in completed)
+    if completed:
+        logger.info(f"Resuming: {len(completed)} rows already in {args.output}")
+
+    router, http_pool = build_router(config)
+    progress = Progress(total, len(completed))
+    writer = ResultWriter(args.output)
+    # Bounded, so the input is read only as fast as rows are processed
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # In-flight rows finish and are written; the rest is picked up on resume
+        loop.add_signal_handler(sig, stop.set)
+
+    async def feed() -> None:
+        seen: Set[str] = set()
+        for row_id, row in read_rows(args.input):
+            if stop.is_set():
+                break
+            if row_id in completed or row_id in seen:
+                continue
+            seen.add(row_id)
+            await queue.put((row_id, row))
+        for _ in range(args.concurrency):
+            await queue.put(_DONE)
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is _DONE or stop.is_set():
+                return
+            result = await _run_row(router, *item, args.timeout)
+            writer.write(result)
+            progress.record(result["latency_ms"] / 1000.0, result["response"], result["error"] is not None)
+
+    async def report_progress() -> None:
+        while True:
+            await asyncio.sleep(args.progress_interval)
+            progress.log()
+
+    feeder = asyncio.ensure_future(feed())
+    reporter = asyncio.ensure_future(report_progress())
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        feeder.cancel()
+        reporter.cancel()
+        writer.close()
+        await http_pool.aclose()
+    if stop.is_set():
+        logger.warning("Interrupted; run again with the same output file to resume")
+    progress.log()
+    return {**progress.report(), "interrupted": stop.is_set()}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through the configured agents")
+    parser.add_argument("input", help="Input JSONL file")
+    parser.add_argument("output", help="Output JSONL file, also used as the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Rows in flight at once")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Micro-batch size for LLM calls (default: BATCH_MAX_SIZE)")
+    parser.add_argument("--batch-wait-ms", type=float, default=None,
+                        help="Maximum time a call waits for its batch to fill (default: BATCH_MAX_WAIT_MS)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-row timeout in seconds (0 = none)")
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run rows whose earlier result was an error")
+    parser.add_argument("--no-count", action="store_true", help="Do not pre-count the input (no total or ETA)")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the agent stack (progress is always shown)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper()),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
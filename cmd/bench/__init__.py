@@ -0,0 +1,2 @@
+# bench package
+
@@ -0,0 +1,207 @@
+"""Local stand-in for an OpenAI-compatible chat completions server."""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the quick brown fox jumps over lazy dog while assistant answers "
+    "questions about weather code travel music history science"
+).split()
+
+
+class FakeLLMServer:
+    """
+    Minimal HTTP/1.1 server implementing /v1/chat/completions and /v1/models.
+
+    Responses are generated at a fixed token rate after a configurable
+    time-to-first-token, so benchmark results reflect this service's overhead
+    rather than a real model's speed. Supports keep-alive and SSE streaming.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 0.0,
+        tokens_per_second: float = 200.0,
+        completion_tokens: int = 64
+    ):
+        """
+        Initialize fake LLM server.
+
+        Args:
+            host: Listen host
+            port: Listen port (0 picks a free port)
+            latency_ms: Delay before the first token (milliseconds)
+            jitter_ms: Uniform random extra delay added to latency_ms
+            tokens_per_second: Generation rate (<= 0 means instant)
+            completion_tokens: Tokens per response unless the request sets max_tokens
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI-compatible base URL of the running server."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Fake LLM listening on {self.base_url}")
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                await self._dispatch(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown; ending quietly avoids noisy callbacks on Python 3.11
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], body
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if method == "GET" and path.endswith("/models"):
+            await self._send_json(writer, 200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        elif method == "POST" and path.endswith("/chat/completions"):
+            self.requests += 1
+            payload = json.loads(body or b"{}")
+            if payload.get("stream"):
+                await self._stream_completion(writer, payload)
+            else:
+                await self._completion(writer, payload)
+        else:
+            await self._send_json(writer, 404, {"error": {"message": f"Not found: {path}"}})
+
+    def _tokens(self, payload: Dict[str, Any]) -> list:
+        count = payload.get("max_tokens") or payload.get("max_completion_tokens") or self.completion_tokens
+        return [f"{random.choice(_WORDS)} " for _ in range(int(count))]
+
+    async def _first_token_delay(self) -> None:
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        await asyncio.sleep(delay / 1000.0)
+
+    async def _completion(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        tokens = self._tokens(payload)
+        await self._first_token_delay()
+        if self.tokens_per_second > 0:
+            await asyncio.sleep(len(tokens) / self.tokens_per_second)
+        await self._send_json(writer, 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        })
+
+    async def _stream_completion(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+        )
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        base = {"id": completion_id, "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": payload.get("model", "fake")}
+        await self._first_token_delay()
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, token in enumerate(self._tokens(payload)):
+            if i and interval:
+                await asyncio.sleep(interval)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            await self._send_event(writer, {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        await self._send_event(writer, {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        await self._send_chunk(writer, b"data: [DONE]\n\n")
+        await self._send_chunk(writer, b"")
+
+    async def _send_event(self, writer: asyncio.StreamWriter, event: Dict[str, Any]) -> None:
+        await self._send_chunk(writer, f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+    @staticmethod
+    async def _send_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _send_json(writer: asyncio.StreamWriter, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        reason = "OK" if status == 200 else "Not Found"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode("ascii") + data
+        )
+        await writer.drain()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = FakeLLMServer(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.tokens_per_second, args.completion_tokens
+    )
+    await server.start()
+    print(f"Fake LLM serving at {server.base_url}", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Generation rate")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Tokens per response")
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,293 @@
+"""Load generator and latency benchmark for the gRPC AI service.
+
+Starts a fake OpenAI-compatible backend and the gRPC server from
+cmd/server/main.py, drives Process / ProcessStream / ListAgents at a given
+concurrency and reports throughput, latency percentiles, time to first
+chunk and server memory as JSON.
+
+Usage:
+    python -m cmd.bench.main --rpc process --concurrency 32 --requests 2000
+    python -m cmd.bench.main --rpc stream --duration 30 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import grpc
+
+try:
+    from pb.ai.v1 import ai_pb2
+    from pb.ai.v1 import ai_pb2_grpc
+except ImportError as e:
+    print(f"Error: Could not import generated protobuf code: {e}")
+    print("Please ensure assistant_ai_api is installed:")
+    print("  pip install git+https://github.com/sunshine-walker-93/assistant_ai_api.git#subdirectory=python")
+    sys.exit(1)
+
+from cmd.bench.fake_llm import FakeLLMServer
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _summarize_ms(values: List[float]) -> Dict[str, Optional[float]]:
+    """Summarize durations (seconds) as milliseconds."""
+    ordered = sorted(values)
+    to_ms = lambda v: round(v * 1000.0, 3) if v is not None else None
+    return {
+        "count": len(ordered),
+        "mean": to_ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50": to_ms(_percentile(ordered, 50)),
+        "p95": to_ms(_percentile(ordered, 95)),
+        "p99": to_ms(_percentile(ordered, 99)),
+        "max": to_ms(ordered[-1]) if ordered else None,
+    }
+
+
+def _read_rss_kb(pid: int) -> Dict[str, int]:
+    """Read current and peak resident memory of a process (Linux only)."""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+class BenchResult:
+    """Per-RPC measurements."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_chunk: List[float] = []
+        self.chunks = 0
+        self.response_chars = 0
+        self.errors: Dict[str, int] = {}
+
+    def error(self, code: str) -> None:
+        self.errors[code] = self.errors.get(code, 0) + 1
+
+
+async def _call(stub, rpc: str, index: int, args: argparse.Namespace, result: BenchResult) -> None:
+    message = args.prompt if args.same_prompt else f"{args.prompt} #{index}"
+    request = ai_pb2.ProcessRequest(
+        user_id=f"bench-{index % args.users}",
+        message=message,
+        session_id="",
+        agent_name=args.agent or "",
+        context={}
+    )
+    started = time.perf_counter()
+    try:
+        if rpc == "process":
+            response = await stub.Process(request, timeout=args.timeout)
+            result.response_chars += len(response.response)
+        elif rpc == "stream":
+            first = None
+            async for chunk in stub.ProcessStream(request, timeout=args.timeout):
+                if first is None:
+                    first = time.perf_counter() - started
+                    result.first_chunk.append(first)
+                result.chunks += 1
+                result.response_chars += len(chunk.response)
+        else:
+            await stub.ListAgents(ai_pb2.ListAgentsRequest(), timeout=args.timeout)
+    except grpc.aio.AioRpcError as e:
+        result.error(e.code().name)
+        return
+    result.latencies.append(time.perf_counter() - started)
+
+
+async def _drive(addr: str, rpc: str, args: argparse.Namespace, server_pid: Optional[int]) -> Dict[str, Any]:
+    """Run one RPC type at the configured concurrency."""
+    result = BenchResult()
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    peak_rss = 0
+
+    async with grpc.aio.insecure_channel(addr) as channel:
+        stub = ai_pb2_grpc.AIServiceStub(channel)
+
+        async def worker():
+            while True:
+                index = next(counter)
+                if deadline is None and index >= args.requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                await _call(stub, rpc, index, args, result)
+
+        # Warm up connections and lazy initialization outside the measurement
+        for i in range(min(args.warmup, 1000)):
+            await _call(stub, rpc, -1 - i, args, BenchResult())
+
+        started = time.perf_counter()
+        workers = [asyncio.ensure_future(worker()) for _ in range(args.concurrency)]
+        while not all(w.done() for w in workers):
+            if server_pid is not None:
+                peak_rss = max(peak_rss, _read_rss_kb(server_pid).get("VmRSS", 0))
+            await asyncio.wait(workers, timeout=0.25)
+        elapsed = time.perf_counter() - started
+        for w in workers:
+            w.result()
+
+    completed = len(result.latencies)
+    report = {
+        "rpc": rpc,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "completed": completed,
+        "errors": result.errors,
+        "rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": _summarize_ms(result.latencies),
+    }
+    if rpc == "stream":
+        report["time_to_first_chunk_ms"] = _summarize_ms(result.first_chunk)
+        report["chunks_per_response"] = round(result.chunks / completed, 2) if completed else 0.0
+    if rpc in ("process", "stream"):
+        report["chars_per_second"] = round(result.response_chars / elapsed, 1) if elapsed > 0 else 0.0
+    if server_pid is not None:
+        report["server_peak_rss_kb"] = peak_rss
+    return report
+
+
+async def _wait_ready(addr: str, timeout: float) -> None:
+    async with grpc.aio.insecure_channel(addr) as channel:
+        await asyncio.wait_for(channel.channel_ready(), timeout)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start backends (unless --server-addr is given), run the benchmark and build the report."""
+    fake_llm = None
+    server = None
+    addr = args.server_addr
+    try:
+        if not addr:
+            fake_llm = FakeLLMServer(
+                latency_ms=args.llm_latency_ms,
+                jitter_ms=args.llm_jitter_ms,
+                tokens_per_second=args.llm_tokens_per_second,
+                completion_tokens=args.llm_tokens
+            )
+            await fake_llm.start()
+
+            addr = f"127.0.0.1:{_free_port()}"
+            env = {
+                **os.environ,
+                "GRPC_ADDR": addr,
+                "OPENAI_BASE_URL": fake_llm.base_url,
+                "OPENAI_API_KEY": "not-needed",
+                "OPENAI_MODEL": "fake",
+                "LOG_LEVEL": args.server_log_level,
+            }
+            server = subprocess.Popen(
+                [sys.executable, "-m", "cmd.server.main"],
+                cwd=str(project_root),
+                env=env,
+                stdout=subprocess.DEVNULL if not args.server_output else None,
+                stderr=subprocess.DEVNULL if not args.server_output else None,
+            )
+            startup_started = time.perf_counter()
+            await _wait_ready(addr, args.startup_timeout)
+            startup_s = time.perf_counter() - startup_started
+        else:
+            startup_s = None
+
+        server_pid = server.pid if server is not None else None
+        runs = [await _drive(addr, rpc, args, server_pid) for rpc in args.rpc]
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "host": platform.node(),
+            "config": {
+                "requests": args.requests,
+                "duration_s": args.duration,
+                "concurrency": args.concurrency,
+                "same_prompt": args.same_prompt,
+                "llm_latency_ms": args.llm_latency_ms,
+                "llm_jitter_ms": args.llm_jitter_ms,
+                "llm_tokens_per_second": args.llm_tokens_per_second,
+                "llm_tokens": args.llm_tokens,
+            },
+            "server_startup_s": round(startup_s, 3) if startup_s is not None else None,
+            "server_memory_kb": _read_rss_kb(server_pid) if server_pid is not None else None,
+            "runs": runs,
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if fake_llm is not None:
+            await fake_llm.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the assistant_ai gRPC service")
+    parser.add_argument("--rpc", nargs="+", choices=["process", "stream", "list"], default=["process", "stream"],
+                        help="RPCs to benchmark, run one after another")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight RPCs")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per RPC type (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds per RPC type instead of a request count")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each run")
+    parser.add_argument("--users", type=int, default=16, help="Number of distinct user_ids to spread requests over")
+    parser.add_argument("--prompt", default="Tell me something interesting", help="Prompt text")
+    parser.add_argument("--same-prompt", action="store_true",
+                        help="Send identical prompts (exercises caching and coalescing)")
+    parser.add_argument("--agent", default="", help="Explicit agent_name")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-RPC deadline in seconds")
+    parser.add_argument("--server-addr", default="", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--server-log-level", default="WARNING")
+    parser.add_argument("--server-output", action="store_true", help="Show server stdout/stderr")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Fake backend time to first token")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0, help="Fake backend random extra latency")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0, help="Fake backend generation rate")
+    parser.add_argument("--llm-tokens", type=int, default=64, help="Fake backend tokens per response")
+    parser.add_argument("--output", default="", help="Write the JSON report to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"Report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
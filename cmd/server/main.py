@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+import signal
 import sys
 import os
 from pathlib import Path
@@ -16,15 +17,20 @@ else:
 
 sys.path.insert(0, str(project_root))
 
-import grpc
-from concurrent import futures
-from grpc_reflection.v1alpha import reflection
+# Imported first so startup timing covers everything below
+from internal.metrics.startup import STARTUP
+
+with STARTUP.phase("import grpc"):
+    import grpc
+    from concurrent import futures
+    from grpc_reflection.v1alpha import reflection
 
 # Import generated protobuf code from installed package
 # assistant_ai_api is installed via pip from Git repository
 try:
-    from pb.ai.v1 import ai_pb2_grpc
-    from pb.ai.v1 import ai_pb2
+    with STARTUP.phase("import pb.ai.v1"):
+        from pb.ai.v1 import ai_pb2_grpc
+        from pb.ai.v1 import ai_pb2
 except ImportError as e:
     print(f"Error: Could not import generated protobuf code: {e}")
     print("Please ensure assistant_ai_api is installed:")
@@ -33,12 +39,27 @@ except ImportError as e:
     traceback.print_exc()
     sys.exit(1)
 
-from internal.config.config import load_config
-from internal.agents.registry import AgentRegistry
-from internal.agents.router import AgentRouter
-from internal.agents.langchain_agent import LangChainAgent
-from internal.graph.orchestrator import Orchestrator
-from internal.service.ai_service import AIServiceServicer
+# Heavy LLM libraries (langchain_openai, langgraph) are imported on first use
+with STARTUP.phase("import internal"):
+    from internal.config.config import load_config
+    from internal.agents.registry import AgentRegistry
+    from internal.agents.capability_index import CapabilityIndex
+    from internal.agents.agent_config import create_agent, default_agent_specs, load_agents_file
+    from internal.agents.http_pool import HTTPClientPool
+    from internal.agents.router import AgentRouter
+    from internal.agents.rules import RuleEngine
+    from internal.agents.singleflight import SingleFlight
+    from internal.agents.warmup import ModelWarmer
+    from internal.graph.orchestrator import Orchestrator
+    from internal.service.ai_service import AIServiceServicer
+    from internal.service.admission import AdmissionController
+    from internal.service.rate_limit import RateLimiter, create_rate_limiter
+    from internal.service.stream_coalescer import StreamCoalescer
+    from internal.service.stream_buffer import StreamBufferStore
+    from internal.memory.session_store import SessionStore, create_session_store
+    from internal.metrics.registry import REGISTRY
+    from internal.metrics.server import MetricsServer
+    from cmd.server.supervisor import Supervisor
 
 
 def setup_logging(log_level: str = "INFO"):
@@ -49,14 +70,25 @@ def setup_logging(log_level: str = "INFO"):
     )
 
 
-def create_server(registry: AgentRegistry, router: AgentRouter, orchestrator: Orchestrator):
+def create_server(registry: AgentRegistry, router: AgentRouter, orchestrator: Orchestrator,
+                  singleflight: SingleFlight = None, admission: AdmissionController = None,
+                  session_store: SessionStore = None, stream_coalescer: StreamCoalescer = None,
+                  rate_limiter: RateLimiter = None, stream_buffers: StreamBufferStore = None,
+                  max_workers: int = 10, max_concurrent_rpcs: int = None, reuse_port: bool = False):
     """Create and configure gRPC server."""
     from pb.ai.v1 import ai_pb2_grpc
     
-    server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Workers of the multi-process mode all bind the same port
+    options = [("grpc.so_reuseport", 1)] if reuse_port else None
+    server = grpc.aio.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        options=options,
+        maximum_concurrent_rpcs=max_concurrent_rpcs
+    )
     
     # Add servicer
-    servicer = AIServiceServicer(registry, router, orchestrator)
+    servicer = AIServiceServicer(registry, router, orchestrator, singleflight, admission, session_store,
+                                 stream_coalescer, rate_limiter, stream_buffers)
     ai_pb2_grpc.add_AIServiceServicer_to_server(servicer, server)
     
     # Enable gRPC reflection for dynamic type discovery
@@ -69,63 +101,297 @@ def create_server(registry: AgentRegistry, router: AgentRouter, orchestrator: Or
     return server
 
 
-async def serve():
-    """Start the gRPC server."""
+async def serve(worker_id: int = None, ready_port=None):
+    """
+    Start the gRPC server.
+    
+    Args:
+        worker_id: Worker number when running under the supervisor (None = single process)
+        ready_port: Shared value set to the worker's local metrics port once it serves
+    """
     config = load_config()
     setup_logging(config.log_level)
     logger = logging.getLogger(__name__)
+    if worker_id is not None:
+        logger.info(f"Worker {worker_id} starting (pid {os.getpid()})")
+    
+    # Agents are declared in AGENTS_FILE, or a single LangChain agent is configured through OPENAI_*
+    # (OpenAI API or local models such as Ollama/LocalAI). The file may also hold routing rules.
+    agents_document = load_agents_file(config.agents_file) if config.agents_file else {}
     
     # Initialize components
-    registry = AgentRegistry()
-    router = AgentRouter(registry)
-    orchestrator = Orchestrator()
+    capability_index = CapabilityIndex() if config.routing_strategy == "semantic" else None
+    registry = AgentRegistry(capability_index, default_agent=config.default_agent)
+    router = AgentRouter(
+        registry,
+        strategy=config.routing_strategy,
+        semantic_min_score=config.semantic_routing_min_score,
+        rules=RuleEngine.from_document(agents_document)
+    )
+    orchestrator = Orchestrator(router, enabled=config.enable_orchestration)
     
     # Register agents
-    # LangChain agent with OpenAI or local model (if configured)
-    # Supports both OpenAI API and local models (Ollama, LocalAI, etc.)
-    # Note: We always try to register LangChainAgent, but it will be inactive if not properly configured
-    try:
-        # Log configuration values (mask API key for security)
-        api_key_display = "***" if config.openai_api_key else "None"
-        base_url_display = config.openai_base_url if config.openai_base_url else "None"
-        logger.info(f"LangChainAgent configuration - OPENAI_API_KEY: {api_key_display}, OPENAI_BASE_URL: {base_url_display}, MODEL: {config.openai_model}")
-        
-        langchain_agent = LangChainAgent(
-            api_key=config.openai_api_key,
-            base_url=config.openai_base_url,
-            model_name=config.openai_model,
-            temperature=config.openai_temperature
-        )
-        registry.register(langchain_agent)
-        
-        # Log registration status
-        if langchain_agent.metadata.is_active:
-            if config.openai_base_url:
-                logger.info(f"Registered LangChainAgent (ACTIVE) with local model: {config.openai_model} at {config.openai_base_url}")
-            else:
-                logger.info(f"Registered LangChainAgent (ACTIVE) with OpenAI model: {config.openai_model}")
+    # An agent that is not properly configured is inactive.
+    agent_specs = agents_document.get("agents") or default_agent_specs()
+    # One HTTP client for all agents, so connections to the same model server are reused
+    http_pool = HTTPClientPool(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections,
+        keepalive_expiry=config.http_keepalive_expiry_seconds,
+        max_per_host=config.http_max_connections_per_host,
+        http2=config.http2,
+        connect_timeout=config.http_connect_timeout_seconds
+    )
+    REGISTRY.register_collector("assistant_http_pool", http_pool.stats)
+    shared = {"http_client": http_pool.client}
+    
+    def register_agent_collectors(agent):
+        labels = {"agent": agent.metadata.name}
+        if getattr(agent, "tiers", None):
+            REGISTRY.register_collector("assistant_cascade", agent.stats, labels)
+            for tier in agent.tiers:
+                register_agent_collectors(tier)
+        if getattr(agent, "cache", None) is not None:
+            REGISTRY.register_collector("assistant_response_cache", agent.cache.stats, labels)
+        if getattr(agent, "batcher", None) is not None:
+            REGISTRY.register_collector("assistant_batcher", agent.batcher.stats, labels)
+        if getattr(agent, "compactor", None) is not None:
+            REGISTRY.register_collector("assistant_history_compaction", agent.compactor.stats, labels)
+        if getattr(agent, "pool", None) is not None:
+            pool = agent.pool
+            REGISTRY.register_collector("assistant_backend_pool", lambda: {
+                "backends": len(pool.backends),
+                "ejected": sum(1 for b in pool.backends if b.ejected),
+                "outstanding": sum(b.outstanding for b in pool.backends),
+            }, labels)
+        if getattr(agent, "hedge_policy", None) is not None:
+            REGISTRY.register_collector("assistant_hedging", agent.hedge_policy.stats, labels)
+        if getattr(agent, "breaker", None) is not None:
+            REGISTRY.register_collector("assistant_circuit_breaker", agent.breaker.stats, labels)
+    
+    def on_agent_loaded(agent, seconds):
+        STARTUP.record(f"load agent {agent.metadata.name}", seconds)
+        register_agent_collectors(agent)
+        if agent.metadata.is_active:
+            logger.info(f"Agent '{agent.metadata.name}' is ACTIVE")
         else:
-            logger.warning(f"Registered LangChainAgent (INACTIVE) - Please configure OPENAI_API_KEY (for OpenAI API) or OPENAI_BASE_URL (for local models)")
-            logger.warning(f"  Current values - OPENAI_API_KEY: {'set' if config.openai_api_key else 'not set'}, OPENAI_BASE_URL: {'set' if config.openai_base_url else 'not set'}")
-    except Exception as e:
-        logger.error(f"Failed to register LangChainAgent: {e}", exc_info=True)
+            logger.warning(f"Agent '{agent.metadata.name}' is INACTIVE - Please configure OPENAI_API_KEY "
+                           f"(for OpenAI API) or OPENAI_BASE_URL (for local models)")
+    
+    for spec in agent_specs:
+        try:
+            # Lazy agents are built on first use or by the background load after the port is bound
+            registry.register(create_agent(spec, config, shared, lazy=config.lazy_agents, on_load=on_agent_loaded))
+            if spec.default and not registry.default_agent:
+                registry.default_agent = spec.name
+        except Exception as e:
+            logger.error(f"Failed to register agent '{spec.name}': {e}", exc_info=True)
+    
+    if router.rules is not None:
+        REGISTRY.register_collector("assistant_routing_rules", router.rules.stats)
+        for rule in router.rules.rules:
+            if registry.get(rule.agent) is None:
+                logger.warning(f"Routing rule '{rule.name}' targets unknown agent '{rule.agent}'")
+            REGISTRY.register_collector("assistant_routing_rule", lambda name=rule.name: {
+                "hits": router.rules.hits[name],
+            }, {"rule": rule.name, "agent": rule.agent})
+    
+    # Request coalescing for identical in-flight prompts
+    singleflight = SingleFlight() if config.enable_request_coalescing else None
+    if singleflight is not None:
+        REGISTRY.register_collector("assistant_singleflight", singleflight.stats)
+    
+    # Admission control for agent calls
+    admission = None
+    # Limits from the agents file, overridden by AGENT_CONCURRENCY_LIMITS
+    agent_limits = {spec.name: spec.max_concurrency for spec in agent_specs if spec.max_concurrency > 0}
+    agent_limits.update(config.get_agent_concurrency_limits())
+    if config.max_concurrent_requests > 0 or agent_limits:
+        admission = AdmissionController(
+            max_concurrency=config.max_concurrent_requests,
+            agent_limits=agent_limits,
+            max_queue_size=config.admission_queue_size,
+            max_queue_wait=config.admission_queue_timeout_seconds
+        )
+        REGISTRY.register_collector("assistant_admission", admission.stats)
+        logger.info(f"Admission control enabled (max_concurrency={config.max_concurrent_requests}, "
+                    f"agent_limits={agent_limits}, queue_size={config.admission_queue_size})")
+    
+    # Per-user quotas
+    rate_limiter = create_rate_limiter(
+        config.rate_limit_backend,
+        requests_per_minute=config.rate_limit_requests_per_minute,
+        tokens_per_minute=config.rate_limit_tokens_per_minute,
+        request_burst=config.rate_limit_request_burst,
+        token_burst=config.rate_limit_token_burst,
+        completion_tokens_estimate=config.rate_limit_completion_tokens_estimate,
+        sqlite_path=config.rate_limit_sqlite_path
+    )
+    if rate_limiter is not None:
+        REGISTRY.register_collector("assistant_rate_limit", rate_limiter.stats)
+        logger.info(f"Rate limiting enabled (requests_per_minute={config.rate_limit_requests_per_minute}, "
+                    f"tokens_per_minute={config.rate_limit_tokens_per_minute}, "
+                    f"backend={config.rate_limit_backend})")
+    
+    # Server-side session history
+    session_store = create_session_store(
+        config.session_store,
+        ttl_seconds=config.session_ttl_seconds,
+        max_sessions=config.session_max_sessions,
+        max_messages=config.session_max_messages,
+        sqlite_path=config.session_sqlite_path
+    )
+    if session_store is not None:
+        logger.info(f"Session store enabled: {config.session_store}")
+    
+    # Stream chunk coalescing
+    stream_coalescer = None
+    if config.stream_coalesce_max_bytes > 0:
+        stream_coalescer = StreamCoalescer(
+            max_bytes=config.stream_coalesce_max_bytes,
+            max_delay_ms=config.stream_coalesce_max_delay_ms
+        )
+        REGISTRY.register_collector("assistant_stream_coalescing", stream_coalescer.stats)
+        logger.info(f"Stream coalescing enabled (max_bytes={config.stream_coalesce_max_bytes}, "
+                    f"max_delay_ms={config.stream_coalesce_max_delay_ms})")
+    
+    # Resumable streams
+    stream_buffers = None
+    if config.stream_resume_enabled:
+        stream_buffers = StreamBufferStore(
+            max_chunks=config.stream_resume_max_chunks,
+            max_bytes=config.stream_resume_max_bytes,
+            ttl_seconds=config.stream_resume_ttl_seconds,
+            detach_grace=config.stream_resume_grace_seconds
+        )
+        REGISTRY.register_collector("assistant_stream_resume", stream_buffers.stats)
+        logger.info(f"Resumable streams enabled (max_chunks={config.stream_resume_max_chunks}, "
+                    f"grace_seconds={config.stream_resume_grace_seconds})")
     
     # Create and start server
-    server = create_server(registry, router, orchestrator)
+    server = create_server(
+        registry, router, orchestrator, singleflight, admission, session_store, stream_coalescer, rate_limiter,
+        stream_buffers, max_workers=config.grpc_max_workers,
+        max_concurrent_rpcs=config.grpc_max_concurrent_rpcs,
+        reuse_port=worker_id is not None
+    )
     
     listen_addr = config.grpc_addr
     server.add_insecure_port(listen_addr)
     
+    warmer = None
+    keepalive = None
+    if config.model_warmup_enabled:
+        warmer = ModelWarmer(
+            keepalive_interval=config.model_keepalive_seconds,
+            warmup_timeout=config.model_warmup_timeout_seconds
+        )
+        REGISTRY.register_collector("assistant_model_warmup", warmer.stats)
+    
+    async def load_agents():
+        nonlocal keepalive
+        if config.http_prewarm_connections > 0:
+            endpoints = [url for spec in agent_specs for url in spec.endpoints(config)]
+            with STARTUP.phase("pre-connect model servers"):
+                await http_pool.warm(endpoints, config.http_prewarm_connections)
+        if config.lazy_agents and config.preload_agents:
+            await registry.load_lazy_agents()
+            STARTUP.mark("agents_loaded")
+        if warmer is not None:
+            with STARTUP.phase("warm models"):
+                await warmer.warm([registry.get(agent.name) for agent in registry.list_agents()])
+            keepalive = asyncio.ensure_future(warmer.keepalive())
+        STARTUP.log_report()
+    
+    loader = None
+    reporter = None
+    # The kernel spreads connections over every worker bound to the port, readiness
+    # or not, so a worker binds only once warmup has finished or timed out; a single
+    # process binds early and reports readiness through /readyz
+    load_before_listening = warmer is not None and worker_id is not None
+    if load_before_listening:
+        await load_agents()
+    
     logger.info(f"Starting gRPC server on {listen_addr}")
     await server.start()
+    logger.info(f"gRPC server listening {STARTUP.mark('listening') * 1000:.0f}ms after process start")
+    
+    if not load_before_listening:
+        # Runs after the port is bound so it does not delay startup
+        loader = asyncio.ensure_future(load_agents())
+    REGISTRY.register_collector("assistant_startup", STARTUP.stats)
+    
+    metrics_server = None
+    if worker_id is not None:
+        # The supervisor serves METRICS_ADDR and scrapes each worker locally
+        metrics_server = MetricsServer("127.0.0.1:0", REGISTRY)
+    elif config.metrics_addr or config.health_addr:
+        metrics_server = MetricsServer(config.metrics_addr or config.health_addr, REGISTRY)
+    if metrics_server is not None:
+        metrics_server.add_route("/startup", STARTUP.http_handler)
+        if warmer is not None:
+            metrics_server.add_route("/readyz", warmer.readyz_handler)
+        if rate_limiter is not None:
+            metrics_server.add_route("/usage", rate_limiter.http_handler)
+        await metrics_server.start()
+        if ready_port is not None:
+            port = metrics_server.port
+            if warmer is None:
+                ready_port.value = port
+            else:
+                # The supervisor counts a worker as ready once its port is reported
+                async def report_ready():
+                    await warmer.ready.wait()
+                    ready_port.value = port
+                reporter = asyncio.ensure_future(report_ready())
+    
+    # SIGTERM (sent by the supervisor or the container runtime) drains in-flight RPCs
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
     
     try:
-        await server.wait_for_termination()
-    except KeyboardInterrupt:
+        await stop.wait()
         logger.info("Shutting down server...")
-        await server.stop(grace=5)
+        await server.stop(grace=config.shutdown_grace_seconds)
+    finally:
+        if loader is not None:
+            loader.cancel()
+        if keepalive is not None:
+            keepalive.cancel()
+        if reporter is not None:
+            reporter.cancel()
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if session_store is not None:
+            await session_store.close()
+        if rate_limiter is not None:
+            await rate_limiter.close()
+        await http_pool.aclose()
+
+
+def run_worker(worker_id: int, ready_port) -> None:
+    """Entry point of a supervised worker process."""
+    asyncio.run(serve(worker_id, ready_port))
+
+
+def main():
+    """Run a single server, or a supervisor with WORKERS processes."""
+    config = load_config()
+    if config.workers <= 1:
+        asyncio.run(serve())
+        return
+    setup_logging(config.log_level)
+    supervisor = Supervisor(
+        run_worker,
+        workers=config.workers,
+        metrics_addr=config.metrics_addr or config.health_addr,
+        shutdown_timeout=config.shutdown_grace_seconds + 5.0
+    )
+    asyncio.run(supervisor.run())
 
 
 if __name__ == "__main__":
-    asyncio.run(serve())
+    main()
 
@@ -0,0 +1,227 @@
+"""Multi-process supervisor: N gRPC workers sharing one port via SO_REUSEPORT."""
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+from internal.metrics.aggregate import merge_expositions
+from internal.metrics.server import MetricsServer
+
+logger = logging.getLogger(__name__)
+
+
+class _Worker:
+    """One worker process and its readiness cell."""
+
+    def __init__(self, slot: int, process: multiprocessing.Process, ready_port):
+        self.slot = slot
+        self.process = process
+        # 0 until the worker serves; then the port of its local metrics endpoint
+        self.ready_port = ready_port
+        self.started_at = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.process.is_alive() and self.ready_port.value > 0
+
+
+class Supervisor:
+    """
+    Start and keep alive N worker processes.
+
+    Every worker binds the same gRPC address with SO_REUSEPORT, so the
+    kernel spreads connections across them and each has its own GIL.
+    Workers report readiness (and their local metrics port) through a
+    shared value. The supervisor:
+
+    - restarts crashed workers with exponential backoff,
+    - does a rolling restart on SIGHUP (a replacement must become ready
+      before the worker it replaces is stopped),
+    - stops all workers gracefully on SIGTERM/SIGINT,
+    - serves /metrics (merged from all workers) and /readyz on metrics_addr.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[int, object], None],
+        workers: int,
+        metrics_addr: Optional[str] = None,
+        shutdown_timeout: float = 10.0,
+        startup_timeout: float = 60.0
+    ):
+        """
+        Initialize supervisor.
+
+        Args:
+            target: Worker entry point, called as target(worker_id, ready_port)
+                in a fresh process
+            workers: Number of worker processes
+            metrics_addr: Address for the aggregated metrics endpoint (optional)
+            shutdown_timeout: Seconds a worker gets to drain before it is killed
+            startup_timeout: Seconds a replacement gets to become ready
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.target = target
+        self.workers = workers
+        self.metrics_addr = metrics_addr
+        self.shutdown_timeout = shutdown_timeout
+        self.startup_timeout = startup_timeout
+        # Workers are started with "spawn": forking after grpc has started threads is unsafe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots: Dict[int, _Worker] = {}
+        self._crashes: Dict[int, int] = {}
+        self._next_worker_id = 0
+        self._stopping = False
+        self._stop = asyncio.Event()
+        self._restart_requested = asyncio.Event()
+
+    def _spawn(self, slot: int) -> _Worker:
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        ready_port = self._ctx.Value("i", 0)
+        process = self._ctx.Process(
+            target=self.target, args=(worker_id, ready_port), name=f"assistant-worker-{worker_id}", daemon=False
+        )
+        process.start()
+        logger.info(f"Started worker {worker_id} (pid {process.pid}) in slot {slot}")
+        return _Worker(slot, process, ready_port)
+
+    async def _terminate(self, worker: _Worker) -> None:
+        """Ask a worker to drain and exit, killing it after shutdown_timeout."""
+        if worker.process.is_alive():
+            worker.process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        while worker.process.is_alive() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if worker.process.is_alive():
+            logger.warning(f"Worker pid {worker.process.pid} did not stop in time, killing it")
+            worker.process.kill()
+        worker.process.join(timeout=1.0)
+
+    async def _wait_ready(self, worker: _Worker) -> bool:
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if worker.ready:
+                return True
+            if not worker.process.is_alive():
+                return False
+            await asyncio.sleep(0.05)
+        return False
+
+    async def _rolling_restart(self) -> None:
+        """Replace workers one at a time without dropping serving capacity to zero."""
+        logger.info("Rolling restart of workers")
+        for slot in sorted(self._slots):
+            if self._stopping:
+                return
+            old = self._slots[slot]
+            replacement = self._spawn(slot)
+            try:
+                ready = await self._wait_ready(replacement)
+            except asyncio.CancelledError:
+                await self._terminate(replacement)
+                raise
+            if not ready:
+                logger.error(f"Replacement for slot {slot} did not become ready, aborting rolling restart")
+                await self._terminate(replacement)
+                return
+            self._slots[slot] = replacement
+            await self._terminate(old)
+        logger.info("Rolling restart complete")
+
+    async def _monitor(self) -> None:
+        """Restart workers that exited unexpectedly."""
+        restart_at: Dict[int, float] = {}
+        while not self._stopping:
+            now = time.monotonic()
+            for slot, worker in list(self._slots.items()):
+                if worker.process.is_alive():
+                    # Running for a while resets the crash backoff
+                    if now - worker.started_at > 30.0:
+                        self._crashes[slot] = 0
+                    continue
+                if slot not in restart_at:
+                    crashes = self._crashes.get(slot, 0)
+                    delay = min(0.5 * (2 ** crashes), 30.0)
+                    self._crashes[slot] = crashes + 1
+                    restart_at[slot] = now + delay
+                    logger.error(f"Worker in slot {slot} exited with code {worker.process.exitcode}, "
+                                 f"restarting in {delay:.1f}s")
+                elif now >= restart_at[slot]:
+                    del restart_at[slot]
+                    self._slots[slot] = self._spawn(slot)
+            if self._restart_requested.is_set():
+                self._restart_requested.clear()
+                await self._rolling_restart()
+            await asyncio.sleep(0.2)
+
+    async def _fetch_metrics(self, worker: _Worker) -> Optional[str]:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection("127.0.0.1", worker.ready_port.value), 1.0
+            )
+            try:
+                writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 5.0)
+            finally:
+                writer.close()
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not scrape worker pid {worker.process.pid}: {e}")
+            return None
+        _, _, body = response.partition(b"\r\n\r\n")
+        return body.decode("utf-8")
+
+    async def _metrics(self, query: str):
+        workers = [worker for worker in self._slots.values() if worker.ready]
+        texts = await asyncio.gather(*(self._fetch_metrics(worker) for worker in workers))
+        merged = merge_expositions({
+            str(worker.slot): text for worker, text in zip(workers, texts) if text is not None
+        })
+        return 200, "text/plain; version=0.0.4", merged
+
+    def _readyz(self, query: str):
+        ready = sum(1 for worker in self._slots.values() if worker.ready)
+        status = 200 if ready > 0 else 503
+        return status, "text/plain", f"ready {ready}/{self.workers}\n"
+
+    def _request_stop(self) -> None:
+        self._stopping = True
+        self._stop.set()
+
+    async def run(self) -> None:
+        """Run until SIGTERM/SIGINT, then stop all workers."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._request_stop)
+        loop.add_signal_handler(signal.SIGHUP, self._restart_requested.set)
+
+        metrics_server = None
+        if self.metrics_addr:
+            metrics_server = MetricsServer(self.metrics_addr)
+            metrics_server.add_route("/metrics", self._metrics)
+            metrics_server.add_route("/readyz", self._readyz)
+            await metrics_server.start()
+
+        for slot in range(self.workers):
+            self._slots[slot] = self._spawn(slot)
+        logger.info(f"Supervisor running {self.workers} workers (pid {multiprocessing.current_process().pid})")
+
+        monitor = asyncio.ensure_future(self._monitor())
+        try:
+            await self._stop.wait()
+        finally:
+            self._stopping = True
+            monitor.cancel()
+            try:
+                await monitor
+            except asyncio.CancelledError:
+                pass
+            logger.info("Stopping workers...")
+            await asyncio.gather(*(self._terminate(worker) for worker in self._slots.values()))
+            if metrics_server is not None:
+                await metrics_server.stop()
@@ -0,0 +1,314 @@
+"""Declarative agent definitions loaded from a TOML/YAML/JSON file."""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from .base import AgentMetadata, BaseAgent
+from .cache import ResponseCache
+from .lazy import LazyAgent
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy(BaseModel):
+    """Response cache settings of one agent."""
+    enabled: bool = False
+    ttl_seconds: float = 300.0
+    max_entries: int = 1024
+    semantic_threshold: Optional[float] = None
+
+
+class HedgeSettings(BaseModel):
+    """Hedged request settings of one agent (needs several base_urls)."""
+    enabled: bool = False
+    percentile: float = 95.0
+    budget_ratio: float = 0.05
+    min_delay_ms: float = 50.0
+
+
+class AgentSpec(BaseModel):
+    """
+    One agent declared in the agents file.
+
+    Unset model settings fall back to the environment configuration
+    (OPENAI_*), so a file only needs to state what differs per agent.
+    """
+    name: str
+    type: str = "langchain"
+    description: str = "AI agent powered by LangChain and OpenAI (supports local models)"
+    capabilities: List[str] = ["chat", "ai", "openai", "langchain"]
+    default: bool = False
+    enabled: bool = True
+
+    model: Optional[str] = None
+    base_url: Optional[str] = None
+    base_urls: List[str] = []
+    api_key: Optional[str] = None
+    api_key_env: Optional[str] = None  # Environment variable holding the API key
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    max_concurrency: int = 0  # Admission limit for this agent, 0 = only the global limit
+    cache: Optional[CachePolicy] = None
+    hedge: Optional[HedgeSettings] = None
+    batch_max_size: Optional[int] = None
+    history_token_budget: Optional[int] = None
+
+    # Type-specific settings (e.g. for agents added later)
+    options: Dict[str, Any] = Field(default_factory=dict)
+
+    @field_validator("type")
+    @classmethod
+    def check_type(cls, v):
+        if v not in AGENT_BUILDERS:
+            raise ValueError(f"unknown agent type '{v}' (known types: {sorted(AGENT_BUILDERS)})")
+        return v
+
+    @field_validator("base_urls", mode="before")
+    @classmethod
+    def split_base_urls(cls, v):
+        """Accept a comma-separated string as well as a list."""
+        if isinstance(v, str):
+            return [url.strip() for url in v.split(",") if url.strip()]
+        return v or []
+
+    def resolve_api_key(self, fallback: Optional[str]) -> Optional[str]:
+        """Get the API key: api_key_env, then api_key, then the fallback."""
+        if self.api_key_env:
+            return os.environ.get(self.api_key_env) or None
+        return self.api_key or fallback
+
+    def endpoints(self, config: Any) -> List[str]:
+        """
+        Base URLs this agent talks to.
+
+        Replicas come from the spec; the environment settings apply only to
+        agents that declare no endpoint. Empty for the public OpenAI API.
+        """
+        if self.base_url or self.base_urls:
+            return list(dict.fromkeys(([self.base_url] if self.base_url else []) + self.base_urls))
+        return list(dict.fromkeys(
+            ([config.openai_base_url] if config.openai_base_url else []) + config.get_openai_base_urls()
+        ))
+
+    def is_configured(self, config: Any) -> bool:
+        """Whether a LangChain agent built from this spec will be active (same rule as LangChainAgent)."""
+        if (self.base_url or "").strip() or self.base_urls:
+            return True
+        if (config.openai_base_url or "").strip() or config.get_openai_base_urls():
+            return True
+        api_key = (self.resolve_api_key(config.openai_api_key) or "").strip()
+        return bool(api_key) and api_key != "not-needed"
+
+
+def _read_file(path: Path) -> Dict[str, Any]:
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        import tomllib
+
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(f"PyYAML is required to read {path}: pip install pyyaml") from None
+        with open(path, encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    if suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    raise ValueError(f"Unsupported agents file format: {path} (use .toml, .yaml or .json)")
+
+
+def load_agents_file(path: str) -> Dict[str, Any]:
+    """
+    Read an agents file.
+
+    The file has an "agents" list; an optional "defaults" table is merged
+    into every agent. Other top-level sections (e.g. routing rules) are
+    returned unchanged for other components.
+
+    Args:
+        path: Path to a .toml, .yaml/.yml or .json file
+
+    Returns:
+        Parsed document with "agents" replaced by validated AgentSpec objects
+    """
+    document = _read_file(Path(path))
+    defaults = document.get("defaults", {})
+    specs = []
+    for index, entry in enumerate(document.get("agents", [])):
+        try:
+            spec = AgentSpec(**{**defaults, **entry})
+        except ValidationError as e:
+            raise ValueError(f"Invalid agent '{entry.get('name') or f'agents[{index}]'}' in {path}: {e}") from None
+        if spec.enabled:
+            specs.append(spec)
+    names = [spec.name for spec in specs]
+    duplicates = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicates:
+        raise ValueError(f"Duplicate agent names in {path}: {duplicates}")
+    logger.info(f"Loaded {len(specs)} agent definitions from {path}")
+    return {**document, "agents": specs}
+
+
+# Agent type -> builder(spec, config, shared) returning the agent
+AgentBuilder = Callable[[AgentSpec, Any, Dict[str, Any]], BaseAgent]
+AGENT_BUILDERS: Dict[str, AgentBuilder] = {}
+# Modules a type needs, imported off the event loop before the builder runs
+AGENT_MODULES: Dict[str, tuple] = {}
+
+
+def agent_type(name: str, modules: tuple = ()) -> Callable[[AgentBuilder], AgentBuilder]:
+    """Register a builder for an agent type."""
+    def decorator(builder: AgentBuilder) -> AgentBuilder:
+        AGENT_BUILDERS[name] = builder
+        AGENT_MODULES[name] = modules
+        return builder
+    return decorator
+
+
+def build_hedge_options(spec: AgentSpec, config: Any) -> Optional[Dict[str, Any]]:
+    """HedgePolicy arguments from the agent's settings (or the global ones), None if disabled."""
+    settings = spec.hedge or HedgeSettings(
+        enabled=config.hedge_enabled,
+        percentile=config.hedge_percentile,
+        budget_ratio=config.hedge_budget_ratio,
+        min_delay_ms=config.hedge_min_delay_ms
+    )
+    if not settings.enabled:
+        return None
+    return settings.model_dump(exclude={"enabled"})
+
+
+def build_response_cache(spec: AgentSpec, config: Any) -> Optional[ResponseCache]:
+    """Build the agent's response cache from its policy (or the global settings)."""
+    policy = spec.cache or CachePolicy(
+        enabled=config.response_cache_enabled,
+        ttl_seconds=config.response_cache_ttl_seconds,
+        max_entries=config.response_cache_max_entries,
+        semantic_threshold=config.response_cache_semantic_threshold
+    )
+    if not policy.enabled:
+        return None
+    return ResponseCache(
+        ttl_seconds=policy.ttl_seconds,
+        max_entries=policy.max_entries,
+        semantic_threshold=policy.semantic_threshold
+    )
+
+
+@agent_type("langchain", modules=("internal.agents.langchain_agent",))
+def build_langchain_agent(spec: AgentSpec, config: Any, shared: Dict[str, Any]) -> BaseAgent:
+    """Build a LangChainAgent from a spec, with environment settings as defaults."""
+    from .langchain_agent import LangChainAgent
+
+    model = spec.model or config.openai_model
+    endpoints = spec.endpoints(config)
+    return LangChainAgent(
+        api_key=spec.resolve_api_key(config.openai_api_key),
+        base_url=endpoints[0] if endpoints else None,
+        model_name=model,
+        temperature=spec.temperature if spec.temperature is not None else config.openai_temperature,
+        cache=build_response_cache(spec, config),
+        batch_max_size=spec.batch_max_size if spec.batch_max_size is not None else config.batch_max_size,
+        batch_max_wait_ms=config.batch_max_wait_ms,
+        base_urls=endpoints,
+        pool_options={
+            "strategy": config.backend_balancing,
+            "max_failures": config.backend_max_failures,
+            "probe_interval": config.backend_probe_interval_seconds,
+        },
+        hedge_options=build_hedge_options(spec, config),
+        breaker_options={
+            "failure_threshold": config.circuit_breaker_failure_threshold,
+            "failure_rate": config.circuit_breaker_failure_rate,
+            "slow_call_seconds": config.circuit_breaker_slow_call_seconds,
+            "reset_timeout": config.circuit_breaker_reset_seconds,
+        } if config.circuit_breaker_enabled else None,
+        history_token_budget=(spec.history_token_budget if spec.history_token_budget is not None
+                              else config.get_history_token_budget(model)),
+        history_recent_ratio=config.history_recent_ratio,
+        name=spec.name,
+        description=spec.description,
+        capabilities=spec.capabilities,
+        max_tokens=spec.max_tokens,
+        http_async_client=shared.get("http_client")
+    )
+
+
+@agent_type("cascade", modules=("internal.agents.langchain_agent", "internal.agents.cascade_agent"))
+def build_cascade_agent(spec: AgentSpec, config: Any, shared: Dict[str, Any]) -> BaseAgent:
+    """
+    Build a CascadeAgent; each tier is a LangChain agent built from this spec with its overrides.
+
+    options.tiers lists the tiers cheapest first, each a model name or a table of
+    agent fields (e.g. model and base_url); the other options are the escalation checks.
+    """
+    from .cascade_agent import CascadeAgent, CascadeOptions
+
+    options = CascadeOptions(**spec.options)
+    base = spec.model_dump(exclude={"type", "options", "default"})
+    tiers = []
+    for index, tier in enumerate(options.tiers):
+        overrides = {"model": tier} if isinstance(tier, str) else tier
+        name = f"{spec.name}/{overrides.get('model') or index}"
+        tiers.append(build_langchain_agent(AgentSpec(**{**base, **overrides, "name": name}), config, shared))
+    return CascadeAgent(
+        tiers,
+        options,
+        name=spec.name,
+        description=spec.description,
+        capabilities=spec.capabilities
+    )
+
+
+def default_agent_specs() -> List[AgentSpec]:
+    """The single agent configured through environment variables (no agents file)."""
+    return [AgentSpec(name="langchain")]
+
+
+def create_agent(
+    spec: AgentSpec,
+    config: Any,
+    shared: Dict[str, Any],
+    lazy: bool = True,
+    on_load: Optional[Callable[[BaseAgent, float], None]] = None
+) -> BaseAgent:
+    """
+    Create the agent for a spec.
+
+    Args:
+        spec: Agent definition
+        config: Application configuration (fallback settings)
+        shared: Objects shared by all agents (e.g. "http_client")
+        lazy: Register a LazyAgent that builds the agent on first use
+        on_load: Called with each built agent and its build time
+
+    Returns:
+        The agent (or its lazy placeholder)
+    """
+    builder = AGENT_BUILDERS.get(spec.type)
+    if builder is None:
+        raise ValueError(f"Unknown agent type '{spec.type}' for agent '{spec.name}'")
+    factory = lambda: builder(spec, config, shared)
+    if not lazy:
+        started = time.perf_counter()
+        agent = factory()
+        if on_load is not None:
+            on_load(agent, time.perf_counter() - started)
+        return agent
+    metadata = AgentMetadata(
+        name=spec.name,
+        description=spec.description,
+        capabilities=spec.capabilities,
+        is_active=spec.is_configured(config) if spec.type == "langchain" else True
+    )
+    return LazyAgent(metadata, factory, modules=AGENT_MODULES.get(spec.type, ()), on_load=on_load)
@@ -0,0 +1,252 @@
+"""Health-aware pool of OpenAI-compatible LLM backends."""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("least_outstanding", "ewma")
+
+
+class Backend:
+    """One model server replica and its health statistics."""
+
+    def __init__(self, url: str, client: Any):
+        """
+        Initialize backend.
+
+        Args:
+            url: Base URL of the OpenAI-compatible endpoint
+            client: LLM client bound to this URL (e.g. ChatOpenAI)
+        """
+        self.url = url
+        self.client = client
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected = False
+        self.requests = 0
+        self.failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get backend statistics as a dictionary."""
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected": self.ejected,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class Lease:
+    """A backend checked out for one request."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.started_at = time.monotonic()
+        self.latency: Optional[float] = None
+        self.failed = False
+
+    def mark_latency(self) -> None:
+        """Record latency now (e.g. at the first streamed chunk) instead of at release."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started_at
+
+
+class BackendPool:
+    """
+    Load balancer over several backends.
+
+    Requests go to the healthy backend with the fewest outstanding requests
+    ("least_outstanding") or the lowest exponentially weighted moving average
+    latency ("ewma"). A backend is ejected after max_failures consecutive
+    failures, and a background task re-probes ejected backends every
+    probe_interval seconds, restoring them once they answer again.
+    """
+
+    def __init__(
+        self,
+        backends: List[Backend],
+        strategy: str = "least_outstanding",
+        max_failures: int = 3,
+        probe_interval: float = 10.0,
+        ewma_alpha: float = 0.3,
+        probe: Optional[Callable[[Backend], Awaitable[bool]]] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Initialize backend pool.
+
+        Args:
+            backends: Backends to balance across (at least one)
+            strategy: Selection strategy, "least_outstanding" or "ewma"
+            max_failures: Consecutive failures before a backend is ejected
+            probe_interval: Seconds between health probes of ejected backends
+            ewma_alpha: Smoothing factor for the latency average
+            probe: Health check coroutine (default: GET {url}/models)
+            http_client: Client for the default probe, e.g. the shared HTTPClientPool client
+                         (default: a short-lived client per probe)
+        """
+        if not backends:
+            raise ValueError("BackendPool requires at least one backend")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy: {strategy}")
+        self.backends = backends
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.ewma_alpha = ewma_alpha
+        self._probe = probe or self._http_probe
+        self._http_client = http_client
+        self._prober: Optional[asyncio.Task] = None
+
+    def select(self, exclude: Iterable[Backend] = ()) -> Backend:
+        """
+        Pick a backend for the next request.
+
+        Args:
+            exclude: Backends not to use (e.g. ones already tried)
+
+        Returns:
+            Selected backend. If every backend is ejected, the one with the
+            fewest consecutive failures is returned rather than failing.
+        """
+        excluded = set(id(b) for b in exclude)
+        candidates = [b for b in self.backends if id(b) not in excluded] or list(self.backends)
+        healthy = [b for b in candidates if not b.ejected]
+        if not healthy:
+            return min(candidates, key=lambda b: b.consecutive_failures)
+
+        if self.strategy == "ewma":
+            # Unmeasured backends go first so every replica gets a latency sample;
+            # outstanding requests inflate the estimate to spread bursts.
+            return min(
+                healthy,
+                key=lambda b: -1.0 if b.ewma_latency is None else b.ewma_latency * (b.outstanding + 1)
+            )
+        return min(healthy, key=lambda b: (b.outstanding, b.ewma_latency or 0.0))
+
+    @asynccontextmanager
+    async def acquire(self, exclude: Iterable[Backend] = ()) -> AsyncIterator[Lease]:
+        """
+        Check out a backend for one request and record the outcome.
+
+        Args:
+            exclude: Backends not to use
+
+        Yields:
+            Lease for the selected backend. Exceptions raised inside the
+            block (or lease.failed = True) count as a failure; cancellation
+            releases the backend without affecting its health.
+        """
+        self._ensure_prober()
+        lease = Lease(self.select(exclude))
+        backend = lease.backend
+        backend.outstanding += 1
+        backend.requests += 1
+        try:
+            yield lease
+        except Exception:
+            lease.failed = True
+            raise
+        finally:
+            backend.outstanding -= 1
+            if lease.failed:
+                self.record_failure(backend)
+            elif lease.latency is not None or not self._interrupted():
+                lease.mark_latency()
+                self.record_success(backend, lease.latency)
+
+    def record_success(self, backend: Backend, latency: float) -> None:
+        """
+        Record a successful request.
+
+        Args:
+            backend: Backend that served the request
+            latency: Observed latency in seconds
+        """
+        backend.consecutive_failures = 0
+        if backend.ewma_latency is None:
+            backend.ewma_latency = latency
+        else:
+            backend.ewma_latency += self.ewma_alpha * (latency - backend.ewma_latency)
+        if backend.ejected:
+            backend.ejected = False
+            logger.info(f"Backend {backend.url} restored after successful request")
+
+    def record_failure(self, backend: Backend) -> None:
+        """
+        Record a failed request, ejecting the backend if it keeps failing.
+
+        Args:
+            backend: Backend that failed
+        """
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if not backend.ejected and backend.consecutive_failures >= self.max_failures:
+            backend.ejected = True
+            logger.warning(f"Backend {backend.url} ejected after {backend.consecutive_failures} consecutive failures")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get per-backend statistics.
+
+        Returns:
+            List of backend snapshots
+        """
+        return [backend.snapshot() for backend in self.backends]
+
+    async def close(self) -> None:
+        """Stop background probing."""
+        if self._prober is not None:
+            self._prober.cancel()
+            try:
+                await self._prober
+            except asyncio.CancelledError:
+                pass
+            self._prober = None
+
+    @staticmethod
+    def _interrupted() -> bool:
+        """True if the current task is being cancelled."""
+        task = asyncio.current_task()
+        return task is not None and task.cancelling() > 0
+
+    def _ensure_prober(self) -> None:
+        if self.probe_interval > 0 and (self._prober is None or self._prober.done()):
+            self._prober = asyncio.ensure_future(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        """Periodically re-probe ejected backends."""
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            for backend in [b for b in self.backends if b.ejected]:
+                try:
+                    healthy = await self._probe(backend)
+                except Exception as e:
+                    logger.debug(f"Probe of backend {backend.url} failed: {e}")
+                    healthy = False
+                if healthy:
+                    backend.ejected = False
+                    backend.consecutive_failures = 0
+                    logger.info(f"Backend {backend.url} restored after health probe")
+
+    async def _http_probe(self, backend: Backend) -> bool:
+        """Check that the backend answers GET {url}/models."""
+        url = f"{backend.url.rstrip('/')}/models"
+        if self._http_client is not None:
+            # Reuses pooled connections instead of a TCP/TLS handshake per probe
+            response = await self._http_client.get(url, timeout=2.0)
+        else:
+            async with httpx.AsyncClient(timeout=2.0) as client:
+                response = await client.get(url)
+        # Any non-5xx answer (including 401) means the server is up
+        return response.status_code < 500
@@ -0,0 +1,177 @@
+"""Dynamic micro-batching of non-streaming LLM calls."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Dispatches a batch of inputs and returns one result (or exception) per input
+BatchDispatch = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into small batches.
+
+    Requests are queued per user. A batch is dispatched when max_batch_size
+    requests are waiting or max_wait_ms has passed since the first request
+    of the batch arrived. Batches are filled round-robin across users so a
+    single user with many queued requests cannot starve the others. Each
+    request gets its own future, resolved with its own result or exception.
+    A cancelled request leaves the queue; a dispatched batch is cancelled,
+    aborting its upstream call, as soon as none of its callers still wait.
+    """
+
+    def __init__(self, dispatch: BatchDispatch, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        """
+        Initialize micro-batcher.
+
+        Args:
+            dispatch: Coroutine function that processes a list of inputs
+            max_batch_size: Maximum number of requests per batch
+            max_wait_ms: Maximum time to wait for a batch to fill (milliseconds)
+        """
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.dispatch = dispatch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queues: "OrderedDict[str, Deque[Tuple[Any, asyncio.Future]]]" = OrderedDict()
+        self._pending = 0
+        self._arrived: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self._stats = {"requests": 0, "batches": 0, "batched_requests": 0, "abandoned_batches": 0}
+
+    async def submit(self, item: Any, user_id: str = "") -> Any:
+        """
+        Queue an input and wait for its result.
+
+        Args:
+            item: Input passed to dispatch as part of a batch
+            user_id: Fairness key (requests are interleaved across users)
+
+        Returns:
+            Result for this input
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queues.setdefault(user_id, deque()).append((item, future))
+        self._pending += 1
+        self._stats["requests"] += 1
+        self._ensure_worker()
+        self._arrived.set()
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching counters.
+
+        Returns:
+            Dictionary with request/batch counts and average batch size
+        """
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "pending": self._pending,
+            "avg_batch_size": self._stats["batched_requests"] / batches if batches else 0.0,
+        }
+
+    async def close(self) -> None:
+        """Stop the collector and wait for in-flight batches."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._arrived = asyncio.Event()
+            self._worker = asyncio.ensure_future(self._collect())
+
+    async def _collect(self) -> None:
+        """Form batches and hand them to dispatch tasks."""
+        while True:
+            if self._pending == 0:
+                self._arrived.clear()
+                await self._arrived.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            while self._pending < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if batch:
+                task = asyncio.ensure_future(self._run(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    def _take_batch(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Take up to max_batch_size requests, one user at a time."""
+        batch = []
+        while self._queues and len(batch) < self.max_batch_size:
+            user_id, queue = next(iter(self._queues.items()))
+            item, future = queue.popleft()
+            self._pending -= 1
+            if queue:
+                # Rotate this user to the back so the next pick is someone else
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if not future.done():
+                batch.append((item, future))
+        return batch
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Dispatch one batch and resolve its futures."""
+        self._stats["batches"] += 1
+        self._stats["batched_requests"] += len(batch)
+        logger.debug(f"Dispatching batch of {len(batch)} requests")
+        futures = [future for _, future in batch]
+        dispatch = asyncio.ensure_future(self.dispatch([item for item, _ in batch]))
+
+        def abandon(_: asyncio.Future) -> None:
+            # Callers cancelled (client gone or deadline passed): stop paying for the upstream call
+            if not dispatch.done() and all(future.cancelled() for future in futures):
+                self._stats["abandoned_batches"] += 1
+                dispatch.cancel()
+
+        for future in futures:
+            future.add_done_callback(abandon)
+        try:
+            results = await dispatch
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch dispatch returned {len(results)} results for {len(batch)} inputs")
+        except asyncio.CancelledError:
+            if dispatch.cancelled() and asyncio.current_task().cancelling() == 0:
+                return
+            # Never leave a caller waiting on a batch that will not finish
+            dispatch.cancel()
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
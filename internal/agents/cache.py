@@ -0,0 +1,270 @@
+"""Response cache for agent replies with an optional semantic tier."""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .embeddings import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+@dataclass
+class _CacheEntry:
+    """A cached response."""
+    response: str
+    scope: str
+    expires_at: float
+    embedding: Optional[np.ndarray] = None
+    numbers: Tuple[str, ...] = ()
+
+
+def _normalize_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return " ".join(str(text).split()).casefold()
+
+
+class ResponseCache:
+    """
+    In-process cache of LLM responses.
+
+    The exact tier is keyed on the normalized (model, temperature, history,
+    message) tuple. The optional semantic tier serves a cached answer for a
+    near-duplicate message when the cosine similarity of the two messages is
+    at least ``semantic_threshold``. The default embedder is lexical, so
+    "enable X" and "disable X" look alike: the semantic tier is therefore
+    limited to single-turn prompts at temperature 0, and never matches
+    messages that mention different numbers. Entries expire after
+    ``ttl_seconds`` and the least recently used entry is evicted once
+    ``max_entries`` is reached.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 1024,
+        semantic_threshold: Optional[float] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        replay_chunk_size: int = 64
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            ttl_seconds: Time-to-live of an entry in seconds (<= 0 disables expiry)
+            max_entries: Maximum number of cached responses
+            semantic_threshold: Minimum cosine similarity for semantic hits.
+                                None disables the semantic tier.
+            embedder: Embedder for the semantic tier (default: HashingEmbedder)
+            replay_chunk_size: Characters per chunk when replaying to streams
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self.replay_chunk_size = max(1, replay_chunk_size)
+        self._embedder = embedder or (HashingEmbedder() if semantic_threshold is not None else None)
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # scope -> keys of entries in that scope (semantic candidates)
+        self._scopes: Dict[str, Dict[str, None]] = {}
+        # Scopes of single-turn, temperature 0 prompts, the only ones with semantic hits
+        self._semantic_scopes: Set[str] = set()
+        self._stats = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def make_scope(model: str, temperature: float, history: List[Dict[str, str]]) -> str:
+        """
+        Build the conversation scope hash for a request.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            history: Conversation history as role/content dicts
+
+        Returns:
+            Hex digest identifying the scope
+        """
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": round(float(temperature), 4),
+                "history": [
+                    [msg.get("role", ""), _normalize_text(msg.get("content", ""))]
+                    for msg in history
+                ],
+            },
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def make_key(self, model: str, temperature: float, history: List[Dict[str, str]], message: str) -> str:
+        """
+        Build the exact-match cache key for a request.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            history: Conversation history as role/content dicts
+            message: Current user message
+
+        Returns:
+            Cache key
+        """
+        scope = self.make_scope(model, temperature, history)
+        if self.semantic_threshold is not None and not history and float(temperature) == 0.0:
+            self._semantic_scopes.add(scope)
+        digest = hashlib.sha256(_normalize_text(message).encode("utf-8")).hexdigest()
+        return f"{scope}:{digest}"
+
+    def get(self, key: str, message: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from make_key()
+            message: Original message, enables the semantic tier on exact misses
+
+        Returns:
+            Cached response or None on miss
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._is_expired(entry, now):
+                self._remove(key)
+                self._stats["expirations"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.response
+
+        scope = key.split(":", 1)[0]
+        if message is not None and scope in self._semantic_scopes:
+            match = self._semantic_lookup(scope, message, now)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self._stats["semantic_hits"] += 1
+                return self._entries[match].response
+
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, response: str, message: Optional[str] = None) -> None:
+        """
+        Store a response.
+
+        Args:
+            key: Key from make_key()
+            response: Response text
+            message: Original message, stored for the semantic tier
+        """
+        if key in self._entries:
+            self._remove(key)
+        scope = key.split(":", 1)[0]
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+        embedding = None
+        numbers: Tuple[str, ...] = ()
+        if message is not None and scope in self._semantic_scopes:
+            embedding = self._embedder.embed(message)
+            numbers = self._numbers(message)
+        self._entries[key] = _CacheEntry(response, scope, expires_at, embedding, numbers)
+        self._scopes.setdefault(scope, {})[key] = None
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._scopes.clear()
+        self._semantic_scopes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hit/miss/eviction counters and current size
+        """
+        lookups = self._stats["hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+        hit_total = self._stats["hits"] + self._stats["semantic_hits"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "hit_ratio": hit_total / lookups if lookups else 0.0,
+        }
+
+    def iter_chunks(self, response: str) -> Iterator[str]:
+        """
+        Split a cached response into chunks for streaming replay.
+
+        Args:
+            response: Cached response text
+
+        Yields:
+            Response chunks of at most replay_chunk_size characters
+        """
+        for start in range(0, len(response), self.replay_chunk_size):
+            yield response[start:start + self.replay_chunk_size]
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return entry.expires_at <= now
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._scopes.get(entry.scope)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._scopes[entry.scope]
+                self._semantic_scopes.discard(entry.scope)
+
+    @staticmethod
+    def _numbers(message: str) -> Tuple[str, ...]:
+        return tuple(sorted(_NUMBER_RE.findall(message)))
+
+    def _semantic_lookup(self, scope: str, message: str, now: float) -> Optional[str]:
+        """Find the most similar live entry in the same scope that mentions the same numbers."""
+        keys = self._scopes.get(scope)
+        if not keys or self._embedder is None:
+            return None
+
+        numbers = self._numbers(message)
+        candidates = []
+        for candidate in list(keys):
+            entry = self._entries[candidate]
+            if self._is_expired(entry, now):
+                self._remove(candidate)
+                self._stats["expirations"] += 1
+            elif entry.embedding is not None and entry.numbers == numbers:
+                candidates.append(candidate)
+        if not candidates:
+            return None
+
+        matrix = np.stack([self._entries[candidate].embedding for candidate in candidates])
+        scores = matrix @ self._embedder.embed(message)
+        best = int(np.argmax(scores))
+        if scores[best] >= self.semantic_threshold:
+            logger.debug(f"Semantic cache hit with similarity {scores[best]:.3f}")
+            return candidates[best]
+        return None
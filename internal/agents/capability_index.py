@@ -0,0 +1,97 @@
+"""Vectorized index of agent capabilities for semantic routing."""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base import AgentMetadata
+from .embeddings import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+class CapabilityIndex:
+    """
+    Embedding matrix with one row per registered agent.
+
+    Each agent's description and capabilities are embedded once when the
+    agent is registered. Scoring a message is a single matrix-vector
+    product against all agents.
+    """
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None):
+        """
+        Initialize capability index.
+
+        Args:
+            embedder: Embedder for agent profiles and messages (default: HashingEmbedder)
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self._names: List[str] = []
+        self._rows: Dict[str, np.ndarray] = {}
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        # Incremented on every change so callers can invalidate memoized results
+        self.version = 0
+
+    @staticmethod
+    def profile_text(metadata: AgentMetadata) -> str:
+        """
+        Build the text embedded for an agent.
+
+        Args:
+            metadata: Agent metadata
+
+        Returns:
+            Description and capabilities joined into one document
+        """
+        return " ".join([metadata.name, metadata.description, *metadata.capabilities])
+
+    def add(self, metadata: AgentMetadata) -> None:
+        """
+        Embed and index an agent.
+
+        Args:
+            metadata: Agent metadata
+        """
+        self._rows[metadata.name] = self.embedder.embed(self.profile_text(metadata))
+        self._rebuild()
+
+    def remove(self, name: str) -> None:
+        """
+        Remove an agent from the index.
+
+        Args:
+            name: Agent name
+        """
+        if self._rows.pop(name, None) is not None:
+            self._rebuild()
+
+    def rank(self, message: str) -> List[Tuple[str, float]]:
+        """
+        Score all indexed agents against a message.
+
+        Args:
+            message: User message
+
+        Returns:
+            (agent name, cosine similarity) pairs, best first
+        """
+        if not self._names:
+            return []
+        scores = self._matrix @ self.embedder.embed(message)
+        order = np.argsort(-scores, kind="stable")
+        return [(self._names[i], float(scores[i])) for i in order]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _rebuild(self) -> None:
+        """Restack the embedding matrix after a change."""
+        self._names = list(self._rows)
+        if self._names:
+            self._matrix = np.stack([self._rows[name] for name in self._names])
+        else:
+            self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.version += 1
+        logger.debug(f"Capability index rebuilt with {len(self._names)} agents")
@@ -0,0 +1,257 @@
+"""Agent that answers with a fast model and escalates to larger ones when needed."""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from pydantic import BaseModel, field_validator
+
+from .base import AgentMetadata, BaseAgent
+
+logger = logging.getLogger(__name__)
+
+# Openings of answers where the model declines or does not know (checked on the first characters)
+DEFAULT_REFUSAL_PATTERNS = [
+    r"\bI(?:'m| am)? (?:not able|unable) to\b",
+    r"\bI (?:can(?:'|no)t|cannot|don'?t know)\b",
+    r"\bI'?m not sure\b",
+    r"\bas an AI\b",
+    r"我(?:无法|不能|不知道|不确定)",
+    r"抱歉",
+]
+
+CONFIDENCE_INSTRUCTION = (
+    "\n\nAfter your answer, add a last line of the form \"Confidence: <number between 0 and 1>\" "
+    "saying how sure you are that the answer is correct and complete."
+)
+_CONFIDENCE_LINE = re.compile(r"\n?[ \t]*\**confidence\**\s*[:：]\**\s*(\d+(?:\.\d+)?)\s*%?\s*$", re.IGNORECASE)
+# Characters of a streamed answer after which the refusal check runs early
+_HEAD_CHARS = 200
+
+
+class CascadeOptions(BaseModel):
+    """Cascade settings, read from the agent's options in the agents file."""
+    # Cheapest first; a model name or a table of agent fields (model, base_url, max_tokens, ...)
+    tiers: List[Union[str, Dict[str, Any]]]
+    min_chars: int = 0  # Shorter answers escalate
+    refusal_patterns: List[str] = DEFAULT_REFUSAL_PATTERNS  # Regexes matched against the start of the answer
+    confidence_threshold: float = 0.0  # Ask for a self-reported confidence and escalate below it, 0 disables
+    validator: Optional[str] = None  # "module:function" called with (message, answer), returning a bool
+    escalate_on_error: bool = True  # Escalate when a tier returns an error
+
+    @field_validator("tiers")
+    @classmethod
+    def check_tiers(cls, v):
+        if len(v) < 2:
+            raise ValueError("a cascade needs at least two tiers")
+        return v
+
+
+def load_validator(path: str) -> Callable[[str, str], Any]:
+    """Import a validator given as "module:function"."""
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Validator must be given as 'module:function', got '{path}'")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class CascadeAgent(BaseAgent):
+    """
+    Try the cheapest tier first and escalate only when its answer fails a check.
+
+    Checks, in order: the tier returned an error, the answer is shorter than
+    min_chars, it starts like a refusal, its self-reported confidence is
+    below the threshold, or the validator rejects it. The last tier's answer
+    is always returned. For streams, the answers of earlier tiers are
+    collected and checked before anything is sent, so a client never sees
+    output that is later replaced; a refusal is detected after the first
+    characters and cuts that tier's generation short.
+    """
+
+    def __init__(
+        self,
+        tiers: List[BaseAgent],
+        options: CascadeOptions,
+        name: str = "cascade",
+        description: str = "Answers with a fast model and escalates hard questions to a larger one",
+        capabilities: Optional[List[str]] = None
+    ):
+        """
+        Initialize cascade agent.
+
+        Args:
+            tiers: Agents to try, cheapest first
+            options: Escalation checks
+            name: Agent name
+            description: Agent description
+            capabilities: Agent capabilities
+        """
+        metadata = AgentMetadata(
+            name=name,
+            description=description,
+            capabilities=capabilities if capabilities is not None else ["chat"],
+            is_active=any(tier.metadata.is_active for tier in tiers)
+        )
+        super().__init__(metadata)
+        self.tiers = tiers
+        self.options = options
+        self._refusal = (re.compile("|".join(f"(?:{p})" for p in options.refusal_patterns), re.IGNORECASE)
+                         if options.refusal_patterns else None)
+        self._validator = load_validator(options.validator) if options.validator else None
+        self._stats: Dict[str, int] = {"requests": 0, "escalations": 0}
+        for index in range(len(tiers)):
+            self._stats[f"served_tier{index}"] = 0
+
+    def is_available(self) -> bool:
+        """Available while any tier is."""
+        return any(tier.is_available() for tier in self.tiers)
+
+    @property
+    def is_local(self) -> bool:
+        """Whether any tier runs on a local model server (used by the model warmer)."""
+        return any(getattr(tier, "is_local", False) for tier in self.tiers)
+
+    @property
+    def last_used_at(self) -> float:
+        """Last use of the least recently used local tier."""
+        return min((tier.last_used_at for tier in self.tiers if getattr(tier, "is_local", False)), default=0.0)
+
+    async def warm(self) -> None:
+        """Warm every local tier concurrently."""
+        await asyncio.gather(*(tier.warm() for tier in self.tiers if getattr(tier, "is_local", False)))
+
+    def _candidates(self) -> List[BaseAgent]:
+        candidates = [tier for tier in self.tiers if tier.is_available()]
+        # With every tier failing fast, let the last one report the error
+        return candidates or self.tiers[-1:]
+
+    def _prompt(self, message: str, final: bool) -> str:
+        if final or self.options.confidence_threshold <= 0:
+            return message
+        return message + CONFIDENCE_INSTRUCTION
+
+    @staticmethod
+    def _split_confidence(text: str) -> tuple:
+        """Remove the confidence line; returns (answer, confidence or None)."""
+        match = _CONFIDENCE_LINE.search(text)
+        if match is None:
+            return text, None
+        confidence = float(match.group(1))
+        if confidence > 1:
+            confidence /= 100.0
+        return text[:match.start()].rstrip(), confidence
+
+    def _refused(self, text: str) -> bool:
+        return self._refusal is not None and self._refusal.search(text[:_HEAD_CHARS]) is not None
+
+    async def _escalation_reason(self, message: str, text: str, confidence: Optional[float]) -> Optional[str]:
+        """Why an answer is not good enough, or None to accept it."""
+        if text.startswith("Error:"):
+            return "error" if self.options.escalate_on_error else None
+        if len(text.strip()) < self.options.min_chars:
+            return "short"
+        if self._refused(text):
+            return "refusal"
+        # A missing confidence line counts as not confident
+        if self.options.confidence_threshold > 0 and (confidence or 0.0) < self.options.confidence_threshold:
+            return "low_confidence"
+        if self._validator is not None:
+            accepted = self._validator(message, text)
+            if inspect.isawaitable(accepted):
+                accepted = await accepted
+            if not accepted:
+                return "validator"
+        return None
+
+    def _escalate(self, tier: BaseAgent, reason: str) -> None:
+        self._stats["escalations"] += 1
+        self._stats[f"escalated_{reason}"] = self._stats.get(f"escalated_{reason}", 0) + 1
+        logger.info(f"CascadeAgent '{self.metadata.name}' escalating from '{tier.metadata.name}': {reason}")
+
+    def _served(self, tier: BaseAgent) -> None:
+        self._stats[f"served_tier{self.tiers.index(tier)}"] += 1
+
+    async def process(self, message: str, context: Dict[str, Any] = None) -> str:
+        """
+        Answer with the first tier whose answer passes the checks.
+
+        Args:
+            message: User message/query
+            context: Additional context information (passed to every tier)
+
+        Returns:
+            Response text
+        """
+        self._stats["requests"] += 1
+        candidates = self._candidates()
+        for tier in candidates[:-1]:
+            text, confidence = self._split_confidence(await tier.process(self._prompt(message, False), context))
+            reason = await self._escalation_reason(message, text, confidence)
+            if reason is None:
+                self._served(tier)
+                return text
+            self._escalate(tier, reason)
+        self._served(candidates[-1])
+        return await candidates[-1].process(self._prompt(message, True), context)
+
+    async def _collect(self, tier: BaseAgent, message: str, context: Optional[Dict[str, Any]]) -> tuple:
+        """Run an intermediate tier's stream to completion; (text, confidence, early reason)."""
+        parts: List[str] = []
+        length = 0
+        head_checked = False
+        stream = tier.process_stream(self._prompt(message, False), context)
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                length += len(chunk)
+                if not head_checked and length >= _HEAD_CHARS:
+                    head_checked = True
+                    if self._refused("".join(parts)):
+                        return "", None, "refusal"
+        finally:
+            # Cancels the upstream generation when stopping early
+            await stream.aclose()
+        text, confidence = self._split_confidence("".join(parts))
+        return text, confidence, None
+
+    async def process_stream(self, message: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """
+        Stream the answer of the first tier that passes the checks.
+
+        Earlier tiers are checked before their answer is sent (as one chunk);
+        the last tier streams directly.
+
+        Args:
+            message: User message/query
+            context: Additional context information (passed to every tier)
+
+        Yields:
+            Response chunks
+        """
+        self._stats["requests"] += 1
+        candidates = self._candidates()
+        for tier in candidates[:-1]:
+            text, confidence, reason = await self._collect(tier, message, context)
+            if reason is None:
+                reason = await self._escalation_reason(message, text, confidence)
+            if reason is None:
+                self._served(tier)
+                if text:
+                    yield text
+                return
+            self._escalate(tier, reason)
+        self._served(candidates[-1])
+        async for chunk in candidates[-1].process_stream(self._prompt(message, True), context):
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cascade counters.
+
+        Returns:
+            Dictionary with requests, answers served per tier and escalations per reason
+        """
+        return dict(self._stats)
@@ -0,0 +1,232 @@
+"""Circuit breaker that fails fast while an LLM backend is down."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        """
+        Args:
+            name: Breaker name (backend URL or agent name)
+            retry_after: Seconds until the next probe is allowed
+        """
+        super().__init__(f"Backend {name} is unavailable (circuit open, retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class _Call:
+    """One guarded call; latency defaults to the time until the block exits."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.latency: Optional[float] = None
+
+    def mark_latency(self) -> None:
+        """Record latency now (e.g. at the first streamed chunk)."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started_at
+
+
+class CircuitBreaker:
+    """
+    Track failures and slow calls of a backend and stop calling it when it is down.
+
+    Closed: calls pass; the outcome of the last window calls is recorded.
+    The circuit opens when failure_threshold consecutive calls fail, or when
+    at least failure_rate of a full window fails. A call slower than
+    slow_call_seconds counts as a failure. Open: calls fail immediately
+    with CircuitOpen. After reset_timeout seconds the circuit is half-open
+    and lets up to half_open_max_calls probe calls through; it closes when
+    they succeed and reopens (with the timeout doubled, up to
+    max_reset_timeout) when one fails.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        slow_call_seconds: float = 60.0,
+        reset_timeout: float = 10.0,
+        max_reset_timeout: float = 120.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            name: Breaker name used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            failure_rate: Failure share of a full window that opens the circuit
+            window: Number of recent calls considered for the failure rate
+            slow_call_seconds: Calls slower than this count as failures (0 disables)
+            reset_timeout: Seconds the circuit stays open before probing
+            max_reset_timeout: Upper bound of the backed-off reset timeout
+            half_open_max_calls: Concurrent probe calls while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.reset_timeout = reset_timeout
+        self._outcomes: deque = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def available(self) -> bool:
+        """Whether a call would be let through now (closed, or a probe slot is free)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._retry_after() <= 0
+        return self._probes < self.half_open_max_calls
+
+    def _before_call(self) -> None:
+        if self.state == OPEN and self._retry_after() <= 0:
+            self.state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit {self.name} half-open, probing")
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+            self._stats["rejected"] += 1
+            raise CircuitOpen(self.name, self._retry_after())
+        if self.state == HALF_OPEN:
+            self._probes += 1
+        self._stats["calls"] += 1
+
+    def _open(self, reason: str) -> None:
+        if self.state == HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        logger.warning(f"Circuit {self.name} opened ({reason}), failing fast for {self.reset_timeout:.1f}s")
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a completed call.
+
+        Args:
+            latency: Call latency in seconds
+        """
+        if self.slow_call_seconds > 0 and latency > self.slow_call_seconds:
+            self._stats["slow_calls"] += 1
+            self.record_failure(f"slow call {latency:.1f}s")
+            return
+        was_probe = self.state == HALF_OPEN
+        self._consecutive_failures = 0
+        self._outcomes.append(False)
+        if was_probe:
+            self._probes = max(0, self._probes - 1)
+            self.state = CLOSED
+            self.reset_timeout = self.base_reset_timeout
+            self._outcomes.clear()
+            logger.info(f"Circuit {self.name} closed after a successful probe")
+
+    def record_failure(self, reason: str = "error") -> None:
+        """
+        Record a failed call.
+
+        Args:
+            reason: Short description for the log
+        """
+        self._stats["failures"] += 1
+        self._consecutive_failures += 1
+        self._outcomes.append(True)
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            self._open(f"probe failed: {reason}")
+        elif self.state == CLOSED:
+            failed = sum(self._outcomes)
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open(f"{self._consecutive_failures} consecutive failures, last: {reason}")
+            elif len(self._outcomes) == self._outcomes.maxlen and failed >= self.failure_rate * len(self._outcomes):
+                self._open(f"{failed}/{len(self._outcomes)} recent calls failed")
+
+    def _release_probe(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """Whether an error says the backend is unhealthy (client errors such as 400/401 do not)."""
+        status = getattr(error, "status_code", None)
+        if isinstance(status, int) and 400 <= status < 500:
+            return status in (408, 429)
+        return True
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[_Call]:
+        """
+        Run a backend call under the breaker.
+
+        Yields:
+            Call handle; mark_latency() fixes the latency early (e.g. at
+            the first streamed chunk). Exceptions in the block are recorded
+            as failures; a cancelled call (client gone, deadline passed) is
+            recorded only if it was already slower than slow_call_seconds.
+
+        Raises:
+            CircuitOpen: If the circuit is open
+        """
+        self._before_call()
+        call = _Call()
+        try:
+            yield call
+        except asyncio.CancelledError:
+            # Caller gone or deadline passed: only a call already slower than the threshold counts
+            elapsed = time.monotonic() - call.started_at
+            if call.latency is not None:
+                self.record_success(call.latency)
+            elif self.slow_call_seconds > 0 and elapsed > self.slow_call_seconds:
+                self._stats["slow_calls"] += 1
+                self.record_failure(f"cancelled after {elapsed:.1f}s without an answer")
+            else:
+                self._release_probe()
+            raise
+        except GeneratorExit:
+            # Stream abandoned by the consumer: the backend answered
+            call.mark_latency()
+            self.record_success(call.latency)
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure(f"{type(e).__name__}: {e}")
+            else:
+                call.mark_latency()
+                self.record_success(call.latency)
+            raise
+        else:
+            call.mark_latency()
+            self.record_success(call.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker counters.
+
+        Returns:
+            Dictionary with the state (0 closed, 1 half-open, 2 open) and call counts
+        """
+        return {**self._stats, "state": _STATE_CODES[self.state]}
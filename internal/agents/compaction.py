@@ -0,0 +1,249 @@
+"""Token-budgeted history compaction with incremental summarization."""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+
+# Folds older turns into an existing summary: (previous summary, turns) -> new summary
+Summarizer = Callable[[Optional[str], List[Message]], Awaitable[str]]
+
+# Per-message overhead of chat formatting (role markers, separators)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """
+    Count tokens with tiktoken when available, else estimate from length.
+
+    tiktoken needs its BPE files, which may not be downloadable on offline
+    hosts; in that case roughly four characters per token is assumed.
+    """
+
+    def __init__(self, model: str = ""):
+        """
+        Initialize token counter.
+
+        Args:
+            model: Model name used to pick the tokenizer
+        """
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+
+    def count(self, text: str) -> int:
+        """
+        Count tokens in text.
+
+        Args:
+            text: Input text
+
+        Returns:
+            Number of tokens (estimated if no tokenizer is available)
+        """
+        if not self._loaded:
+            self._load()
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count_messages(self, messages: List[Message]) -> int:
+        """
+        Count tokens of chat messages including formatting overhead.
+
+        Args:
+            messages: Role/content dicts
+
+        Returns:
+            Total number of tokens
+        """
+        return sum(self.count(msg.get("content", "")) + _MESSAGE_OVERHEAD_TOKENS for msg in messages)
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.info(f"tiktoken unavailable ({type(e).__name__}), estimating token counts from length")
+            self._encoding = None
+
+
+class HistoryCompactor:
+    """
+    Keep prompt size within a token budget.
+
+    When history plus the current message exceeds the budget, the most recent
+    turns are kept verbatim and older turns are folded into a rolling summary.
+    The next turn extends the previous summary with only the newly folded
+    turns instead of summarizing the whole conversation again. Compaction
+    folds down to recent_ratio of the budget, leaving headroom for several
+    turns before the summary has to be extended again.
+
+    Server-side sessions drop their oldest messages, so with a conversation
+    id the summary is carried forward per conversation and the last turn it
+    covers is looked up in the current history; once that turn has been
+    trimmed away the summary still stands for everything before the window.
+    Histories sent by the client have no id and are matched by a hash of
+    the history prefix the summary covers.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        token_budget: int,
+        recent_ratio: float = 0.5,
+        counter: Optional[TokenCounter] = None,
+        max_summaries: int = 1024
+    ):
+        """
+        Initialize history compactor.
+
+        Args:
+            summarize: Coroutine folding turns into a summary
+            token_budget: Maximum prompt tokens (history, summary and message)
+            recent_ratio: Share of the budget kept as verbatim recent turns after compaction
+            counter: Token counter (default: TokenCounter())
+            max_summaries: Number of remembered summaries (LRU)
+        """
+        if token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.recent_ratio = recent_ratio
+        self.counter = counter or TokenCounter()
+        self.max_summaries = max_summaries
+        # prefix hash -> (number of messages covered, summary)
+        self._summaries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        # conversation id -> (hashes of the last two covered messages, summary)
+        self._conversations: "OrderedDict[str, Tuple[Tuple[str, str], str]]" = OrderedDict()
+        self._stats = {"compactions": 0, "summary_reuses": 0, "summary_failures": 0}
+
+    async def compact(
+        self,
+        history: List[Message],
+        message: str,
+        conversation_id: Optional[str] = None
+    ) -> Tuple[Optional[str], List[Message]]:
+        """
+        Fit history into the token budget.
+
+        Args:
+            history: Conversation history (possibly trimmed by the session store)
+            message: Current user message
+            conversation_id: Stable id of the conversation, None for client-sent history
+
+        Returns:
+            (summary of older turns or None, verbatim recent turns)
+        """
+        message_tokens = self.counter.count(message) + _MESSAGE_OVERHEAD_TOKENS
+        sizes = [self.counter.count(msg.get("content", "")) + _MESSAGE_OVERHEAD_TOKENS for msg in history]
+        if sum(sizes) + message_tokens <= self.token_budget:
+            return None, history
+
+        # Reuse the latest summary if it still leaves room for the rest
+        if conversation_id:
+            prefix_hashes = None
+            covered, summary = self._carried_summary(conversation_id, history)
+        else:
+            prefix_hashes = self._prefix_hashes(history)
+            covered, summary = self._latest_summary(prefix_hashes)
+        if summary is not None:
+            total = self.counter.count(summary) + sum(sizes[covered:]) + message_tokens
+            if total <= self.token_budget:
+                self._stats["summary_reuses"] += 1
+                return summary, history[covered:]
+
+        # Fold older turns until the recent window fits its share of the budget
+        recent_budget = max(int(self.token_budget * self.recent_ratio) - message_tokens, 0)
+        split = len(history)
+        recent_tokens = 0
+        while split > covered and recent_tokens + sizes[split - 1] <= recent_budget:
+            split -= 1
+            recent_tokens += sizes[split]
+
+        if split <= covered:
+            # The recent turns alone exceed their share; nothing new to fold
+            return summary, history[covered:]
+
+        self._stats["compactions"] += 1
+        try:
+            summary = await self.summarize(summary, history[covered:split])
+        except Exception as e:
+            # Without a summary, dropping the oldest turns still bounds the prompt
+            self._stats["summary_failures"] += 1
+            logger.warning(f"History summarization failed, truncating instead: {type(e).__name__}: {e}")
+            return None, history[split:]
+
+        if conversation_id:
+            boundary = (self._message_hash(history[split - 1]),
+                        self._message_hash(history[split - 2]) if split > 1 else "")
+            self._store(self._conversations, conversation_id, (boundary, summary))
+        else:
+            self._store(self._summaries, prefix_hashes[split], (split, summary))
+        logger.debug(f"Compacted {split} of {len(history)} messages into a {len(summary)} character summary")
+        return summary, history[split:]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get compaction counters.
+
+        Returns:
+            Dictionary with compaction/reuse/failure counts and remembered summaries
+        """
+        return {**self._stats, "summaries": len(self._summaries) + len(self._conversations)}
+
+    @staticmethod
+    def _prefix_hashes(history: List[Message]) -> List[str]:
+        """Hash chain where entry i identifies history[:i]."""
+        hashes = [""]
+        digest = hashlib.sha256()
+        for msg in history:
+            digest.update(msg.get("role", "").encode("utf-8") + b"\x00")
+            digest.update(msg.get("content", "").encode("utf-8") + b"\x01")
+            hashes.append(digest.copy().hexdigest())
+        return hashes
+
+    def _latest_summary(self, prefix_hashes: List[str]) -> Tuple[int, Optional[str]]:
+        """Find the summary covering the longest prefix of this history."""
+        for covered in range(len(prefix_hashes) - 1, 0, -1):
+            entry = self._summaries.get(prefix_hashes[covered])
+            if entry is not None:
+                self._summaries.move_to_end(prefix_hashes[covered])
+                return entry
+        return 0, None
+
+    @staticmethod
+    def _message_hash(msg: Message) -> str:
+        digest = hashlib.sha256()
+        digest.update(msg.get("role", "").encode("utf-8") + b"\x00")
+        digest.update(msg.get("content", "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def _carried_summary(self, conversation_id: str, history: List[Message]) -> Tuple[int, Optional[str]]:
+        """Summary of a conversation and the number of messages of this history it covers."""
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            return 0, None
+        self._conversations.move_to_end(conversation_id)
+        (last, previous), summary = entry
+        for covered in range(len(history), 0, -1):
+            if self._message_hash(history[covered - 1]) != last:
+                continue
+            if covered == 1 or not previous or self._message_hash(history[covered - 2]) == previous:
+                return covered, summary
+        # The covered turns were trimmed away; the summary stands for everything before the window
+        return 0, summary
+
+    def _store(self, entries: "OrderedDict", key: str, value: tuple) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_summaries:
+            entries.popitem(last=False)
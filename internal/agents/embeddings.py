@@ -0,0 +1,84 @@
+"""Local deterministic text embeddings used for semantic matching."""
+
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing embedder that needs no model download or network access.
+
+    Word unigrams and character trigrams are hashed into a fixed number of
+    buckets and the resulting vector is L2-normalized, so the dot product of
+    two embeddings is their cosine similarity. The same text always produces
+    the same vector across processes (blake2b is used instead of ``hash()``).
+    """
+    
+    def __init__(self, dim: int = 512, ngram: int = 3):
+        """
+        Initialize embedder.
+        
+        Args:
+            dim: Embedding dimension (number of hash buckets)
+            ngram: Character n-gram size (0 disables character features)
+        """
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+        self.ngram = ngram
+    
+    def _features(self, text: str) -> List[str]:
+        """Extract hashed features from text."""
+        text = " ".join(text.casefold().split())
+        features = [f"w:{word}" for word in _WORD_RE.findall(text)]
+        if self.ngram > 0:
+            padded = f" {text} "
+            features.extend(
+                f"c:{padded[i:i + self.ngram]}"
+                for i in range(max(len(padded) - self.ngram + 1, 0))
+            )
+        return features
+    
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        """Map a feature to a bucket index and sign."""
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, (1.0 if (value >> 63) & 1 else -1.0)
+    
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            L2-normalized float32 vector of shape (dim,)
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+    
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts.
+        
+        Args:
+            texts: Input texts
+            
+        Returns:
+            Matrix of shape (len(texts), dim), one normalized row per text
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
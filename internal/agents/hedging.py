@@ -0,0 +1,240 @@
+"""Hedged requests: race a late request against a duplicate on another backend."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queue item kinds of a streaming attempt
+_CHUNK, _END, _ERROR = "chunk", "end", "error"
+
+
+class HedgePolicy:
+    """
+    Decide when to send a hedge and keep hedging within a budget.
+
+    The hedge delay is a percentile of recently observed latencies (time
+    to the full response for ainvoke, time to first chunk for streams),
+    so only the slow tail gets duplicated. Each primary request earns
+    budget_ratio hedge tokens (capped at max_tokens); a hedge spends one.
+    With budget_ratio=0.05, hedges add at most about 5% extra load.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget_ratio: float = 0.05,
+        min_delay_ms: float = 50.0,
+        window: int = 500,
+        min_samples: int = 20,
+        max_tokens: float = 10.0
+    ):
+        """
+        Initialize hedge policy.
+
+        Args:
+            percentile: Latency percentile used as hedge delay
+            budget_ratio: Hedges allowed per primary request
+            min_delay_ms: Lower bound on the hedge delay
+            window: Number of recent latency samples kept
+            min_samples: Samples needed before hedging starts
+            max_tokens: Maximum accumulated hedge budget (burst size)
+        """
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_delay = min_delay_ms / 1000.0
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self._samples: deque = deque(maxlen=window)
+        self._tokens = 0.0
+        self._stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "budget_exhausted": 0}
+
+    def delay(self) -> Optional[float]:
+        """Current hedge delay in seconds, or None while there are too few samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(len(ordered) * self.percentile / 100.0), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def record(self, latency: float) -> None:
+        """Add a latency sample (seconds)."""
+        self._samples.append(latency)
+
+    def start_request(self) -> None:
+        """Count a primary request and earn hedge budget."""
+        self._stats["requests"] += 1
+        self._tokens = min(self._tokens + self.budget_ratio, self.max_tokens)
+
+    def record_win(self) -> None:
+        """Count a request answered by its hedge."""
+        self._stats["hedge_wins"] += 1
+
+    def try_hedge(self) -> bool:
+        """Spend budget for one hedge; False if the budget is exhausted."""
+        if self._tokens < 1.0:
+            self._stats["budget_exhausted"] += 1
+            return False
+        self._tokens -= 1.0
+        self._stats["hedges"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters.
+
+        Returns:
+            Dictionary with request/hedge counts and the current delay
+        """
+        delay = self.delay()
+        return {**self._stats, "delay_ms": delay * 1000.0 if delay is not None else 0.0}
+
+
+async def _cancel(*tasks: Optional[asyncio.Future]) -> None:
+    tasks = [task for task in tasks if task is not None and not task.done()]
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged_call(policy: HedgePolicy, make_call: Callable[[int], Awaitable[Any]]) -> Any:
+    """
+    Run a call, adding a hedge if it is slower than the policy's delay.
+
+    A primary that fails before the delay is failed over to the hedge at
+    once. The latency of the winning attempt (from the start of the
+    request) is recorded on every path, so slow hedged calls keep the
+    delay estimate honest.
+
+    Args:
+        policy: Hedge policy
+        make_call: Starts attempt 0 (primary) or 1 (hedge), e.g. on different backends
+
+    Returns:
+        Result of the first attempt that succeeds; the other is cancelled
+    """
+    policy.start_request()
+    started = time.monotonic()
+    primary = asyncio.ensure_future(make_call(0))
+    hedge = None
+    try:
+        delay = policy.delay()
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        failed_early = bool(done) and primary.exception() is not None
+        if (not done or failed_early) and policy.try_hedge():
+            if failed_early:
+                logger.debug(f"Failing over after primary error: {primary.exception()}")
+            else:
+                logger.debug(f"Hedging request after {delay * 1000:.0f}ms")
+            hedge = asyncio.ensure_future(make_call(1))
+        pending = {primary} if hedge is None else {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.record(time.monotonic() - started)
+                    if task is hedge:
+                        policy.record_win()
+                    return task.result()
+        # Every attempt failed: report the primary's error
+        return primary.result()
+    finally:
+        await _cancel(primary, hedge)
+
+
+class _StreamAttempt:
+    """One streaming attempt, pumped by its own task into a bounded queue."""
+
+    def __init__(self, stream: AsyncIterator[Any], queue_size: int = 64):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task = asyncio.ensure_future(self._pump(stream))
+
+    async def _pump(self, stream: AsyncIterator[Any]) -> None:
+        try:
+            async for chunk in stream:
+                await self.queue.put((_CHUNK, chunk))
+            await self.queue.put((_END, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.queue.put((_ERROR, e))
+        finally:
+            # Release the backend even if cancelled while waiting on the queue
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def get(self) -> Tuple[str, Any]:
+        return await self.queue.get()
+
+
+async def hedged_stream(
+    policy: HedgePolicy,
+    make_stream: Callable[[int], AsyncIterator[Any]]
+) -> AsyncIterator[Any]:
+    """
+    Stream with a hedge on the first chunk.
+
+    If the first chunk of the primary stream is later than the policy's
+    delay, or the primary fails before it, a second stream is started;
+    whichever produces its first chunk first is streamed to the end and
+    the other is cancelled.
+
+    Args:
+        policy: Hedge policy
+        make_stream: Creates stream 0 (primary) or 1 (hedge)
+
+    Yields:
+        Chunks of the winning stream
+    """
+    policy.start_request()
+    started = time.monotonic()
+    attempts = [_StreamAttempt(make_stream(0))]
+    getters = [asyncio.ensure_future(attempts[0].get())]
+    winner = None
+    try:
+        delay = policy.delay()
+        done, _ = await asyncio.wait({getters[0]}, timeout=delay)
+        failed_early = bool(done) and getters[0].result()[0] == _ERROR
+        if (not done or failed_early) and policy.try_hedge():
+            if failed_early:
+                logger.debug(f"Failing stream over after primary error: {getters[0].result()[1]}")
+            else:
+                logger.debug(f"Hedging stream after {delay * 1000:.0f}ms without a first chunk")
+            attempts.append(_StreamAttempt(make_stream(1)))
+            getters.append(asyncio.ensure_future(attempts[1].get()))
+
+        pending = set(getters)
+        first = None
+        while first is None and pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer a successful attempt over one that failed at the same time
+            for getter in sorted(done, key=lambda g: g.result()[0] == _ERROR):
+                kind, value = getter.result()
+                index = getters.index(getter)
+                # A failed attempt loses unless it is the only one left
+                if kind != _ERROR or not pending:
+                    winner, first = index, (kind, value)
+                    break
+        if first[0] != _ERROR:
+            policy.record(time.monotonic() - started)
+            if winner == 1:
+                policy.record_win()
+
+        # Stop the loser before streaming the rest of the winner
+        for index, attempt in enumerate(attempts):
+            if index != winner:
+                await _cancel(getters[index], attempt.task)
+
+        kind, value = first
+        while kind == _CHUNK:
+            yield value
+            kind, value = await attempts[winner].get()
+        if kind == _ERROR:
+            raise value
+    finally:
+        await _cancel(*getters, *(attempt.task for attempt in attempts))
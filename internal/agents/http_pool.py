@@ -0,0 +1,247 @@
+"""Shared, instrumented httpx connection pool for LLM clients."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+
+from ..metrics.tracing import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+def _origin(url: httpx.URL) -> str:
+    return f"{url.scheme}://{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees the per-host slot when the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+def _connect_tracer(previous=None):
+    """
+    httpcore trace callback timing TCP and TLS setup as the "upstream_connect" stage.
+
+    Requests served on a pooled connection emit no connect events, so the
+    stage is only recorded when a new connection is opened.
+    """
+    started: Dict[str, float] = {}
+
+    async def trace(event: str, info: Dict[str, Any]) -> None:
+        if previous is not None:
+            await previous(event, info)
+        if not event.startswith(("connection.connect_tcp.", "connection.start_tls.")):
+            return
+        step, _, phase = event.rpartition(".")
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif step in started:
+            # Also reached on "failed", so slow unreachable hosts show up
+            observe_stage("upstream_connect", time.perf_counter() - started.pop(step))
+
+    return trace
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wrap the pooled transport with per-host limits and accounting.
+
+    A request holds its host slot until the response body is closed, which
+    for streamed completions is the end of the stream. Time spent opening
+    new connections is recorded as the "upstream_connect" stage.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, max_per_host: int = 0):
+        self._transport = transport
+        self.max_per_host = max_per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._seen_connections: set = set()
+        self.hosts: Dict[str, Dict[str, float]] = {}
+
+    def _host_stats(self, origin: str) -> Dict[str, float]:
+        stats = self.hosts.get(origin)
+        if stats is None:
+            stats = self.hosts[origin] = {
+                "requests": 0, "in_flight": 0, "waiting": 0, "slot_wait_seconds": 0.0, "errors": 0,
+            }
+        return stats
+
+    def pool_connections(self) -> list:
+        """Connections currently held by the underlying httpcore pool."""
+        pool = getattr(self._transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    def _count_new_connections(self) -> int:
+        current = {id(conn) for conn in self.pool_connections()}
+        new = len(current - self._seen_connections)
+        self._seen_connections = current
+        return new
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin = _origin(request.url)
+        stats = self._host_stats(origin)
+        semaphore = None
+        if self.max_per_host > 0:
+            semaphore = self._semaphores.get(origin)
+            if semaphore is None:
+                semaphore = self._semaphores[origin] = asyncio.Semaphore(self.max_per_host)
+            started = time.perf_counter()
+            stats["waiting"] += 1
+            try:
+                await semaphore.acquire()
+            finally:
+                stats["waiting"] -= 1
+            stats["slot_wait_seconds"] += time.perf_counter() - started
+
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        request.extensions["trace"] = _connect_tracer(request.extensions.get("trace"))
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                stats["in_flight"] -= 1
+                if semaphore is not None:
+                    semaphore.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            stats["errors"] += 1
+            release()
+            raise
+        opened = self._count_new_connections()
+        if opened:
+            stats["connections_opened"] = stats.get("connections_opened", 0) + opened
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HTTPClientPool:
+    """
+    One httpx.AsyncClient shared by every LLM client in the process.
+
+    Reusing connections across agents and requests keeps TCP/TLS setup off
+    the request path. Idle connections are kept for keepalive_expiry
+    seconds, HTTP/2 is used when the "h2" package is installed and
+    requested, and max_per_host caps concurrent requests per model server
+    independently of the global limit. warm() opens connections ahead of
+    traffic.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 1000,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 60.0,
+        max_per_host: int = 0,
+        http2: bool = False,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 600.0
+    ):
+        """
+        Initialize the shared client.
+
+        Args:
+            max_connections: Maximum open connections in total
+            max_keepalive_connections: Maximum idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept
+            max_per_host: Maximum concurrent requests per origin (0 = unlimited)
+            http2: Use HTTP/2 where the server supports it (needs the "h2" package)
+            connect_timeout: Connection setup timeout in seconds
+            read_timeout: Timeout for reads (long generations) in seconds
+        """
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._transport = _InstrumentedTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=http2),
+            max_per_host=max_per_host
+        )
+        self.limits = limits
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            follow_redirects=True
+        )
+
+    async def warm(self, base_urls: Iterable[str], connections: int = 1) -> None:
+        """
+        Open connections to model servers before the first request.
+
+        Args:
+            base_urls: OpenAI-compatible base URLs
+            connections: Concurrent connections to open per URL
+        """
+        async def touch(url: str) -> None:
+            try:
+                await self.client.get(f"{url.rstrip('/')}/models", timeout=5.0)
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not pre-connect to {url}: {e}")
+
+        urls = list(dict.fromkeys(url for url in base_urls if url))
+        if urls and connections > 0:
+            await asyncio.gather(*(touch(url) for url in urls for _ in range(connections)))
+            logger.info(f"Pre-connected to {len(urls)} model server(s)")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pool utilization.
+
+        Returns:
+            Connection counts (total, idle, active) and request counters summed
+            over hosts
+        """
+        connections = self._transport.pool_connections()
+        idle = sum(1 for conn in connections if conn.is_idle())
+        totals: Dict[str, float] = {}
+        for host_stats in self._transport.hosts.values():
+            for key, value in host_stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return {
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "max_connections": self.limits.max_connections,
+            **totals,
+        }
+
+    def host_stats(self) -> Dict[str, Dict[str, float]]:
+        """Get request counters per origin."""
+        return {origin: dict(stats) for origin, stats in self._transport.hosts.items()}
+
+    async def aclose(self) -> None:
+        """Close all connections."""
+        await self.client.aclose()
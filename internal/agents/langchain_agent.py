@@ -1,19 +1,42 @@
 """LangChain-based AI agent implementation using OpenAI."""
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional, AsyncIterator
+import time
+from typing import Dict, Any, Optional, AsyncIterator, List
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, SystemMessage
 from .base import BaseAgent, AgentMetadata
+from .cache import ResponseCache
+from .batching import MicroBatcher
+from .backend_pool import Backend, BackendPool
+from .compaction import HistoryCompactor, TokenCounter
+from .hedging import HedgePolicy, hedged_call, hedged_stream
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from ..metrics.tracing import observe_stage, add_tokens
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new turns below. Keep facts, decisions, names and open "
+    "questions; drop pleasantries. Reply with the updated summary only."
+)
+
 
 class LangChainAgent(BaseAgent):
     """LangChain-based AI agent using OpenAI's ChatOpenAI (supports local models)."""
     
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, 
-                 model_name: str = "gpt-3.5-turbo", temperature: float = 0.7):
+                 model_name: str = "gpt-3.5-turbo", temperature: float = 0.7,
+                 cache: Optional[ResponseCache] = None,
+                 batch_max_size: int = 0, batch_max_wait_ms: float = 10.0,
+                 base_urls: Optional[List[str]] = None, pool_options: Optional[Dict[str, Any]] = None,
+                 history_token_budget: int = 0, history_recent_ratio: float = 0.5,
+                 name: str = "langchain", description: Optional[str] = None,
+                 capabilities: Optional[List[str]] = None, max_tokens: Optional[int] = None,
+                 http_async_client: Any = None, hedge_options: Optional[Dict[str, Any]] = None,
+                 breaker_options: Optional[Dict[str, Any]] = None):
         """
         Initialize LangChain agent.
         
@@ -26,12 +49,39 @@ class LangChainAgent(BaseAgent):
                        For Ollama: e.g., "llama2", "mistral", "qwen"
                        For LocalAI: depends on configured models
             temperature: Model temperature (default: 0.7)
+            cache: Optional response cache consulted before calling the LLM
+            batch_max_size: Collect concurrent non-streaming calls into batches of up to
+                            this size (0 or 1 disables micro-batching)
+            batch_max_wait_ms: Maximum time a call waits for its batch to fill (milliseconds)
+            base_urls: Base URLs of several replicas serving the same model. With more than
+                       one URL, requests are load-balanced across a BackendPool. If base_url
+                       is None, the first entry is used as base_url.
+            pool_options: Extra keyword arguments for BackendPool (strategy, max_failures,
+                          probe_interval)
+            history_token_budget: Prompt token budget; older turns beyond it are folded into
+                                  a rolling summary (0 disables compaction)
+            history_recent_ratio: Share of the budget kept as verbatim recent turns
+            name: Agent name (several LangChain agents can serve different models)
+            description: Agent description used for listing and semantic routing
+            capabilities: Agent capabilities used for listing and semantic routing
+            max_tokens: Upper bound on completion tokens (None = model default)
+            http_async_client: Shared httpx.AsyncClient so agents reuse connections
+            hedge_options: Keyword arguments for HedgePolicy (percentile, budget_ratio,
+                           min_delay_ms). Slow calls are duplicated to a second replica of
+                           the backend pool; None disables hedging.
+            breaker_options: Keyword arguments for CircuitBreaker (failure_threshold,
+                             reset_timeout, ...). While the model server keeps failing,
+                             calls fail fast and the agent reports itself unavailable;
+                             None disables the breaker.
         """
         # Normalize inputs: treat empty strings as None
         api_key_original = api_key
         base_url_original = base_url
         api_key = api_key.strip() if api_key else None
         base_url = base_url.strip() if base_url else None
+        base_urls = [url.strip() for url in (base_urls or []) if url and url.strip()]
+        if base_url is None and base_urls:
+            base_url = base_urls[0]
         
         # Log normalized values for debugging
         logger.debug(f"LangChainAgent init - api_key: {'set' if api_key else 'None'}, base_url: {base_url if base_url else 'None'}")
@@ -64,13 +114,28 @@ class LangChainAgent(BaseAgent):
                 logger.warning(f"  api_key: {'set' if api_key else 'None'}, base_url: {base_url if base_url else 'None'}")
         
         metadata = AgentMetadata(
-            name="langchain",
-            description="AI agent powered by LangChain and OpenAI (supports local models)",
-            capabilities=["chat", "ai", "openai", "langchain"],
+            name=name,
+            description=description or "AI agent powered by LangChain and OpenAI (supports local models)",
+            capabilities=capabilities if capabilities is not None else ["chat", "ai", "openai", "langchain"],
             is_active=is_active
         )
         super().__init__(metadata)
         
+        self.model_name = model_name
+        self.temperature = temperature
+        self.is_local = is_local_model
+        self.last_used_at = 0.0  # Monotonic time of the last upstream call (for keep-alive)
+        self.cache = cache
+        self.batcher = None
+        self.pool = None
+        self.hedge_policy = None
+        self.breaker = None
+        self.compactor = None
+        if history_token_budget > 0:
+            self.compactor = HistoryCompactor(
+                self._summarize, history_token_budget, history_recent_ratio, TokenCounter(model_name)
+            )
+        
         if is_active:
             try:
                 # Build ChatOpenAI parameters
@@ -79,6 +144,10 @@ class LangChainAgent(BaseAgent):
                     "temperature": temperature,
                     "streaming": True  # Enable streaming for process_stream
                 }
+                if max_tokens:
+                    llm_params["max_tokens"] = max_tokens
+                if http_async_client is not None:
+                    llm_params["http_async_client"] = http_async_client
                 
                 # Set API key based on configuration type
                 if is_local_model:
@@ -99,6 +168,28 @@ class LangChainAgent(BaseAgent):
                     logger.info(f"LangChainAgent initialized with OpenAI model: {model_name}")
                 
                 self.llm = ChatOpenAI(**llm_params)
+                
+                # Load-balance across replicas when several base URLs are given
+                pool_urls = list(dict.fromkeys([base_url] + base_urls)) if is_local_model else []
+                if len(pool_urls) > 1:
+                    backends = [Backend(base_url, self.llm)]
+                    for url in pool_urls[1:]:
+                        backends.append(Backend(url, ChatOpenAI(**{**llm_params, "base_url": url})))
+                    self.pool = BackendPool(backends, http_client=http_async_client, **(pool_options or {}))
+                    logger.info(f"LangChainAgent backend pool: {pool_urls} (strategy={self.pool.strategy})")
+                    if hedge_options is not None:
+                        self.hedge_policy = HedgePolicy(**hedge_options)
+                        logger.info(f"LangChainAgent hedged requests enabled ({hedge_options})")
+                elif hedge_options is not None:
+                    logger.warning("LangChainAgent hedging needs several base URLs, hedging disabled")
+                
+                if breaker_options is not None:
+                    self.breaker = CircuitBreaker(f"{name}@{base_url or 'openai'}", **breaker_options)
+                
+                if batch_max_size > 1:
+                    self.batcher = MicroBatcher(self._dispatch_batch, batch_max_size, batch_max_wait_ms)
+                    logger.info(f"LangChainAgent micro-batching enabled (max_batch_size={batch_max_size}, "
+                                f"max_wait_ms={batch_max_wait_ms})")
             except Exception as e:
                 logger.error(f"Failed to initialize LangChainAgent: {e}", exc_info=True)
                 # Disable agent if initialization fails
@@ -114,6 +205,225 @@ class LangChainAgent(BaseAgent):
                 "base_url_value": base_url if base_url else "None"
             }
     
+    @staticmethod
+    def _get_history(context: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Extract conversation history from context.
+        
+        Args:
+            context: Request context (may contain "messages")
+            
+        Returns:
+            List of role/content dicts for user and assistant turns
+        """
+        history = []
+        if context and "messages" in context:
+            for msg in context.get("messages", []):
+                if isinstance(msg, dict):
+                    role = msg.get("role", "")
+                    if role in ("user", "assistant"):
+                        history.append({"role": role, "content": msg.get("content", "")})
+        return history
+    
+    @staticmethod
+    def _build_messages(message: str, history: List[Dict[str, str]],
+                        summary: Optional[str] = None) -> List[BaseMessage]:
+        """
+        Build LangChain messages from history and the current message.
+        
+        Args:
+            message: Current user message
+            history: Conversation history from _get_history()
+            summary: Summary of turns older than history (optional)
+            
+        Returns:
+            Messages to send to the LLM
+        """
+        messages: List[BaseMessage] = []
+        if summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        for msg in history:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            else:
+                messages.append(AIMessage(content=msg["content"]))
+        
+        # Add current user message
+        messages.append(HumanMessage(content=message))
+        return messages
+    
+    async def _prepare_messages(self, message: str, history: List[Dict[str, str]],
+                                context: Optional[Dict[str, Any]] = None) -> List[BaseMessage]:
+        """Compact history to the token budget (if enabled) and build LLM messages."""
+        summary = None
+        if self.compactor is not None:
+            conversation_id = (context or {}).get("conversation_id")
+            summary, history = await self.compactor.compact(history, message, conversation_id)
+        return self._build_messages(message, history, summary)
+    
+    async def _summarize(self, summary: Optional[str], turns: List[Dict[str, str]]) -> str:
+        """
+        Fold conversation turns into the running summary.
+        
+        Args:
+            summary: Current summary (None for the first compaction)
+            turns: Turns to fold in, oldest first
+            
+        Returns:
+            Updated summary
+        """
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        prompt = f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+        response = await self._invoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=prompt)])
+        return response.content if hasattr(response, 'content') else str(response)
+    
+    async def _invoke(self, messages: List[BaseMessage], context: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Run a non-streaming LLM call, through the micro-batcher if enabled.
+        
+        Args:
+            messages: Messages to send to the LLM
+            context: Request context ("user_id" is used for batch fairness)
+            
+        Returns:
+            LLM response message
+        """
+        started = time.perf_counter()
+        self.last_used_at = time.monotonic()
+        if self.breaker is None:
+            response = await self._invoke_upstream(messages, context)
+        else:
+            async with self.breaker.guard():
+                response = await self._invoke_upstream(messages, context)
+        observe_stage("upstream_total", time.perf_counter() - started)
+        add_tokens(self._count_output_tokens(response))
+        return response
+    
+    async def _invoke_upstream(self, messages: List[BaseMessage], context: Optional[Dict[str, Any]]) -> Any:
+        """Send a non-streaming call through the batcher, the backend pool or the single client."""
+        if self.batcher is not None:
+            user_id = str((context or {}).get("user_id", ""))
+            return await self.batcher.submit(messages, user_id)
+        if self.pool is None:
+            return await self.llm.ainvoke(messages)
+        if self.hedge_policy is not None:
+            return await self._invoke_hedged(messages)
+        async with self.pool.acquire() as lease:
+            return await lease.backend.client.ainvoke(messages)
+    
+    async def _invoke_hedged(self, messages: List[BaseMessage]) -> Any:
+        """Pooled call, duplicated to another backend if it is slower than the hedge delay."""
+        tried: List[Backend] = []
+        
+        async def attempt(index: int) -> Any:
+            async with self.pool.acquire(exclude=tried) as lease:
+                tried.append(lease.backend)
+                return await lease.backend.client.ainvoke(messages)
+        
+        return await hedged_call(self.hedge_policy, attempt)
+    
+    @staticmethod
+    def _count_output_tokens(response: Any) -> int:
+        """Completion tokens of a response (reported usage, else estimated from length)."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("output_tokens"):
+            return int(usage["output_tokens"])
+        content = response.content if hasattr(response, "content") else str(response)
+        return (len(content) + 3) // 4 if isinstance(content, str) else 0
+    
+    async def _dispatch_batch(self, batch: List[List[BaseMessage]]) -> List[Any]:
+        """Send a batch of message lists to the LLM, one result or exception per input."""
+        if self.pool is None:
+            return await self.llm.abatch(batch, return_exceptions=True)
+        async with self.pool.acquire() as lease:
+            results = await lease.backend.client.abatch(batch, return_exceptions=True)
+            # A backend that failed every prompt of the batch counts as failed
+            lease.failed = all(isinstance(result, Exception) for result in results)
+            return results
+    
+    async def _astream(self, messages: List[BaseMessage]) -> AsyncIterator[Any]:
+        """
+        Stream an LLM call, recording time to first token and generated tokens.
+        
+        Args:
+            messages: Messages to send to the LLM
+            
+        Yields:
+            LLM response chunks
+        """
+        started = time.perf_counter()
+        self.last_used_at = time.monotonic()
+        first = True
+        tokens = 0
+        try:
+            async for chunk in self._astream_upstream(messages):
+                if first:
+                    observe_stage("upstream_first_token", time.perf_counter() - started)
+                    first = False
+                if getattr(chunk, "content", None):
+                    # Streamed chunks carry about one token each
+                    tokens += 1
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info(f"LangChainAgent upstream stream aborted after {tokens} chunks")
+            raise
+        finally:
+            observe_stage("upstream_total", time.perf_counter() - started)
+            add_tokens(tokens)
+    
+    async def _astream_upstream(self, messages: List[BaseMessage]) -> AsyncIterator[Any]:
+        """Stream an LLM call under the circuit breaker (if enabled)."""
+        if self.breaker is None:
+            async for chunk in self._astream_backends(messages):
+                yield chunk
+            return
+        async with self.breaker.guard() as call:
+            async for chunk in self._astream_backends(messages):
+                # A slow first chunk counts against the backend, a long generation does not
+                call.mark_latency()
+                yield chunk
+    
+    async def _astream_backends(self, messages: List[BaseMessage]) -> AsyncIterator[Any]:
+        """Stream an LLM call, through the backend pool if configured."""
+        if self.pool is None:
+            async for chunk in self.llm.astream(messages):
+                yield chunk
+            return
+        if self.hedge_policy is None:
+            async for chunk in self._astream_backend(messages, []):
+                yield chunk
+            return
+        # Hedge on the first chunk; the losing stream is cancelled
+        tried: List[Backend] = []
+        async for chunk in hedged_stream(self.hedge_policy, lambda index: self._astream_backend(messages, tried)):
+            yield chunk
+    
+    async def _astream_backend(self, messages: List[BaseMessage], tried: List[Backend]) -> AsyncIterator[Any]:
+        """Stream from one pool backend not in tried, adding it to tried."""
+        async with self.pool.acquire(exclude=tried) as lease:
+            tried.append(lease.backend)
+            async for chunk in lease.backend.client.astream(messages):
+                # Balance on time to first chunk, not on generation length
+                lease.mark_latency()
+                yield chunk
+    
+    async def warm(self) -> None:
+        """
+        Load the model on every backend with a one-token completion.
+        
+        Local servers load a model on its first request and unload it when idle;
+        this moves that cost off user requests. The circuit breaker is bypassed
+        so a server that is still starting does not open the circuit.
+        """
+        clients = [backend.client for backend in self.pool.backends] if self.pool is not None else [self.llm]
+        probe = [HumanMessage(content="hi")]
+        await asyncio.gather(*(client.ainvoke(probe, max_tokens=1) for client in clients))
+        self.last_used_at = time.monotonic()
+    
+    def is_available(self) -> bool:
+        """Active and, with a circuit breaker, not currently failing fast."""
+        return self.metadata.is_active and (self.breaker is None or self.breaker.available())
+    
     async def process(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Process a user message and return AI response.
@@ -139,32 +449,33 @@ class LangChainAgent(BaseAgent):
         try:
             logger.info(f"LangChainAgent processing: {message[:100]}...")
             
-            # Build messages from context if available
-            messages = []
+            history = self._get_history(context)
             
-            # Add conversation history from context if present
-            if context and "messages" in context:
-                history = context.get("messages", [])
-                for msg in history:
-                    if isinstance(msg, dict):
-                        role = msg.get("role", "")
-                        content = msg.get("content", "")
-                        if role == "user":
-                            messages.append(HumanMessage(content=content))
-                        elif role == "assistant":
-                            messages.append(AIMessage(content=content))
+            # Serve from cache if possible
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(self.model_name, self.temperature, history, message)
+                cached = self.cache.get(cache_key, message)
+                if cached is not None:
+                    logger.info(f"LangChainAgent cache hit: {len(cached)} characters")
+                    return cached
             
-            # Add current user message
-            messages.append(HumanMessage(content=message))
+            messages = await self._prepare_messages(message, history, context)
             
             # Get response from LLM
-            response = await self.llm.ainvoke(messages)
+            response = await self._invoke(messages, context)
             
             # Extract content from response
             response_text = response.content if hasattr(response, 'content') else str(response)
             
             logger.info(f"LangChainAgent response generated: {len(response_text)} characters")
+            if cache_key is not None and response_text:
+                self.cache.put(cache_key, response_text, message)
             return response_text
+        
+        except CircuitOpen as e:
+            logger.warning(f"LangChainAgent.process failed fast: {e}")
+            return f"Error: {e}"
             
         except Exception as e:
             error_msg = str(e)
@@ -215,30 +526,38 @@ class LangChainAgent(BaseAgent):
         try:
             logger.info(f"LangChainAgent processing stream: {message[:100]}...")
             
-            # Build messages from context if available
-            messages = []
+            history = self._get_history(context)
             
-            # Add conversation history from context if present
-            if context and "messages" in context:
-                history = context.get("messages", [])
-                for msg in history:
-                    if isinstance(msg, dict):
-                        role = msg.get("role", "")
-                        content = msg.get("content", "")
-                        if role == "user":
-                            messages.append(HumanMessage(content=content))
-                        elif role == "assistant":
-                            messages.append(AIMessage(content=content))
+            # Replay cached answer as chunks if possible
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(self.model_name, self.temperature, history, message)
+                cached = self.cache.get(cache_key, message)
+                if cached is not None:
+                    logger.info(f"LangChainAgent stream cache hit: {len(cached)} characters")
+                    for chunk_text in self.cache.iter_chunks(cached):
+                        yield chunk_text
+                    return
             
-            # Add current user message
-            messages.append(HumanMessage(content=message))
+            messages = await self._prepare_messages(message, history, context)
             
             # Stream responses from LLM
-            async for chunk in self.llm.astream(messages):
+            parts = []
+            async for chunk in self._astream(messages):
                 # Extract content from chunk
                 chunk_text = chunk.content if hasattr(chunk, 'content') else str(chunk)
                 if chunk_text:
+                    if cache_key is not None:
+                        parts.append(chunk_text)
                     yield chunk_text
+            
+            # Only complete streams are cached
+            if cache_key is not None and parts:
+                self.cache.put(cache_key, "".join(parts), message)
+        
+        except CircuitOpen as e:
+            logger.warning(f"LangChainAgent.process_stream failed fast: {e}")
+            yield f"Error: {e}"
                     
         except Exception as e:
             error_msg = str(e)
@@ -0,0 +1,99 @@
+"""Agents whose heavy imports and clients are built on first use."""
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
+
+from .base import BaseAgent, AgentMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class LazyAgent(BaseAgent):
+    """
+    Placeholder registered in place of an expensive agent.
+
+    The metadata is known up front, so listing, routing and the capability
+    index work before the agent exists. The real agent is built on the
+    first call, or earlier by load() (e.g. in the background once the
+    server is listening). Heavy modules are imported in a worker thread so
+    the event loop keeps serving meanwhile; the agent itself is constructed
+    on the loop because it may create asyncio primitives.
+    """
+
+    def __init__(
+        self,
+        metadata: AgentMetadata,
+        factory: Callable[[], BaseAgent],
+        modules: Sequence[str] = (),
+        on_load: Optional[Callable[[BaseAgent, float], None]] = None
+    ):
+        """
+        Initialize lazy agent.
+
+        Args:
+            metadata: Metadata of the agent the factory will build
+            factory: Builds the real agent
+            modules: Modules to import (off the event loop) before calling the factory
+            on_load: Called with the built agent and the load time in seconds
+        """
+        super().__init__(metadata)
+        self.factory = factory
+        self.modules = tuple(modules)
+        self.on_load = on_load
+        self._agent: Optional[BaseAgent] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def loaded(self) -> bool:
+        """True once the real agent has been built."""
+        return self._agent is not None
+
+    @property
+    def agent(self) -> Optional[BaseAgent]:
+        """The real agent, or None before it is loaded."""
+        return self._agent
+
+    async def load(self) -> BaseAgent:
+        """
+        Build the real agent (once; concurrent callers share the load).
+
+        Returns:
+            The real agent
+        """
+        if self._agent is not None:
+            return self._agent
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._agent is not None:
+                return self._agent
+            started = time.perf_counter()
+            for module in self.modules:
+                await asyncio.to_thread(importlib.import_module, module)
+            agent = self.factory()
+            elapsed = time.perf_counter() - started
+            # Routing uses the metadata, so adopt the real availability
+            self.metadata = agent.metadata
+            self._agent = agent
+            logger.info(f"Loaded agent '{agent.metadata.name}' in {elapsed * 1000:.0f}ms")
+            if self.on_load is not None:
+                self.on_load(agent, elapsed)
+            return agent
+
+    def is_available(self) -> bool:
+        """Check if agent is available (declared availability until loaded)."""
+        if self._agent is not None:
+            return self._agent.is_available()
+        return self.metadata.is_active
+
+    async def process(self, message: str, context: Dict[str, Any] = None) -> str:
+        agent = await self.load()
+        return await agent.process(message, context)
+
+    async def process_stream(self, message: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        agent = await self.load()
+        async for chunk in agent.process_stream(message, context):
+            yield chunk
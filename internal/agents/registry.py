@@ -3,6 +3,8 @@
 from typing import Dict, Optional, List
 import logging
 from .base import BaseAgent, AgentMetadata
+from .capability_index import CapabilityIndex
+from .lazy import LazyAgent
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +12,19 @@ logger = logging.getLogger(__name__)
 class AgentRegistry:
     """Registry for managing AI agents."""
     
-    def __init__(self):
+    def __init__(self, capability_index: Optional[CapabilityIndex] = None,
+                 default_agent: Optional[str] = None):
+        """
+        Initialize registry.
+        
+        Args:
+            capability_index: Optional index that embeds agents at registration
+                              for semantic routing
+            default_agent: Name of the preferred fallback agent (optional)
+        """
         self._agents: Dict[str, BaseAgent] = {}
+        self.capability_index = capability_index
+        self.default_agent = default_agent
     
     def register(self, agent: BaseAgent) -> None:
         """
@@ -25,6 +38,8 @@ class AgentRegistry:
             logger.warning(f"Agent '{name}' already registered, overwriting")
         
         self._agents[name] = agent
+        if self.capability_index is not None:
+            self.capability_index.add(agent.metadata)
         logger.info(f"Registered agent: {name} - {agent.metadata.description}")
     
     def unregister(self, name: str) -> bool:
@@ -39,6 +54,8 @@ class AgentRegistry:
         """
         if name in self._agents:
             del self._agents[name]
+            if self.capability_index is not None:
+                self.capability_index.remove(name)
             logger.info(f"Unregistered agent: {name}")
             return True
         return False
@@ -77,13 +94,42 @@ class AgentRegistry:
             if agent.is_available()
         ]
     
+    def has_unavailable(self, name: Optional[str] = None) -> bool:
+        """
+        Check whether active agents are temporarily unavailable (e.g. circuit open).
+        
+        Args:
+            name: Agent to check (None checks all agents)
+            
+        Returns:
+            True if the agent, or without a name any agent, is active but not available
+        """
+        if name:
+            agents = [self._agents[name]] if name in self._agents else []
+        else:
+            agents = list(self._agents.values())
+        return any(agent.metadata.is_active and not agent.is_available() for agent in agents)
+    
+    async def load_lazy_agents(self) -> None:
+        """Build all lazily registered agents that are not loaded yet."""
+        for name, agent in list(self._agents.items()):
+            if isinstance(agent, LazyAgent) and not agent.loaded:
+                try:
+                    await agent.load()
+                except Exception as e:
+                    logger.error(f"Failed to load agent '{name}': {e}", exc_info=True)
+    
     def get_default_agent(self) -> Optional[BaseAgent]:
         """
-        Get the default agent (first active agent).
+        Get the default agent (the configured one if available, else the first active agent).
         
         Returns:
             Default agent or None if no agents available
         """
+        if self.default_agent:
+            agent = self._agents.get(self.default_agent)
+            if agent and agent.is_available():
+                return agent
         for agent in self._agents.values():
             if agent.is_available():
                 return agent
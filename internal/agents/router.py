@@ -1,36 +1,78 @@
 """Router for selecting appropriate agent based on request."""
 
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 import logging
+import time
 from .base import BaseAgent
 from .registry import AgentRegistry
+from .rules import RuleEngine
+from ..metrics.tracing import observe_stage
 
 logger = logging.getLogger(__name__)
 
 
 class AgentRouter:
     """Router for selecting agents based on routing strategy."""
-    
-    def __init__(self, registry: AgentRegistry):
+
+    def __init__(
+        self,
+        registry: AgentRegistry,
+        strategy: str = "default",
+        semantic_min_score: float = 0.1,
+        route_cache_size: int = 4096,
+        rules: Optional[RuleEngine] = None
+    ):
+        """
+        Initialize router.
+
+        Args:
+            registry: Agent registry
+            strategy: Routing strategy, "default" or "semantic"
+            semantic_min_score: Minimum cosine similarity for a semantic match
+            route_cache_size: Number of memoized semantic routing decisions
+            rules: Keyword/regex/context rules tried before the strategy (optional)
+        """
+        if strategy not in ("default", "semantic"):
+            raise ValueError(f"Unknown routing strategy: {strategy}")
         self.registry = registry
-    
+        self.strategy = strategy
+        self.semantic_min_score = semantic_min_score
+        self.route_cache_size = route_cache_size
+        self.rules = rules
+        # (index version, normalized message) -> ranked agent names
+        self._route_cache: "OrderedDict[Tuple[int, str], Tuple[str, ...]]" = OrderedDict()
+
     async def route(
-        self, 
-        message: str, 
+        self,
+        message: str,
         context: Dict[str, Any] = None,
         explicit_agent: Optional[str] = None
     ) -> Optional[BaseAgent]:
         """
         Route a message to an appropriate agent.
-        
+
         Args:
             message: User message
             context: Additional context
             explicit_agent: Explicitly specified agent name (optional)
-            
+
         Returns:
             Selected agent or None if no suitable agent found
         """
+        started = time.perf_counter()
+        try:
+            return await self._route(message, context, explicit_agent)
+        finally:
+            observe_stage("routing", time.perf_counter() - started)
+
+    async def _route(
+        self,
+        message: str,
+        context: Dict[str, Any] = None,
+        explicit_agent: Optional[str] = None
+    ) -> Optional[BaseAgent]:
+        """Select an agent: explicit name, then routing rules, then strategy, then default agent."""
         # If agent is explicitly specified, use it
         if explicit_agent:
             agent = self.registry.get(explicit_agent)
@@ -39,36 +81,85 @@ class AgentRouter:
                 return agent
             else:
                 logger.warning(f"Explicitly specified agent '{explicit_agent}' not found or unavailable")
-        
-        # Simple routing strategy: use default agent for now
-        # TODO: Implement semantic routing or rule-based routing
+
+        if self.rules is not None:
+            rule = self.rules.select(message, context, self._agent_available)
+            if rule:
+                logger.info(f"Routing to agent '{rule.agent}' by rule '{rule.name}'")
+                return self.registry.get(rule.agent)
+
+        if self.strategy == "semantic":
+            agent = self._select_semantic(message)
+            if agent:
+                return agent
+
         agent = self.registry.get_default_agent()
         if agent:
             logger.info(f"Routing to default agent: {agent.metadata.name}")
             return agent
-        
+
         logger.error("No available agent found")
         return None
-    
+
+    def _agent_available(self, name: str) -> bool:
+        agent = self.registry.get(name)
+        return agent is not None and agent.is_available()
+
     async def route_semantic(
         self,
         message: str,
         context: Dict[str, Any] = None
     ) -> Optional[BaseAgent]:
         """
-        Route using semantic similarity (to be implemented).
-        
-        This would use embeddings to find the most suitable agent
-        based on the message content and agent capabilities.
-        
+        Route using semantic similarity.
+
+        Uses the registry's capability index to find the agent whose
+        description and capabilities are most similar to the message,
+        falling back to default routing when nothing matches.
+
         Args:
             message: User message
             context: Additional context
-            
+
         Returns:
             Selected agent or None
         """
-        # TODO: Implement semantic routing using embeddings
-        # For now, fall back to default routing
+        agent = self._select_semantic(message)
+        if agent:
+            return agent
         return await self.route(message, context)
 
+    def _select_semantic(self, message: str) -> Optional[BaseAgent]:
+        """
+        Pick the best available agent by embedding similarity.
+
+        Args:
+            message: User message
+
+        Returns:
+            Best matching available agent or None
+        """
+        index = self.registry.capability_index
+        if index is None or len(index) == 0:
+            return None
+
+        cache_key = (index.version, " ".join(message.split()).casefold())
+        ranked = self._route_cache.get(cache_key)
+        if ranked is None:
+            ranked = tuple(
+                name for name, score in index.rank(message)
+                if score >= self.semantic_min_score
+            )
+            self._route_cache[cache_key] = ranked
+            if len(self._route_cache) > self.route_cache_size:
+                self._route_cache.popitem(last=False)
+        else:
+            self._route_cache.move_to_end(cache_key)
+
+        # Availability can change between calls, so it is checked per request
+        for name in ranked:
+            agent = self.registry.get(name)
+            if agent and agent.is_available():
+                logger.info(f"Routing to semantically matched agent: {name}")
+                return agent
+        return None
@@ -0,0 +1,221 @@
+"""Deterministic routing rules compiled into a single multi-pattern regex."""
+
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+# Numbered backreference such as \1 (an escaped backslash before it does not count)
+_BACKREFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+
+
+class RoutingRule(BaseModel):
+    """
+    One rule of the "routing_rules" section of the agents file.
+
+    A rule matches when any of its keywords or patterns occurs in the
+    message (rules without either match every message) and every context
+    condition holds. Keywords match case-insensitively anywhere in the
+    message, which also suits languages written without spaces; use a
+    pattern such as "\\bcode\\b" for whole words.
+    """
+    agent: str
+    name: Optional[str] = None  # Defaults to "rule<N>"
+    priority: int = 0  # Higher wins; equal priorities keep file order
+    keywords: List[str] = []
+    patterns: List[str] = []  # Regular expressions, matched case-insensitively
+    # Context key -> required value, a list of accepted values, or "*" for any value
+    context: Dict[str, Union[str, List[str]]] = Field(default_factory=dict)
+
+    @field_validator("patterns")
+    @classmethod
+    def check_patterns(cls, v):
+        for pattern in v:
+            try:
+                compiled = re.compile(pattern)
+                # Each pattern becomes a lookahead group of the engine's combined regex
+                re.compile(f"(?=(?P<p>{pattern}))?")
+            except re.error as e:
+                hint = " (use a scoped flag such as (?s:...) instead)" if "global flags" in str(e) else ""
+                raise ValueError(f"pattern {pattern!r} cannot be combined with other rules: {e}{hint}")
+            if compiled.groupindex or _BACKREFERENCE.search(pattern):
+                # Group names and numbers change once the patterns are combined
+                raise ValueError(f"pattern {pattern!r} uses named groups or backreferences, which are not supported")
+        return v
+
+    def context_matches(self, context: Dict[str, Any]) -> bool:
+        """Whether all context conditions hold."""
+        for key, expected in self.context.items():
+            if key not in context:
+                return False
+            if expected == "*":
+                continue
+            accepted = expected if isinstance(expected, list) else [expected]
+            if str(context[key]) not in accepted:
+                return False
+        return True
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Regex matching any of the words, shaped like their prefix tree so each position costs one walk."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy: the longest keyword at a position is reported, its prefixes are resolved by lookup
+        return f"(?:{body})?" if ends else body
+
+    return build(trie)
+
+
+class RuleEngine:
+    """
+    Route messages by keyword, regex and context rules.
+
+    All keywords are compiled into one prefix-tree regex and every pattern
+    into a lookahead group of the same regex, so a message is scanned once
+    however many keyword rules there are. Each position reports the longest
+    keyword found there; the rules of the keywords that are its prefixes are
+    credited through a lookup table, so overlapping keywords are never lost.
+    Matching rules are then tried in priority order; the first whose context
+    conditions hold and whose agent is available wins.
+    """
+
+    def __init__(self, rules: List[RoutingRule]):
+        """
+        Compile the rules.
+
+        Args:
+            rules: Rules in file order
+        """
+        for index, rule in enumerate(rules):
+            if rule.name is None:
+                rule.name = f"rule{index}"
+        names = [rule.name for rule in rules]
+        duplicates = sorted(set(name for name in names if names.count(name) > 1))
+        if duplicates:
+            raise ValueError(f"Duplicate routing rule names: {duplicates}")
+        # Priority order; sorted() is stable, so ties keep file order
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.hits: Dict[str, int] = {rule.name: 0 for rule in self.rules}
+        self._stats = {"evaluations": 0, "matched": 0, "unmatched": 0}
+
+        # Keyword (lowercase) -> ranks of the rules listing it or one of its prefixes
+        own: Dict[str, Set[int]] = {}
+        self._catch_all: List[int] = []
+        groups = []
+        self._pattern_ranks: Dict[str, int] = {}
+        for rank, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                if keyword:
+                    own.setdefault(keyword.lower(), set()).add(rank)
+            for number, pattern in enumerate(rule.patterns):
+                group = f"p{rank}_{number}"
+                self._pattern_ranks[group] = rank
+                groups.append(f"(?=(?P<{group}>{pattern}))?")
+            if not rule.keywords and not rule.patterns:
+                self._catch_all.append(rank)
+        self._keyword_ranks = {
+            keyword: set().union(*(own[keyword[:end]] for end in range(1, len(keyword) + 1)
+                                   if keyword[:end] in own))
+            for keyword in own
+        }
+        if own:
+            groups.insert(0, f"(?=(?P<kw>{_trie_regex(list(own))}))?")
+        # Only stop at positions where some group matched
+        names = (["kw"] if own else []) + list(self._pattern_ranks)
+        condition = "(?!)"
+        for name in reversed(names):
+            condition = f"(?({name})|{condition})"
+        self._regex = re.compile("".join(groups) + condition, re.IGNORECASE) if names else None
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> Optional["RuleEngine"]:
+        """
+        Build the engine from the "routing_rules" section of an agents file.
+
+        Returns:
+            The engine, or None if the section is absent or empty
+        """
+        entries = document.get("routing_rules") or []
+        if not entries:
+            return None
+        rules = []
+        for index, entry in enumerate(entries):
+            try:
+                rules.append(RoutingRule(**entry))
+            except ValidationError as e:
+                raise ValueError(f"Invalid routing rule '{entry.get('name') or f'rule{index}'}': {e}") from None
+        engine = cls(rules)
+        logger.info(f"Loaded {len(engine.rules)} routing rules")
+        return engine
+
+    def match(self, message: str) -> List[RoutingRule]:
+        """
+        Rules whose keywords or patterns occur in the message, in priority order.
+
+        Args:
+            message: User message
+
+        Returns:
+            Matching rules (context conditions are not checked)
+        """
+        ranks = set(self._catch_all)
+        if self._regex is not None:
+            for found in self._regex.finditer(message):
+                for name, text in found.groupdict().items():
+                    if text is None:
+                        continue
+                    if name == "kw":
+                        ranks |= self._keyword_ranks.get(text.lower(), set())
+                    else:
+                        ranks.add(self._pattern_ranks[name])
+        return [self.rules[rank] for rank in sorted(ranks)]
+
+    def select(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]],
+        is_available: Callable[[str], bool]
+    ) -> Optional[RoutingRule]:
+        """
+        Pick the rule that routes a message and count the hit.
+
+        Args:
+            message: User message
+            context: Request context
+            is_available: Called with an agent name, True if the agent can take the request
+
+        Returns:
+            The winning rule, or None
+        """
+        self._stats["evaluations"] += 1
+        context = context or {}
+        for rule in self.match(message):
+            if rule.context_matches(context) and is_available(rule.agent):
+                self.hits[rule.name] += 1
+                self._stats["matched"] += 1
+                return rule
+        self._stats["unmatched"] += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get rule counters.
+
+        Returns:
+            Dictionary with evaluations and matched/unmatched counts
+        """
+        return {**self._stats, "rules": len(self.rules)}
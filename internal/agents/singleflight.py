@@ -0,0 +1,200 @@
+"""Request coalescing (single-flight) for identical in-flight agent calls."""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from ..metrics.tracing import RequestTrace, add_tokens, start_shared_task
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Context keys that identify the caller rather than the prompt
+DEFAULT_IGNORED_CONTEXT_KEYS = ("user_id", "request_id", "priority", "conversation_id")
+
+
+class _Flight:
+    """State of one shared upstream call."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.trace: Optional[RequestTrace] = None  # Collects the tokens of the shared call
+        self.waiters = 0
+
+
+class _StreamFlight(_Flight):
+    """State of one shared upstream stream, buffered for fan-out."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: Optional[str] = None) -> None:
+        """Append a chunk (if any) and wake all subscribers."""
+        if chunk is not None:
+            self.chunks.append(chunk)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> None:
+        """Wait until the next publish()."""
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical requests into one upstream call.
+
+    The first caller for a key starts the upstream call as a task; callers
+    arriving while it is in flight await the same task. For streams, chunks
+    are buffered and fanned out to every subscriber, so late joiners replay
+    from the first chunk. The upstream call is cancelled only when every
+    waiter has gone away. The shared call counts its tokens on a trace of
+    its own, and every caller adds them to its request trace when it
+    leaves, so each caller is charged for the answer it received.
+    """
+
+    def __init__(self, ignored_context_keys: Iterable[str] = DEFAULT_IGNORED_CONTEXT_KEYS):
+        """
+        Initialize single-flight group.
+
+        Args:
+            ignored_context_keys: Context keys excluded from the coalescing key
+        """
+        self.ignored_context_keys = frozenset(ignored_context_keys)
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def make_key(self, agent_name: str, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the coalescing key for a request.
+
+        Args:
+            agent_name: Name of the agent handling the request
+            message: User message
+            context: Request context
+
+        Returns:
+            Key shared by requests that would produce the same upstream call
+        """
+        relevant = {
+            k: v for k, v in (context or {}).items()
+            if k not in self.ignored_context_keys
+        }
+        payload = json.dumps([agent_name, message, relevant], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key from make_key()
+            fn: Factory for the upstream coroutine
+
+        Returns:
+            Result of the shared call
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task, flight.trace = start_shared_task(fn(), "singleflight")
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            logger.debug(f"Coalesced request onto in-flight call {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            # Tokens generated so far if this caller left early
+            add_tokens(flight.trace.tokens)
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._calls, key, flight)
+                flight.task.cancel()
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Fan out one upstream stream to all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key from make_key()
+            fn: Factory for the upstream async iterator
+
+        Yields:
+            Response chunks, starting from the first chunk of the shared stream
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            flight.task, flight.trace = start_shared_task(self._pump(flight, fn), "singleflight")
+            self._streams[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._streams, key, flight))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            logger.debug(f"Coalesced stream onto in-flight call {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            index = 0
+            while True:
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            flight.waiters -= 1
+            add_tokens(flight.trace.tokens)
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with leader/coalesced counts and in-flight keys
+        """
+        return {**self._stats, "in_flight": len(self._calls) + len(self._streams)}
+
+    @staticmethod
+    async def _pump(flight: _StreamFlight, fn: Callable[[], AsyncIterator[str]]) -> None:
+        """Consume the upstream stream into the flight buffer."""
+        upstream = fn()
+        try:
+            async for chunk in upstream:
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.publish()
+            aclose = getattr(upstream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    @staticmethod
+    def _forget(flights: Dict[str, _Flight], key: str, flight: _Flight) -> None:
+        """Drop a finished flight so the next request starts a fresh call."""
+        if flights.get(key) is flight:
+            del flights[key]
@@ -0,0 +1,163 @@
+"""Model warmup and keep-alive for local model servers."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .base import BaseAgent
+from .lazy import LazyAgent
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmer:
+    """
+    Load models before traffic arrives and keep them loaded.
+
+    Local servers such as Ollama load a model on its first request (often
+    several seconds) and unload it after some idle time. warm() sends a
+    one-token completion to every backend of the given agents, retrying
+    until warmup_timeout while the server is still starting; ready is set
+    only once all of them have answered. keepalive() keeps retrying the
+    agents that did not answer in time (ready follows once they do), and
+    re-warms an agent whenever it has seen no request for keepalive_interval
+    seconds, so real traffic replaces probes. Cascade agents are warmed
+    tier by tier, so each local tier is kept loaded on its own schedule.
+    """
+
+    def __init__(self, keepalive_interval: float = 240.0, warmup_timeout: float = 300.0,
+                 retry_interval: float = 5.0):
+        """
+        Initialize warmer.
+
+        Args:
+            keepalive_interval: Idle seconds after which a model is probed (0 disables keep-alive;
+                                keep it below the server's unload time, 5 minutes for Ollama)
+            warmup_timeout: Seconds to keep retrying the initial warmup of an agent
+            retry_interval: Seconds between warmup attempts
+        """
+        self.keepalive_interval = keepalive_interval
+        self.warmup_timeout = warmup_timeout
+        self.retry_interval = retry_interval
+        self.agents: List[BaseAgent] = []
+        self.ready = asyncio.Event()
+        self._cold: List[BaseAgent] = []  # Agents whose warmup has not succeeded yet
+        self._stats: Dict[str, float] = {"warmed": 0, "failed": 0, "keepalives": 0, "warmup_seconds": 0.0}
+
+    @staticmethod
+    def _warmable(agent: BaseAgent) -> bool:
+        return agent.metadata.is_active and getattr(agent, "is_local", False) and hasattr(agent, "warm")
+
+    @classmethod
+    def _expand(cls, agent: BaseAgent) -> List[BaseAgent]:
+        """The agent itself, or the tiers of a cascade (recursively)."""
+        tiers = getattr(agent, "tiers", None)
+        if tiers is None:
+            return [agent]
+        return [leaf for tier in tiers for leaf in cls._expand(tier)]
+
+    async def warm(self, agents: Iterable[BaseAgent]) -> bool:
+        """
+        Warm all local-model agents; set ready if all of them answered.
+
+        Args:
+            agents: Registered agents (lazy agents are built first)
+
+        Returns:
+            Whether every agent is warm
+        """
+        started = time.perf_counter()
+        built = []
+        for agent in agents:
+            if isinstance(agent, LazyAgent):
+                try:
+                    agent = await agent.load()
+                except Exception as e:
+                    logger.error(f"Cannot warm agent '{agent.metadata.name}': {e}")
+                    continue
+            built.extend(self._expand(agent))
+        # A model shared by several agents is warmed once per agent object
+        unique = list({id(agent): agent for agent in built}.values())
+        self.agents = [agent for agent in unique if self._warmable(agent)]
+        try:
+            warmed = await asyncio.gather(*(self._warm_with_retry(agent) for agent in self.agents))
+        finally:
+            self._stats["warmup_seconds"] = time.perf_counter() - started
+        self._cold = [agent for agent, ok in zip(self.agents, warmed) if not ok]
+        if self.agents:
+            logger.info(f"Warmed {len(self.agents) - len(self._cold)}/{len(self.agents)} local model agents "
+                        f"in {self._stats['warmup_seconds']:.1f}s")
+        if self._cold:
+            logger.warning(f"Not ready: {len(self._cold)} local models did not load, still retrying")
+        else:
+            self.ready.set()
+        return self.ready.is_set()
+
+    async def _warm_with_retry(self, agent: BaseAgent) -> bool:
+        deadline = time.monotonic() + self.warmup_timeout
+        while True:
+            started = time.perf_counter()
+            try:
+                await agent.warm()
+                self._stats["warmed"] += 1
+                logger.info(f"Model of agent '{agent.metadata.name}' loaded in "
+                            f"{(time.perf_counter() - started) * 1000:.0f}ms")
+                return True
+            except Exception as e:
+                if time.monotonic() + self.retry_interval > deadline:
+                    self._stats["failed"] += 1
+                    logger.warning(f"Giving up warming agent '{agent.metadata.name}' for now: {e}")
+                    return False
+                logger.info(f"Warming agent '{agent.metadata.name}' failed ({e}), retrying")
+                await asyncio.sleep(self.retry_interval)
+
+    async def _warm_cold(self) -> None:
+        for agent in list(self._cold):
+            try:
+                await agent.warm()
+            except Exception as e:
+                logger.debug(f"Warming agent '{agent.metadata.name}' failed again: {e}")
+                continue
+            self._cold.remove(agent)
+            self._stats["warmed"] += 1
+            logger.info(f"Model of agent '{agent.metadata.name}' loaded")
+        if not self._cold:
+            self.ready.set()
+            logger.info("All local models loaded, ready")
+
+    async def keepalive(self) -> None:
+        """Finish the warmup of agents that missed it, then re-warm idle agents, until cancelled."""
+        while self._cold:
+            await asyncio.sleep(self.retry_interval)
+            await self._warm_cold()
+        if self.keepalive_interval <= 0:
+            return
+        check_interval = min(self.keepalive_interval / 4.0, 30.0)
+        while True:
+            await asyncio.sleep(check_interval)
+            now = time.monotonic()
+            for agent in self.agents:
+                if now - getattr(agent, "last_used_at", 0.0) < self.keepalive_interval:
+                    continue
+                try:
+                    await agent.warm()
+                    self._stats["keepalives"] += 1
+                    logger.debug(f"Keep-alive probe sent for agent '{agent.metadata.name}'")
+                except Exception as e:
+                    logger.warning(f"Keep-alive probe for agent '{agent.metadata.name}' failed: {e}")
+
+    def readyz_handler(self, query: str):
+        """MetricsServer route: 200 once every model is warm, 503 until then."""
+        if self.ready.is_set():
+            return 200, "text/plain", "ready\n"
+        return 503, "text/plain", "warming up models\n"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get warmup counters.
+
+        Returns:
+            Dictionary with warmup outcomes, keep-alive probes and readiness
+        """
+        return {**self._stats, "ready": int(self.ready.is_set()), "agents": len(self.agents), "cold": len(self._cold)}
@@ -11,22 +11,117 @@ class Config(BaseSettings):
     
     # gRPC server
     grpc_addr: str = "0.0.0.0:50051"
+    grpc_max_workers: int = 10  # Thread pool size for the gRPC server
+    grpc_max_concurrent_rpcs: Optional[int] = None  # Hard cap on in-flight RPCs (None = unlimited)
+    workers: int = 1  # Server processes sharing GRPC_ADDR via SO_REUSEPORT (1 = single process)
+    shutdown_grace_seconds: float = 5.0  # Time in-flight RPCs get to finish on SIGTERM
+    lazy_agents: bool = True  # Defer LLM library imports and client construction until after the port is bound
+    preload_agents: bool = True  # Load lazy agents in the background right after startup (else on first use)
+    
+    # Admission control (enabled when a global or per-agent limit is set)
+    max_concurrent_requests: int = 0  # Global limit on running agent calls, 0 = unlimited
+    agent_concurrency_limits: Optional[str] = None  # Per-agent limits, e.g. "langchain=8,cascade=4"
+    admission_queue_size: int = 100  # Waiting requests beyond this are rejected with RESOURCE_EXHAUSTED
+    admission_queue_timeout_seconds: float = 30.0  # Maximum time a request waits for a slot
+    
+    # Per-user rate limiting (enabled when a limit is set)
+    rate_limit_requests_per_minute: float = 0.0  # Sustained requests per user, 0 = unlimited
+    rate_limit_tokens_per_minute: float = 0.0  # Sustained LLM tokens per user, 0 = unlimited
+    rate_limit_request_burst: Optional[float] = None  # Request bucket size (default: one minute's worth)
+    rate_limit_token_burst: Optional[float] = None  # Token bucket size (default: one minute's worth)
+    rate_limit_completion_tokens_estimate: int = 256  # Completion tokens charged up front, corrected afterwards
+    rate_limit_backend: str = "memory"  # "memory" (per process) or "sqlite" (shared by local workers)
+    rate_limit_sqlite_path: str = "ratelimit.db"  # Database file (sqlite backend)
     
     # LLM configuration
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
     openai_base_url: Optional[str] = None  # Custom base URL for local models (e.g., Ollama, LocalAI)
+    openai_base_urls: Optional[str] = None  # Comma-separated replica URLs to load-balance across
     openai_model: str = "gpt-3.5-turbo"  # OpenAI model name
     openai_temperature: float = 0.7  # Model temperature
     
     # Agent configuration
+    agents_file: Optional[str] = None  # TOML/YAML/JSON file declaring agents (default: one agent from OPENAI_*)
     default_agent: Optional[str] = None
     enable_orchestration: bool = False
+    routing_strategy: str = "default"  # "default" or "semantic"
+    semantic_routing_min_score: float = 0.1  # Minimum cosine similarity for a semantic match
+    
+    # Response cache
+    response_cache_enabled: bool = False
+    response_cache_ttl_seconds: float = 300.0  # Entry lifetime, <= 0 disables expiry
+    response_cache_max_entries: int = 1024  # LRU eviction beyond this size
+    response_cache_semantic_threshold: Optional[float] = None  # Cosine similarity for near-duplicate single-turn hits at temperature 0, e.g. 0.95
+    
+    # History compaction
+    history_token_budget: int = 0  # Prompt token budget, 0 disables compaction
+    history_token_budgets: Optional[str] = None  # Per-model overrides, e.g. "llama2=3000,qwen=7000"
+    history_recent_ratio: float = 0.5  # Share of the budget kept as verbatim recent turns
+    
+    # Shared HTTP connection pool for LLM clients
+    http_max_connections: int = 1000  # Open connections in total
+    http_max_keepalive_connections: int = 100  # Idle connections kept open
+    http_keepalive_expiry_seconds: float = 60.0  # How long an idle connection is kept
+    http_max_connections_per_host: int = 0  # Concurrent requests per model server, 0 = unlimited
+    http2: bool = False  # Use HTTP/2 where supported (requires the h2 package)
+    http_connect_timeout_seconds: float = 5.0  # Connection setup timeout
+    http_prewarm_connections: int = 1  # Connections opened per model server at startup, 0 disables
+    
+    # Model warmup and keep-alive (agents with a base URL, e.g. Ollama)
+    model_warmup_enabled: bool = False  # Load local models at startup; /readyz and worker readiness wait for it
+    model_warmup_timeout_seconds: float = 50.0  # How long warmup retries a model server that is still starting
+    model_keepalive_seconds: float = 240.0  # Probe a model idle this long (below the server's unload time, 0 disables)
+    
+    # Backend pool (used when OPENAI_BASE_URLS lists several replicas)
+    backend_balancing: str = "least_outstanding"  # "least_outstanding" or "ewma"
+    backend_max_failures: int = 3  # Consecutive failures before a replica is ejected
+    backend_probe_interval_seconds: float = 10.0  # Health probe interval for ejected replicas
+    hedge_enabled: bool = False  # Duplicate slow requests to a second replica
+    hedge_percentile: float = 95.0  # Latency percentile after which a request is hedged
+    hedge_budget_ratio: float = 0.05  # Hedges allowed per request (0.05 = at most ~5% extra load)
+    hedge_min_delay_ms: float = 50.0  # Lower bound on the hedge delay
+    
+    # Circuit breaker per agent backend (fail fast while the model server is down)
+    circuit_breaker_enabled: bool = False
+    circuit_breaker_failure_threshold: int = 5  # Consecutive failures that open the circuit
+    circuit_breaker_failure_rate: float = 0.5  # Failure share of the last 20 calls that opens the circuit
+    circuit_breaker_slow_call_seconds: float = 60.0  # Calls (time to first chunk) slower than this count as failures, 0 disables
+    circuit_breaker_reset_seconds: float = 10.0  # Open time before a probe request, doubled while probes fail
+    
+    # Micro-batching of non-streaming calls
+    batch_max_size: int = 0  # Requests per batch, 0 or 1 disables batching
+    batch_max_wait_ms: float = 10.0  # Maximum time to wait for a batch to fill
+    
+    # Request coalescing
+    enable_request_coalescing: bool = False  # Share one upstream call between identical in-flight requests
+    
+    # Stream chunk coalescing (ProcessStream)
+    stream_coalesce_max_bytes: int = 0  # Merge chunks up to this many bytes per message (0 = disabled)
+    stream_coalesce_max_delay_ms: float = 20.0  # Maximum time a chunk is held back for merging
+    stream_resume_enabled: bool = False  # Buffer stream chunks so a reconnecting client can resume
+    stream_resume_max_chunks: int = 4096  # Chunks kept per stream
+    stream_resume_max_bytes: int = 64 * 1024 * 1024  # Buffered text across all streams
+    stream_resume_ttl_seconds: float = 300.0  # Lifetime of a finished stream
+    stream_resume_grace_seconds: float = 30.0  # Generation continues this long after the client disconnects
+    
+    # Session memory (history kept server-side per session_id)
+    session_store: str = "none"  # "none", "memory" or "sqlite"
+    session_ttl_seconds: float = 3600.0  # Idle sessions expire after this
+    session_max_sessions: int = 10000  # LRU eviction beyond this (memory backend)
+    session_max_messages: int = 200  # Most recent messages kept per session
+    session_sqlite_path: str = "sessions.db"  # Database file (sqlite backend)
+    
+    # Metrics
+    metrics_addr: Optional[str] = None  # HTTP address serving /metrics, e.g. "0.0.0.0:9090"
+    health_addr: Optional[str] = None  # HTTP address serving /healthz, /readyz and /startup when METRICS_ADDR is unset
     
     # Logging
     log_level: str = "INFO"
     
-    @field_validator('openai_api_key', 'anthropic_api_key', 'openai_base_url', mode='before')
+    @field_validator('openai_api_key', 'anthropic_api_key', 'openai_base_url', 'openai_base_urls',
+                     'agent_concurrency_limits', 'history_token_budgets', 'metrics_addr', 'health_addr',
+                     'agents_file', 'default_agent', 'rate_limit_request_burst', 'rate_limit_token_burst', mode='before')
     @classmethod
     def normalize_empty_string(cls, v):
         """Convert empty strings to None."""
@@ -34,6 +129,30 @@ class Config(BaseSettings):
             return None
         return v
     
+    def get_openai_base_urls(self) -> list[str]:
+        """Get the list of replica base URLs (empty if not configured)."""
+        if not self.openai_base_urls:
+            return []
+        return [url.strip() for url in self.openai_base_urls.split(",") if url.strip()]
+    
+    def get_agent_concurrency_limits(self) -> dict[str, int]:
+        """Parse AGENT_CONCURRENCY_LIMITS ("name=limit,...") into a dictionary."""
+        limits = {}
+        for item in (self.agent_concurrency_limits or "").split(","):
+            if "=" in item:
+                name, limit = item.split("=", 1)
+                limits[name.strip()] = int(limit)
+        return limits
+    
+    def get_history_token_budget(self, model: str) -> int:
+        """Get the history token budget for a model (per-model override or default)."""
+        for item in (self.history_token_budgets or "").split(","):
+            if "=" in item:
+                name, budget = item.rsplit("=", 1)
+                if name.strip() == model:
+                    return int(budget)
+        return self.history_token_budget
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,10 +1,23 @@
 """LangGraph orchestrator for multi-agent workflows."""
 
-from typing import Dict, Any, Optional, TypedDict
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Any, List, Optional, TypedDict
 import logging
 
+from ..agents.base import BaseAgent
+from ..agents.router import AgentRouter
+
 logger = logging.getLogger(__name__)
 
+# "1. ...", "2) ...", "- ...", "* ..." at the start of a line
+_LIST_ITEM_RE = re.compile(r"^\s*(?:\d+[.)、]|[-*•])\s+(.*\S)\s*$")
+# Sentence ending with a question mark (ASCII or full-width)
+_QUESTION_RE = re.compile(r"[^?？]*[?？]")
+
+# Runs one sub-task on an agent: (agent, sub-task, context) -> response
+SubtaskRunner = Callable[[BaseAgent, str, Dict[str, Any]], Awaitable[str]]
+
 
 class AgentState(TypedDict):
     """State for agent orchestration."""
@@ -12,49 +25,173 @@ class AgentState(TypedDict):
     current_agent: Optional[str]
     context: Dict[str, Any]
     response: Optional[str]
+    subtasks: list[str]
+    results: list[Dict[str, str]]
+    runner: Optional[SubtaskRunner]
+
+
+def split_subtasks(message: str, max_subtasks: int = 8, sentences: bool = False) -> List[str]:
+    """
+    Split a multi-part query into independent sub-tasks.
+
+    Only explicit list items (numbered or bulleted lines) are split by
+    default. Sub-tasks are answered without each other as context, so
+    splitting several questions in one message, or semicolon-separated
+    requests, is opt-in: "Summarize this; keep it short" is one request.
+
+    Args:
+        message: User message
+        max_subtasks: Upper bound on the number of sub-tasks
+        sentences: Also split on several questions and on semicolons
+
+    Returns:
+        Sub-tasks in order; a single-element list if the message is not multi-part
+    """
+    items = [m.group(1) for m in map(_LIST_ITEM_RE.match, message.splitlines()) if m]
+    if len(items) < 2 and sentences:
+        questions = [q.strip() for q in _QUESTION_RE.findall(message) if len(q.strip()) > 3]
+        items = questions if len(questions) >= 2 else []
+    if len(items) < 2 and sentences:
+        parts = [p.strip() for p in re.split(r"[;；]", message) if len(p.strip()) > 3]
+        items = parts if len(parts) >= 2 else []
+    if len(items) < 2:
+        return [message]
+    return items[:max_subtasks]
 
 
 class Orchestrator:
     """LangGraph orchestrator for coordinating multiple agents."""
-    
-    def __init__(self):
-        # TODO: Initialize LangGraph StateGraph
-        # from langgraph.graph import StateGraph
-        # self.graph = StateGraph(AgentState)
-        logger.info("Orchestrator initialized (LangGraph integration pending)")
-    
+
+    def __init__(self, router: Optional[AgentRouter] = None, enabled: bool = False, max_subtasks: int = 8):
+        """
+        Initialize orchestrator.
+
+        The workflow is plan -> fan_out -> reduce: the message is split into
+        sub-tasks, each sub-task is routed and processed concurrently, and the
+        answers are merged in order.
+
+        Args:
+            router: Router used to pick an agent per sub-task
+            enabled: Whether orchestration is used at all (Config.enable_orchestration)
+            max_subtasks: Upper bound on sub-tasks per message
+        """
+        self.router = router
+        self.enabled = enabled and router is not None
+        self.max_subtasks = max_subtasks
+        self._graph = None
+        logger.info(f"Orchestrator initialized (enabled={self.enabled})")
+
+    @property
+    def graph(self):
+        """Compiled workflow, built on first use (importing langgraph is slow)."""
+        if self._graph is None:
+            from langgraph.graph import StateGraph, START, END
+
+            graph = StateGraph(AgentState)
+            graph.add_node("plan", self._plan)
+            graph.add_node("fan_out", self._fan_out)
+            graph.add_node("reduce", self._reduce)
+            graph.add_edge(START, "plan")
+            graph.add_edge("plan", "fan_out")
+            graph.add_edge("fan_out", "reduce")
+            graph.add_edge("reduce", END)
+            self._graph = graph.compile()
+        return self._graph
+
     async def orchestrate(
         self,
         message: str,
-        context: Dict[str, Any] = None
+        context: Dict[str, Any] = None,
+        runner: Optional[SubtaskRunner] = None
     ) -> str:
         """
         Orchestrate multi-agent workflow.
-        
+
         Args:
             message: User message
             context: Additional context
-            
+            runner: Runs each sub-task on its agent, e.g. through admission control
+                    and request coalescing (default: agent.process)
+
         Returns:
             Final response
         """
-        # TODO: Implement LangGraph orchestration
-        # For now, return a placeholder
-        logger.info("Orchestration called (not yet implemented)")
-        return "Orchestration not yet implemented"
-    
+        state = await self.graph.ainvoke({
+            "messages": [message],
+            "current_agent": None,
+            "context": context or {},
+            "response": None,
+            "subtasks": [],
+            "results": [],
+            "runner": runner,
+        })
+        return state["response"] or ""
+
     def use_orchestration(self, message: str, context: Dict[str, Any] = None) -> bool:
         """
         Determine if orchestration should be used.
-        
+
         Args:
             message: User message
             context: Additional context
-            
+
         Returns:
             True if orchestration should be used
         """
-        # Simple heuristic: use orchestration for complex queries
-        # TODO: Implement smarter decision logic
-        return False
+        if not self.enabled:
+            return False
+        # Clients can opt out per request
+        if str((context or {}).get("orchestrate", "")).lower() in ("0", "false", "no"):
+            return False
+        return len(self._split(message, context)) > 1
+
+    def _split(self, message: str, context: Optional[Dict[str, Any]]) -> List[str]:
+        # context["orchestrate"]="sentences" also splits questions and semicolon-separated requests
+        sentences = str((context or {}).get("orchestrate", "")).lower() == "sentences"
+        return split_subtasks(message, self.max_subtasks, sentences)
+
+    async def _plan(self, state: AgentState) -> Dict[str, Any]:
+        """Split the message into sub-tasks."""
+        subtasks = self._split(state["messages"][-1], state["context"])
+        logger.info(f"Orchestration plan: {len(subtasks)} sub-tasks")
+        return {"subtasks": subtasks}
+
+    async def _fan_out(self, state: AgentState) -> Dict[str, Any]:
+        """Route and process all sub-tasks concurrently."""
+        runner = state["runner"]
+        results = await asyncio.gather(
+            *(self._run_subtask(subtask, state["context"], runner) for subtask in state["subtasks"])
+        )
+        return {"results": list(results)}
+
+    async def _run_subtask(
+        self,
+        subtask: str,
+        context: Dict[str, Any],
+        runner: Optional[SubtaskRunner]
+    ) -> Dict[str, str]:
+        """Process one sub-task with the agent the router selects for it."""
+        agent = await self.router.route(subtask, dict(context))
+        if agent is None:
+            return {"task": subtask, "agent": "", "response": "Error: No available agent found"}
+        try:
+            if runner is not None:
+                response = await runner(agent, subtask, dict(context))
+            else:
+                response = await agent.process(subtask, dict(context))
+        except Exception as e:
+            logger.error(f"Sub-task failed on agent {agent.metadata.name}: {e}", exc_info=True)
+            response = f"Error: {type(e).__name__}: {e}"
+        return {"task": subtask, "agent": agent.metadata.name, "response": response}
 
+    async def _reduce(self, state: AgentState) -> Dict[str, Any]:
+        """Merge sub-task answers into one response, in the original order."""
+        results = state["results"]
+        if len(results) == 1:
+            return {"response": results[0]["response"], "current_agent": results[0]["agent"]}
+        sections = [
+            f"{i}. {result['task']}\n{result['response']}"
+            for i, result in enumerate(results, 1)
+        ]
+        agents = sorted({result["agent"] for result in results if result["agent"]})
+        return {"response": "\n\n".join(sections), "current_agent": ",".join(agents)}
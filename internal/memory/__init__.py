@@ -0,0 +1,2 @@
+# Session memory package
+
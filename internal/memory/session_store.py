@@ -0,0 +1,303 @@
+"""Server-side conversation history keyed by user and session id."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+
+
+def parse_messages(value: Any) -> List[Message]:
+    """
+    Normalize a "messages" context value into role/content dicts.
+
+    gRPC context values are strings, so history may arrive as a JSON-encoded
+    list as well as a Python list.
+
+    Args:
+        value: List of dicts, JSON string, or None
+
+    Returns:
+        List of {"role", "content"} dicts (invalid items are dropped)
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            logger.warning("Ignoring context messages that are not valid JSON")
+            return []
+    if not isinstance(value, list):
+        return []
+    return [
+        {"role": str(msg.get("role", "")), "content": str(msg.get("content", ""))}
+        for msg in value
+        if isinstance(msg, dict)
+    ]
+
+
+class Session(NamedTuple):
+    """Stored state of a session."""
+    # Random id given when the session is created; a cleared or expired session gets a new one
+    conversation_id: str
+    messages: List[Message]
+
+
+class SessionStore(ABC):
+    """
+    Base class for session history stores.
+
+    Sessions belong to a user: the same session id sent by another user
+    refers to a different (initially empty) session.
+    """
+
+    @abstractmethod
+    async def get_session(self, user_id: str, session_id: str) -> Session:
+        """
+        Get the stored state of a session.
+
+        Args:
+            user_id: Owner of the session
+            session_id: Session identifier
+
+        Returns:
+            Conversation id ("" for unknown sessions) and messages in conversation order
+        """
+        pass
+
+    async def get_history(self, user_id: str, session_id: str) -> List[Message]:
+        """
+        Get the stored history of a session.
+
+        Args:
+            user_id: Owner of the session
+            session_id: Session identifier
+
+        Returns:
+            Messages in conversation order (empty for unknown sessions)
+        """
+        return (await self.get_session(user_id, session_id)).messages
+
+    @abstractmethod
+    async def append(self, user_id: str, session_id: str, messages: List[Message]) -> None:
+        """
+        Append messages to a session.
+
+        Args:
+            user_id: Owner of the session
+            session_id: Session identifier
+            messages: Messages to append in order
+        """
+        pass
+
+    @abstractmethod
+    async def clear(self, user_id: str, session_id: str) -> None:
+        """
+        Delete a session.
+
+        Args:
+            user_id: Owner of the session
+            session_id: Session identifier
+        """
+        pass
+
+    async def close(self) -> None:
+        """Release resources held by the store."""
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store with LRU and TTL eviction.
+
+    Sessions idle for longer than ttl_seconds expire, the least recently used
+    session is evicted beyond max_sessions, and each session keeps at most
+    max_messages of its most recent messages.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600.0, max_messages: int = 200):
+        """
+        Initialize in-memory store.
+
+        Args:
+            max_sessions: Maximum number of sessions kept
+            ttl_seconds: Idle time after which a session expires (<= 0 disables expiry)
+            max_messages: Maximum messages kept per session
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        # (user_id, session_id) -> (last access time, conversation id, messages)
+        self._sessions: "OrderedDict[Tuple[str, str], tuple[float, str, List[Message]]]" = OrderedDict()
+
+    async def get_session(self, user_id: str, session_id: str) -> Session:
+        key = (user_id, session_id)
+        entry = self._sessions.get(key)
+        if entry is None:
+            return Session("", [])
+        accessed_at, conversation_id, messages = entry
+        now = time.monotonic()
+        if self.ttl_seconds > 0 and now - accessed_at > self.ttl_seconds:
+            del self._sessions[key]
+            return Session("", [])
+        self._sessions[key] = (now, conversation_id, messages)
+        self._sessions.move_to_end(key)
+        return Session(conversation_id, list(messages))
+
+    async def append(self, user_id: str, session_id: str, messages: List[Message]) -> None:
+        if not messages:
+            return
+        key = (user_id, session_id)
+        entry = self._sessions.get(key)
+        conversation_id, history = (entry[1], entry[2]) if entry is not None else (uuid.uuid4().hex, [])
+        history.extend(messages)
+        if len(history) > self.max_messages:
+            del history[:len(history) - self.max_messages]
+        self._sessions[key] = (time.monotonic(), conversation_id, history)
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def clear(self, user_id: str, session_id: str) -> None:
+        self._sessions.pop((user_id, session_id), None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a local SQLite file.
+
+    Survives restarts and can be shared by several worker processes on the
+    same host. Blocking SQLite calls run in a worker thread.
+    """
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: float = 3600.0, max_messages: int = 200):
+        """
+        Initialize SQLite store.
+
+        Args:
+            path: Database file path
+            ttl_seconds: Idle time after which a session expires (<= 0 disables expiry)
+            max_messages: Maximum messages kept per session
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_session_messages ("
+            " user_id TEXT NOT NULL, session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,"
+            " content TEXT NOT NULL, PRIMARY KEY (user_id, session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_sessions ("
+            " user_id TEXT NOT NULL, session_id TEXT NOT NULL, conversation_id TEXT NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (user_id, session_id))"
+        )
+        self._lock = asyncio.Lock()
+
+    async def get_session(self, user_id: str, session_id: str) -> Session:
+        async with self._lock:
+            return await asyncio.to_thread(self._get_session, user_id, session_id)
+
+    async def append(self, user_id: str, session_id: str, messages: List[Message]) -> None:
+        if not messages:
+            return
+        async with self._lock:
+            await asyncio.to_thread(self._append, user_id, session_id, messages)
+
+    async def clear(self, user_id: str, session_id: str) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._clear, user_id, session_id)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    def _get_session(self, user_id: str, session_id: str) -> Session:
+        row = self._conn.execute(
+            "SELECT conversation_id, updated_at FROM user_sessions WHERE user_id = ? AND session_id = ?",
+            (user_id, session_id)
+        ).fetchone()
+        if row is None:
+            return Session("", [])
+        conversation_id, updated_at = row
+        now = time.time()
+        if self.ttl_seconds > 0 and now - updated_at > self.ttl_seconds:
+            self._clear(user_id, session_id)
+            return Session("", [])
+        self._conn.execute(
+            "UPDATE user_sessions SET updated_at = ? WHERE user_id = ? AND session_id = ?",
+            (now, user_id, session_id)
+        )
+        rows = self._conn.execute(
+            "SELECT role, content FROM user_session_messages WHERE user_id = ? AND session_id = ? ORDER BY seq",
+            (user_id, session_id)
+        ).fetchall()
+        return Session(conversation_id, [{"role": role, "content": content} for role, content in rows])
+
+    def _append(self, user_id: str, session_id: str, messages: List[Message]) -> None:
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM user_session_messages WHERE user_id = ? AND session_id = ?",
+                (user_id, session_id)
+            ).fetchone()
+            next_seq = row[0] + 1
+            self._conn.executemany(
+                "INSERT INTO user_session_messages (user_id, session_id, seq, role, content) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (user_id, session_id, next_seq + i, msg.get("role", ""), msg.get("content", ""))
+                    for i, msg in enumerate(messages)
+                ]
+            )
+            self._conn.execute(
+                "DELETE FROM user_session_messages WHERE user_id = ? AND session_id = ? AND seq < ?",
+                (user_id, session_id, next_seq + len(messages) - self.max_messages)
+            )
+            self._conn.execute(
+                "INSERT INTO user_sessions (user_id, session_id, conversation_id, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id, session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (user_id, session_id, uuid.uuid4().hex, time.time())
+            )
+
+    def _clear(self, user_id: str, session_id: str) -> None:
+        self._conn.execute(
+            "DELETE FROM user_session_messages WHERE user_id = ? AND session_id = ?", (user_id, session_id)
+        )
+        self._conn.execute("DELETE FROM user_sessions WHERE user_id = ? AND session_id = ?", (user_id, session_id))
+
+
+def create_session_store(
+    backend: str,
+    ttl_seconds: float = 3600.0,
+    max_sessions: int = 10000,
+    max_messages: int = 200,
+    sqlite_path: str = "sessions.db"
+) -> Optional[SessionStore]:
+    """
+    Create a session store from configuration.
+
+    Args:
+        backend: "none", "memory" or "sqlite"
+        ttl_seconds: Session idle expiry
+        max_sessions: Maximum sessions (memory backend)
+        max_messages: Maximum messages per session
+        sqlite_path: Database file (sqlite backend)
+
+    Returns:
+        Session store, or None when disabled
+    """
+    if backend == "memory":
+        return InMemorySessionStore(max_sessions, ttl_seconds, max_messages)
+    if backend == "sqlite":
+        return SQLiteSessionStore(sqlite_path, ttl_seconds, max_messages)
+    if backend in ("", "none"):
+        return None
+    raise ValueError(f"Unknown session store backend: {backend}")
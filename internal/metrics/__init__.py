@@ -0,0 +1,2 @@
+# Metrics package
+
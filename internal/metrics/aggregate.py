@@ -0,0 +1,78 @@
+"""Merging of Prometheus text expositions from several worker processes."""
+
+from typing import Dict, List, Tuple
+
+from .registry import _format_value
+
+
+def _split_sample(line: str) -> Tuple[str, str, str, float]:
+    """Split "name{labels} value" into (name, labels, series key, value)."""
+    series, _, value = line.rpartition(" ")
+    name, brace, labels = series.partition("{")
+    return name, (brace + labels) if brace else "", series, float(value)
+
+
+def _add_label(labels: str, name: str, value: str) -> str:
+    pair = f'{name}="{value}"'
+    return "{" + pair + "}" if not labels else "{" + pair + "," + labels[1:]
+
+
+def merge_expositions(texts: Dict[str, str]) -> str:
+    """
+    Merge per-worker metrics into one exposition.
+
+    Counters and histograms are additive, so samples with the same name
+    and labels are summed across workers. Gauges (e.g. queue lengths,
+    averages) are not, so they are kept per worker with a "worker" label.
+
+    Args:
+        texts: Worker id -> exposition text
+
+    Returns:
+        Merged exposition text
+    """
+    kinds: Dict[str, str] = {}
+    helps: Dict[str, str] = {}
+    # Family name -> series key -> value, in first-seen order
+    families: Dict[str, Dict[str, float]] = {}
+    order: List[str] = []
+
+    for worker, text in sorted(texts.items()):
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# HELP "):
+                name, _, help_text = line[len("# HELP "):].partition(" ")
+                helps.setdefault(name, help_text)
+                continue
+            if line.startswith("# TYPE "):
+                family, _, kind = line[len("# TYPE "):].partition(" ")
+                kinds.setdefault(family, kind)
+                if family not in families:
+                    families[family] = {}
+                    order.append(family)
+                continue
+            if line.startswith("#"):
+                continue
+            name, labels, series, value = _split_sample(line)
+            if family is None or not name.startswith(family):
+                # Sample without a TYPE line: treat it as its own gauge
+                family = name
+                kinds.setdefault(family, "gauge")
+                if family not in families:
+                    families[family] = {}
+                    order.append(family)
+            if kinds.get(family) == "gauge":
+                series = name + _add_label(labels, "worker", worker)
+            samples = families[family]
+            samples[series] = samples.get(series, 0.0) + value
+
+    lines = []
+    for family in order:
+        if family in helps:
+            lines.append(f"# HELP {family} {helps[family]}")
+        lines.append(f"# TYPE {family} {kinds[family]}")
+        for series, value in families[family].items():
+            lines.append(f"{series} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,208 @@
+"""Minimal Prometheus-style metrics (counters, histograms) with text exposition."""
+
+import bisect
+import logging
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from sub-millisecond routing to multi-second generations
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            amount: Non-negative increment
+            labels: Label values in label_names order
+        """
+        key = tuple(str(label) for label in labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Get the current value for a label set."""
+        return self._values.get(tuple(str(label) for label in labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for labels, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.label_names, labels), value
+
+
+class Histogram:
+    """Bucketed distribution of observations per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            labels: Label values in label_names order
+        """
+        key = tuple(str(label) for label in labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """Get the number of observations for a label set."""
+        series = self._series.get(tuple(str(label) for label in labels))
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.label_names, labels, ("le", _format_value(bound))), cumulative)
+            yield f"{self.name}_bucket", _format_labels(self.label_names, labels, ("le", "+Inf")), count
+            yield f"{self.name}_sum", _format_labels(self.label_names, labels), total
+            yield f"{self.name}_count", _format_labels(self.label_names, labels), count
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text format.
+
+    Besides counters and histograms, components can register collectors:
+    callables returning a flat dictionary of numbers (e.g. cache.stats),
+    exposed as gauges named <prefix>_<key>.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        # (prefix, label pairs) -> collector
+        self._collectors: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Callable[[], Dict[str, object]]] = {}
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(name, lambda: Counter(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def register_collector(
+        self,
+        prefix: str,
+        collect: Callable[[], Dict[str, object]],
+        labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Expose a stats dictionary as gauges.
+
+        Args:
+            prefix: Metric name prefix (e.g. "assistant_response_cache")
+            collect: Callable returning {name: number}; non-numeric values are skipped
+            labels: Labels added to every gauge, so several instances (e.g. one
+                    cache per agent) can share a prefix
+        """
+        self._collectors[(prefix, tuple(sorted((labels or {}).items())))] = collect
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        gauges: Dict[str, List[str]] = {}
+        for (prefix, label_pairs), collect in sorted(self._collectors.items(), key=lambda item: item[0]):
+            try:
+                stats = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {e}")
+                continue
+            labels = _format_labels([k for k, _ in label_pairs], [v for _, v in label_pairs])
+            for key in sorted(stats):
+                value = stats[key]
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                gauges.setdefault(name, []).append(f"{name}{labels} {_format_value(value)}")
+        for name in sorted(gauges):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(gauges[name])
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(self, name: str, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = factory()
+        return metric
+
+
+# Process-wide default registry
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,102 @@
+"""Small HTTP endpoint exposing metrics in the Prometheus text format."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from .registry import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Route handler: returns (HTTP status, content type, body)
+Handler = Callable[[str], Union[Tuple[int, str, str], Awaitable[Tuple[int, str, str]]]]
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 429: "Too Many Requests",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class MetricsServer:
+    """
+    Plain-asyncio HTTP/1.0 server for operational endpoints.
+
+    Serves /metrics (Prometheus text) and /healthz by default; other
+    components can add routes (handlers receive the raw query string).
+    """
+
+    def __init__(self, addr: str, registry: MetricsRegistry = REGISTRY):
+        """
+        Initialize metrics server.
+
+        Args:
+            addr: Listen address "host:port"
+            registry: Registry rendered at /metrics
+        """
+        host, _, port = addr.rpartition(":")
+        self.host = host or "0.0.0.0"
+        self.port = int(port)
+        self.registry = registry
+        self._routes: Dict[str, Handler] = {
+            "/metrics": lambda query: (200, "text/plain; version=0.0.4", self.registry.render()),
+            "/healthz": lambda query: (200, "text/plain", "ok\n"),
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_route(self, path: str, handler: Handler) -> None:
+        """
+        Serve a path with a custom handler.
+
+        Args:
+            path: URL path (e.g. "/ready")
+            handler: Callable (or coroutine function) taking the query string
+        """
+        self._routes[path] = handler
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Resolve the actual port when an ephemeral one (0) was requested
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Metrics endpoint listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            # Drain headers; request bodies are not used
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) < 2:
+                return
+            method, target = parts[0], parts[1]
+            path, _, query = target.partition("?")
+            handler = self._routes.get(path)
+            if method != "GET":
+                status, content_type, body = 405, "text/plain", "method not allowed\n"
+            elif handler is None:
+                status, content_type, body = 404, "text/plain", "not found\n"
+            else:
+                try:
+                    result = handler(query)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    status, content_type, body = result
+                except Exception as e:
+                    logger.error(f"Metrics endpoint {path} failed: {e}", exc_info=True)
+                    status, content_type, body = 500, "text/plain", f"error: {e}\n"
+            data = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status} {_REASONS.get(status, 'OK')}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("ascii") + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,111 @@
+"""Startup timing: import and initialization cost per phase."""
+
+import importlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """
+    Record how long each startup phase takes.
+
+    Phases are named like "import langchain_openai" or "init registry";
+    milestones ("listening", "ready") are offsets from process start. The
+    report is logged once startup completes and served as JSON at /startup.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        """
+        Args:
+            started_at: perf_counter() value of process start (default: now)
+        """
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases: List[Tuple[str, float]] = []
+        self.milestones: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a named phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Record a phase measured elsewhere.
+
+        Args:
+            name: Phase name
+            seconds: Duration in seconds
+        """
+        self.phases.append((name, seconds))
+
+    def import_module(self, name: str) -> Any:
+        """
+        Import a module and record its cost (zero if it was already loaded).
+
+        Args:
+            name: Module name
+
+        Returns:
+            The module
+        """
+        with self.phase(f"import {name}"):
+            return importlib.import_module(name)
+
+    def mark(self, milestone: str) -> float:
+        """
+        Record a milestone.
+
+        Args:
+            milestone: Milestone name (e.g. "listening")
+
+        Returns:
+            Seconds since process start
+        """
+        offset = time.perf_counter() - self.started_at
+        self.milestones[milestone] = offset
+        return offset
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the startup report.
+
+        Returns:
+            Phases (slowest first) and milestones, in milliseconds
+        """
+        return {
+            "phases_ms": [
+                {"phase": name, "ms": round(seconds * 1000.0, 2)}
+                for name, seconds in sorted(self.phases, key=lambda item: -item[1])
+            ],
+            "milestones_ms": {name: round(offset * 1000.0, 2) for name, offset in self.milestones.items()},
+        }
+
+    def log_report(self) -> None:
+        """Log the report as a table."""
+        lines = ["Startup timing:"]
+        for name, seconds in sorted(self.phases, key=lambda item: -item[1]):
+            lines.append(f"  {seconds * 1000.0:9.1f} ms  {name}")
+        for name, offset in self.milestones.items():
+            lines.append(f"  {offset * 1000.0:9.1f} ms  (since start) {name}")
+        logger.info("\n".join(lines))
+
+    def http_handler(self, query: str):
+        """MetricsServer route serving the report as JSON."""
+        return 200, "application/json", json.dumps(self.report(), indent=2) + "\n"
+
+    def stats(self) -> Dict[str, float]:
+        """Milestones in seconds, for the metrics registry."""
+        return {f"{name}_seconds": offset for name, offset in self.milestones.items()}
+
+
+# Process-wide profiler, created when this module is first imported
+STARTUP = StartupProfiler()
@@ -0,0 +1,252 @@
+"""Per-request tracing of latency stages, streamed chunks and tokens."""
+
+import asyncio
+import contextvars
+import logging
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Any, Coroutine, Dict, Optional, Tuple
+
+from .registry import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+# Statuses of requests abandoned before the agent finished
+CANCELLED_STATUSES = ("CANCELLED", "DEADLINE_EXCEEDED")
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class _Metrics:
+    """Metric handles shared by all traces of one registry."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.counter(
+            "assistant_requests_total", "Requests by RPC and status", ("rpc", "status"))
+        self.duration = registry.histogram(
+            "assistant_request_duration_seconds", "End-to-end request latency", ("rpc", "agent"))
+        self.stage = registry.histogram(
+            "assistant_stage_duration_seconds",
+            "Latency of request stages "
+            "(routing, queue_wait, upstream_connect, upstream_first_token, upstream_total)",
+            ("stage",))
+        self.first_chunk = registry.histogram(
+            "assistant_time_to_first_chunk_seconds", "Time from request start to first streamed chunk",
+            ("rpc", "agent"))
+        self.chunk_gap = registry.histogram(
+            "assistant_inter_chunk_gap_seconds", "Gap between consecutive streamed chunks", ("agent",))
+        self.tokens = registry.counter(
+            "assistant_completion_tokens_total", "Completion tokens generated", ("agent",))
+        self.token_rate = registry.histogram(
+            "assistant_tokens_per_second", "Completion tokens per second of generation", ("agent",),
+            buckets=_TOKEN_RATE_BUCKETS)
+        self.tokens_saved = registry.counter(
+            "assistant_cancelled_tokens_saved_total",
+            "Estimated completion tokens not generated because the request was cancelled", ("agent",))
+        # agent -> [completed requests, completion tokens], for the savings estimate
+        self.completed: Dict[str, list] = {}
+
+    def record_cancellation(self, agent: str, tokens: int) -> None:
+        """Credit the tokens an average completed response would still have needed."""
+        requests, total = self.completed.get(agent, (0, 0))
+        if requests:
+            saved = total / requests - tokens
+            if saved > 0:
+                self.tokens_saved.inc(saved, agent)
+
+    def record_completion(self, agent: str, tokens: int) -> None:
+        entry = self.completed.setdefault(agent, [0, 0])
+        entry[0] += 1
+        entry[1] += tokens
+
+
+# Weakly keyed: an id() key could be reused by a later registry and hand it stale metric handles
+_metrics_by_registry: "weakref.WeakKeyDictionary[MetricsRegistry, _Metrics]" = weakref.WeakKeyDictionary()
+
+
+def _metrics_for(registry: MetricsRegistry) -> _Metrics:
+    metrics = _metrics_by_registry.get(registry)
+    if metrics is None:
+        metrics = _metrics_by_registry[registry] = _Metrics(registry)
+    return metrics
+
+
+class RequestTrace:
+    """
+    Timing record of one RPC.
+
+    The trace is stored in a context variable, so code deeper in the call
+    stack (router, agents) can add stage timings and token counts without
+    passing it around. finish() feeds the histograms.
+    """
+
+    def __init__(self, rpc: str, user_id: str = "", registry: MetricsRegistry = REGISTRY):
+        """
+        Args:
+            rpc: RPC name (e.g. "Process")
+            user_id: Requesting user
+            registry: Registry receiving the measurements
+        """
+        self.rpc = rpc
+        self.user_id = user_id
+        self.agent = ""
+        self.status = "OK"
+        self.stages: Dict[str, float] = {}
+        self.chunks = 0
+        self.tokens = 0
+        self.started_at = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        self.last_chunk_at: Optional[float] = None
+        self._metrics = _metrics_for(registry)
+        self._finished = False
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Record the duration of a stage.
+
+        Args:
+            stage: Stage name
+            seconds: Duration in seconds
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self._metrics.stage.observe(seconds, stage)
+
+    def on_chunk(self) -> None:
+        """Record that a chunk was sent to the client."""
+        now = time.perf_counter()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+            self._metrics.first_chunk.observe(now - self.started_at, self.rpc, self.agent)
+        else:
+            self._metrics.chunk_gap.observe(now - self.last_chunk_at, self.agent)
+        self.last_chunk_at = now
+        self.chunks += 1
+
+    def add_tokens(self, count: int) -> None:
+        """
+        Add generated completion tokens.
+
+        Args:
+            count: Number of tokens
+        """
+        self.tokens += count
+
+    def finish(self, status: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Close the trace and feed the metrics (idempotent).
+
+        Args:
+            status: Final status (default: self.status)
+
+        Returns:
+            Trace summary
+        """
+        if status is not None:
+            self.status = status
+        summary = self.summary()
+        if self._finished:
+            return summary
+        self._finished = True
+        self._metrics.requests.inc(1, self.rpc, self.status)
+        self._metrics.duration.observe(summary["total_s"], self.rpc, self.agent)
+        if self.status in CANCELLED_STATUSES:
+            self._metrics.record_cancellation(self.agent, self.tokens)
+        elif self.status == "OK" and self.tokens:
+            self._metrics.record_completion(self.agent, self.tokens)
+        if self.tokens:
+            self._metrics.tokens.inc(self.tokens, self.agent)
+            generation = self.stages.get("upstream_total") or summary["total_s"]
+            if generation > 0:
+                self._metrics.token_rate.observe(self.tokens / generation, self.agent)
+        logger.debug(f"Request trace: {summary}")
+        return summary
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the trace as a dictionary.
+
+        Returns:
+            Stage timings, chunk/token counts and totals
+        """
+        end = time.perf_counter()
+        summary = {
+            "rpc": self.rpc,
+            "agent": self.agent,
+            "status": self.status,
+            "total_s": end - self.started_at,
+            "stages": dict(self.stages),
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+        }
+        if self.first_chunk_at is not None:
+            summary["time_to_first_chunk_s"] = self.first_chunk_at - self.started_at
+        return summary
+
+
+def start_trace(rpc: str, user_id: str = "", registry: MetricsRegistry = REGISTRY) -> RequestTrace:
+    """
+    Start a trace and make it current for this request's context.
+
+    Args:
+        rpc: RPC name
+        user_id: Requesting user
+        registry: Registry receiving the measurements
+
+    Returns:
+        The new trace
+    """
+    trace = RequestTrace(rpc, user_id, registry)
+    _current_trace.set(trace)
+    return trace
+
+
+def start_shared_task(coro: Coroutine, rpc: str = "shared") -> Tuple[asyncio.Task, RequestTrace]:
+    """
+    Run work shared by several requests (e.g. a coalesced LLM call) as a task with its own trace.
+
+    Stage timings still feed the histograms. Tokens are collected on the
+    returned trace, which is never finished: each request sharing the work
+    adds them to its own trace, so every caller is charged for its answer.
+
+    Args:
+        coro: Shared work
+        rpc: Name of the shared trace
+
+    Returns:
+        (task, shared trace)
+    """
+    trace = RequestTrace(rpc)
+    context = contextvars.copy_context()
+    context.run(_current_trace.set, trace)
+    return asyncio.get_running_loop().create_task(coro, context=context), trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Get the trace of the current request, if any."""
+    return _current_trace.get()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record a stage duration on the current trace, or directly in the
+    histogram when no trace is active (e.g. offline batch runs).
+
+    Args:
+        stage: Stage name
+        seconds: Duration in seconds
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(stage, seconds)
+    else:
+        _metrics_for(REGISTRY).stage.observe(seconds, stage)
+
+
+def add_tokens(count: int) -> None:
+    """Add completion tokens to the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_tokens(count)
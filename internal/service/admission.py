@@ -0,0 +1,188 @@
+"""Admission control: bounded concurrency, priority queueing and fast rejection."""
+
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or wait too long)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        """
+        Args:
+            reason: Human readable rejection reason
+            retry_after: Suggested client back-off in seconds
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued request waiting for a slot."""
+
+    def __init__(self, agent: str, user_id: str, priority: int, seq: int, future: asyncio.Future):
+        self.agent = agent
+        self.user_id = user_id
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Limit concurrent agent calls globally and per agent.
+
+    Requests that cannot run immediately wait in a bounded queue. When a slot
+    frees up, the waiter with the highest priority is admitted; among equal
+    priorities, the user with the fewest running requests goes first, then
+    arrival order. When the queue is full, or a waiter exceeds the maximum
+    queue wait, the request is rejected with a retry hint derived from the
+    recent service time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        agent_limits: Optional[Dict[str, int]] = None,
+        max_queue_size: int = 100,
+        max_queue_wait: float = 30.0
+    ):
+        """
+        Initialize admission controller.
+
+        Args:
+            max_concurrency: Global limit on running requests (0 = unlimited)
+            agent_limits: Per-agent limits on running requests
+            max_queue_size: Maximum number of waiting requests
+            max_queue_wait: Maximum seconds a request may wait for a slot
+        """
+        self.max_concurrency = max_concurrency
+        self.agent_limits = dict(agent_limits or {})
+        self.max_queue_size = max_queue_size
+        self.max_queue_wait = max_queue_wait
+        self._running = 0
+        self._running_by_agent: Dict[str, int] = {}
+        self._running_by_user: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._avg_service_time = 1.0
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    @asynccontextmanager
+    async def slot(self, agent: str, user_id: str = "", priority: int = 0) -> AsyncIterator[float]:
+        """
+        Hold a concurrency slot for the duration of the block.
+
+        Args:
+            agent: Agent name (for per-agent limits)
+            user_id: User identifier (for fairness)
+            priority: Higher values are admitted first
+
+        Yields:
+            Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        queued_at = time.monotonic()
+        # Waiters are admitted greedily, so none that could run is ever queued
+        # ahead of a request that finds free capacity here
+        if self._has_capacity(agent):
+            self._acquire(agent, user_id)
+        else:
+            await self._wait(agent, user_id, priority)
+        started_at = time.monotonic()
+        try:
+            yield started_at - queued_at
+        finally:
+            self._release(agent, user_id, time.monotonic() - started_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get admission counters.
+
+        Returns:
+            Dictionary with running/queued counts and admission outcomes
+        """
+        return {
+            **self._stats,
+            "running": self._running,
+            "waiting": len(self._waiters),
+            "running_by_agent": dict(self._running_by_agent),
+        }
+
+    def retry_after(self) -> float:
+        """Estimate how long a rejected client should back off (seconds)."""
+        parallelism = self.max_concurrency or max(sum(self.agent_limits.values()), 1)
+        estimate = self._avg_service_time * (len(self._waiters) + 1) / parallelism
+        return min(max(estimate, 0.1), 60.0)
+
+    async def _wait(self, agent: str, user_id: str, priority: int) -> None:
+        if len(self._waiters) >= self.max_queue_size:
+            self._stats["rejected"] += 1
+            raise AdmissionRejected("Server overloaded: admission queue is full", self.retry_after())
+
+        waiter = _Waiter(agent, user_id, priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                # Granted just as the wait expired
+                return
+            self._waiters.remove(waiter)
+            waiter.future.cancel()
+            self._stats["timed_out"] += 1
+            raise AdmissionRejected("Server overloaded: timed out waiting for a slot", self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                # Slot was granted but the caller went away before using it
+                self._release(agent, user_id, 0.0)
+            else:
+                self._waiters.remove(waiter)
+                waiter.future.cancel()
+            raise
+
+    def _has_capacity(self, agent: str) -> bool:
+        if self.max_concurrency and self._running >= self.max_concurrency:
+            return False
+        limit = self.agent_limits.get(agent, 0)
+        return not limit or self._running_by_agent.get(agent, 0) < limit
+
+    def _acquire(self, agent: str, user_id: str) -> None:
+        self._running += 1
+        self._running_by_agent[agent] = self._running_by_agent.get(agent, 0) + 1
+        self._running_by_user[user_id] = self._running_by_user.get(user_id, 0) + 1
+        self._stats["admitted"] += 1
+
+    def _release(self, agent: str, user_id: str, service_time: float) -> None:
+        self._running -= 1
+        self._running_by_agent[agent] -= 1
+        self._running_by_user[user_id] -= 1
+        if not self._running_by_user[user_id]:
+            del self._running_by_user[user_id]
+        if service_time > 0:
+            self._avg_service_time += 0.2 * (service_time - self._avg_service_time)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit as many waiters as current capacity allows, best first."""
+        while self._waiters:
+            eligible = [w for w in self._waiters if self._has_capacity(w.agent)]
+            if not eligible:
+                return
+            best = min(
+                eligible,
+                key=lambda w: (-w.priority, self._running_by_user.get(w.user_id, 0), w.seq)
+            )
+            self._waiters.remove(best)
+            self._acquire(best.agent, best.user_id)
+            best.future.set_result(None)
@@ -1,7 +1,8 @@
 """gRPC service implementation for AI service."""
 
+import asyncio
 import logging
-from typing import Iterator
+from typing import Iterator, Optional
 import grpc
 import sys
 from pathlib import Path
@@ -21,7 +22,15 @@ except ImportError as e:
 
 from ..agents.registry import AgentRegistry
 from ..agents.router import AgentRouter
+from ..agents.singleflight import SingleFlight
+from ..memory.session_store import SessionStore, parse_messages
+from .admission import AdmissionController, AdmissionRejected
+from .rate_limit import RateLimiter
+from .stream_coalescer import StreamCoalescer
+from .stream_buffer import ResumeError, StreamBuffer, StreamBufferStore
+from .deadline import DeadlineExceeded, call_with_deadline, stream_with_deadline, time_remaining
 from ..graph.orchestrator import Orchestrator
+from ..metrics.tracing import observe_stage, start_trace
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +38,162 @@ logger = logging.getLogger(__name__)
 class AIServiceServicer(ai_pb2_grpc.AIServiceServicer):
     """gRPC service implementation."""
     
-    def __init__(self, registry: AgentRegistry, router: AgentRouter, orchestrator: Orchestrator):
+    def __init__(self, registry: AgentRegistry, router: AgentRouter, orchestrator: Orchestrator,
+                 singleflight: Optional[SingleFlight] = None,
+                 admission: Optional[AdmissionController] = None,
+                 session_store: Optional[SessionStore] = None,
+                 stream_coalescer: Optional[StreamCoalescer] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 stream_buffers: Optional[StreamBufferStore] = None):
         self.registry = registry
         self.router = router
         self.orchestrator = orchestrator
+        # Coalesces concurrent identical requests into one upstream call (optional)
+        self.singleflight = singleflight
+        # Bounds concurrent agent calls and queues/rejects the excess (optional)
+        self.admission = admission
+        # Server-side conversation history keyed by user and session_id (optional)
+        self.session_store = session_store
+        # Merges token-sized chunks into fewer stream messages (optional)
+        self.stream_coalescer = stream_coalescer
+        # Per-user request and token quotas, checked before any LLM work (optional)
+        self.rate_limiter = rate_limiter
+        # Recent stream chunks kept so a reconnecting client can resume (optional)
+        self.stream_buffers = stream_buffers
+    
+    async def _load_session(self, user_id: str, session_id: Optional[str], context_dict: dict) -> list:
+        """
+        Replace context messages with stored history plus the request delta.
+        
+        Args:
+            user_id: User from the request (sessions are private to their user)
+            session_id: Session identifier from the request
+            context_dict: Request context, updated in place
+            
+        Returns:
+            Delta messages sent with this request (persisted with the reply)
+        """
+        # Only the server names conversations (agents key their history summaries by it)
+        context_dict.pop("conversation_id", None)
+        if self.session_store is None or not session_id:
+            return []
+        if str(context_dict.pop("reset_session", "")).lower() in ("1", "true", "yes"):
+            await self.session_store.clear(user_id, session_id)
+        delta = parse_messages(context_dict.get("messages"))
+        session = await self.session_store.get_session(user_id, session_id)
+        context_dict["messages"] = session.messages + delta
+        if session.conversation_id:
+            context_dict["conversation_id"] = session.conversation_id
+        return delta
+    
+    async def _save_session(self, user_id: str, session_id: Optional[str], delta: list, message: str,
+                            response_text: str) -> None:
+        """Persist the delta and the new user/assistant turn (failed replies are not stored)."""
+        if self.session_store is None or not session_id or response_text.startswith("Error:"):
+            return
+        await self.session_store.append(
+            user_id,
+            session_id,
+            delta + [
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": response_text},
+            ]
+        )
+    
+    def _no_agent(self, agent_name: Optional[str], trace, context) -> str:
+        """Report a failed routing: UNAVAILABLE while agents fail fast (circuit open), else NOT_FOUND."""
+        if self.registry.has_unavailable(agent_name):
+            code, details = grpc.StatusCode.UNAVAILABLE, "Agents are temporarily unavailable, retry later"
+        else:
+            code, details = grpc.StatusCode.NOT_FOUND, "No available agent found"
+        trace.status = code.name
+        context.set_code(code)
+        context.set_details(details)
+        return details
+    
+    @staticmethod
+    def _get_priority(context_dict: dict) -> int:
+        """Read request priority from context (higher runs first, default 0)."""
+        try:
+            return int(context_dict.get("priority", 0))
+        except (TypeError, ValueError):
+            return 0
+    
+    @staticmethod
+    def _retry_after_metadata(e: AdmissionRejected) -> dict:
+        """Build the retry hint sent with RESOURCE_EXHAUSTED responses."""
+        return {"retry-after-ms": str(int(e.retry_after * 1000))}
+    
+    async def _check_rate_limit(self, user_id: str, message: str, context_dict: dict):
+        """Charge the user's quota; raises RateLimited (an AdmissionRejected) when over it."""
+        if self.rate_limiter is None:
+            return None
+        return await self.rate_limiter.acquire(user_id, message, context_dict)
+    
+    def _release_rate_limit(self, reservation, trace) -> None:
+        """Settle the quota charge with the tokens the request actually generated."""
+        if reservation is not None:
+            self.rate_limiter.release(reservation, trace.tokens)
+    
+    async def _saving_session(self, chunks, user_id: str, session_id: Optional[str], delta: list, message: str):
+        """Pass chunks through and store the turn once the stream has completed."""
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        await self._save_session(user_id, session_id, delta, message, "".join(parts))
+    
+    async def _replay(self, buffer: StreamBuffer, offset: int, session_id: Optional[str], trace, context):
+        """Stream a buffered response from an offset; each chunk carries stream_id and offset metadata."""
+        chunks = stream_with_deadline(self.stream_buffers.read(buffer, offset), time_remaining(context))
+        try:
+            async for chunk_offset, chunk in chunks:
+                trace.on_chunk()
+                yield ai_pb2.ProcessResponse(
+                    agent_name=buffer.agent_name,
+                    response=chunk,
+                    metadata={"stream_id": buffer.stream_id, "offset": str(chunk_offset)},
+                    is_streaming=True,
+                    session_id=session_id or ""
+                )
+        finally:
+            # Detaches from the buffer; generation continues for the grace period
+            await chunks.aclose()
+    
+    async def _process_with_agent(self, agent, message: str, context_dict: dict, user_id: str) -> str:
+        """Run agent.process inside an admission slot (if admission control is enabled)."""
+        if self.admission is None:
+            return await agent.process(message, context_dict)
+        async with self.admission.slot(agent.metadata.name, user_id, self._get_priority(context_dict)) as wait:
+            observe_stage("queue_wait", wait)
+            return await agent.process(message, context_dict)
+    
+    async def _stream_with_agent(self, agent, message: str, context_dict: dict, user_id: str):
+        """Run agent.process_stream inside an admission slot (if admission control is enabled)."""
+        if self.admission is None:
+            async for chunk in agent.process_stream(message, context_dict):
+                yield chunk
+            return
+        async with self.admission.slot(agent.metadata.name, user_id, self._get_priority(context_dict)) as wait:
+            observe_stage("queue_wait", wait)
+            async for chunk in agent.process_stream(message, context_dict):
+                yield chunk
+    
+    async def _call_agent(self, agent, message: str, context_dict: dict, user_id: str) -> str:
+        """Run agent.process through request coalescing (if enabled) and an admission slot."""
+        if self.singleflight is None:
+            return await self._process_with_agent(agent, message, context_dict, user_id)
+        key = self.singleflight.make_key(agent.metadata.name, message, context_dict)
+        return await self.singleflight.do(
+            key, lambda: self._process_with_agent(agent, message, context_dict, user_id)
+        )
+    
+    async def _orchestrate(self, message: str, context_dict: dict, user_id: str) -> str:
+        """Run the orchestrator; each sub-task is admitted and coalesced like a request of its own."""
+        async def run(agent, subtask: str, subtask_context: dict) -> str:
+            return await self._call_agent(agent, subtask, subtask_context, user_id)
+        
+        return await self.orchestrator.orchestrate(message, context_dict, run)
     
     async def Process(self, request, context):
         """
@@ -41,37 +202,52 @@ class AIServiceServicer(ai_pb2_grpc.AIServiceServicer):
         This is the unified entry point that routes to appropriate agent
         or uses LangGraph orchestration for complex workflows.
         """
+        trace = start_trace("Process", request.user_id)
+        reservation = None
         try:
             message = request.message
             user_id = request.user_id
             agent_name = request.agent_name if request.agent_name else None
             context_dict = dict(request.context) if request.context else {}
             session_id = request.session_id if request.session_id else None
+            if user_id:
+                # Agents use it for per-user fairness
+                context_dict.setdefault("user_id", user_id)
             
             logger.info(f"Processing request from user {user_id}, message: {message[:100]}...")
+            session_delta = await self._load_session(user_id, session_id, context_dict)
+            # Over-quota requests are rejected before routing or LLM calls; the estimate includes stored history
+            reservation = await self._check_rate_limit(user_id, message, context_dict)
             
-            # Check if orchestration should be used
-            if self.orchestrator.use_orchestration(message, context_dict):
-                response_text = await self.orchestrator.orchestrate(message, context_dict)
+            # Check if orchestration should be used (an explicit agent always wins)
+            if not agent_name and self.orchestrator.use_orchestration(message, context_dict):
+                response_text = await call_with_deadline(
+                    self._orchestrate(message, context_dict, user_id), time_remaining(context)
+                )
                 selected_agent = "orchestrator"
+                trace.agent = selected_agent
             else:
                 # Route to appropriate agent
                 agent = await self.router.route(message, context_dict, agent_name)
                 if not agent:
-                    context.set_code(grpc.StatusCode.NOT_FOUND)
-                    context.set_details("No available agent found")
+                    details = self._no_agent(agent_name, trace, context)
                     return ai_pb2.ProcessResponse(
                         agent_name="",
-                        response="No available agent found",
+                        response=details,
                         metadata={},
                         is_streaming=False,
                         session_id=session_id or ""
                     )
                 
                 # Process with selected agent
-                response_text = await agent.process(message, context_dict)
+                trace.agent = agent.metadata.name
+                call = self._call_agent(agent, message, context_dict, user_id)
+                # Cancelling the call aborts the upstream request and frees the admission slot
+                response_text = await call_with_deadline(call, time_remaining(context))
                 selected_agent = agent.metadata.name
             
+            await self._save_session(user_id, session_id, session_delta, message, response_text)
+            
             # Build response
             return ai_pb2.ProcessResponse(
                 agent_name=selected_agent,
@@ -81,8 +257,42 @@ class AIServiceServicer(ai_pb2_grpc.AIServiceServicer):
                 session_id=session_id or ""
             )
         
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected request from user {request.user_id}: {e.reason} (retry after {e.retry_after:.2f}s)")
+            retry_metadata = self._retry_after_metadata(e)
+            trace.status = "RESOURCE_EXHAUSTED"
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details(e.reason)
+            context.set_trailing_metadata(tuple(retry_metadata.items()))
+            return ai_pb2.ProcessResponse(
+                agent_name="",
+                response=f"Error: {e.reason}",
+                metadata=retry_metadata,
+                is_streaming=False,
+                session_id=request.session_id or ""
+            )
+        
+        except DeadlineExceeded as e:
+            logger.warning(f"Request from user {request.user_id} exceeded its deadline: {e}")
+            trace.status = "DEADLINE_EXCEEDED"
+            context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+            context.set_details(str(e))
+            return ai_pb2.ProcessResponse(
+                agent_name="",
+                response=f"Error: {e}",
+                metadata={},
+                is_streaming=False,
+                session_id=request.session_id or ""
+            )
+        
+        except asyncio.CancelledError:
+            logger.info(f"Request from user {request.user_id} cancelled by the client")
+            trace.status = "CANCELLED"
+            raise
+        
         except Exception as e:
             logger.error(f"Error processing request: {e}", exc_info=True)
+            trace.status = "INTERNAL"
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return ai_pb2.ProcessResponse(
@@ -92,41 +302,150 @@ class AIServiceServicer(ai_pb2_grpc.AIServiceServicer):
                 is_streaming=False,
                 session_id=""
             )
+        
+        finally:
+            self._release_rate_limit(reservation, trace)
+            trace.finish()
     
     async def ProcessStream(self, request, context):
         """
         Process a user request with streaming response.
         """
+        trace = start_trace("ProcessStream", request.user_id)
+        reservation = None
         try:
             message = request.message
             user_id = request.user_id
             agent_name = request.agent_name if request.agent_name else None
             context_dict = dict(request.context) if request.context else {}
             session_id = request.session_id if request.session_id else None
+            if user_id:
+                context_dict.setdefault("user_id", user_id)
             
             logger.info(f"Processing streaming request from user {user_id}")
             
-            # Route to appropriate agent
-            agent = await self.router.route(message, context_dict, agent_name)
-            if not agent:
-                context.set_code(grpc.StatusCode.NOT_FOUND)
-                context.set_details("No available agent found")
+            # Reconnect to a stream that is still buffered instead of generating it again
+            resume_id = context_dict.get("resume_stream_id")
+            if resume_id and self.stream_buffers is not None:
+                offset = str(context_dict.get("resume_offset") or "0")
+                if not offset.isdigit():
+                    trace.status = "INVALID_ARGUMENT"
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    context.set_details(f"Invalid resume_offset: {offset}")
+                    return
+                offset = int(offset)
+                buffer = self.stream_buffers.get(resume_id, user_id)
+                logger.info(f"Resuming stream {resume_id} at offset {offset} for user {user_id}")
+                trace.agent = buffer.agent_name
+                async for response in self._replay(buffer, offset, session_id, trace, context):
+                    yield response
                 return
             
-            # Stream responses
-            async for chunk in agent.process_stream(message, context_dict):
+            session_delta = await self._load_session(user_id, session_id, context_dict)
+            # Over-quota requests are rejected before routing or LLM calls; the estimate includes stored history
+            reservation = await self._check_rate_limit(user_id, message, context_dict)
+            
+            # Orchestrated answers are merged from several agents, so they are sent as one chunk
+            if not agent_name and self.orchestrator.use_orchestration(message, context_dict):
+                response_text = await call_with_deadline(
+                    self._orchestrate(message, context_dict, user_id), time_remaining(context)
+                )
+                await self._save_session(user_id, session_id, session_delta, message, response_text)
+                trace.agent = "orchestrator"
+                trace.on_chunk()
                 yield ai_pb2.ProcessResponse(
-                    agent_name=agent.metadata.name,
-                    response=chunk,
+                    agent_name="orchestrator",
+                    response=response_text,
                     metadata={},
                     is_streaming=True,
                     session_id=session_id or ""
                 )
+                return
+            
+            # Route to appropriate agent
+            agent = await self.router.route(message, context_dict, agent_name)
+            if not agent:
+                self._no_agent(agent_name, trace, context)
+                return
+            
+            # Stream responses
+            trace.agent = agent.metadata.name
+            if self.singleflight is not None:
+                key = self.singleflight.make_key(agent.metadata.name, message, context_dict)
+                chunks = self.singleflight.stream(
+                    key, lambda: self._stream_with_agent(agent, message, context_dict, user_id)
+                )
+            else:
+                chunks = self._stream_with_agent(agent, message, context_dict, user_id)
+            if self.stream_coalescer is not None:
+                chunks = self.stream_coalescer.coalesce(chunks)
+            
+            if self.stream_buffers is not None:
+                # Generation runs detached from this call so a dropped client can resume it
+                if self.session_store is not None:
+                    chunks = self._saving_session(chunks, user_id, session_id, session_delta, message)
+                buffer = self.stream_buffers.create(chunks, agent.metadata.name, user_id)
+                # Generation may outlive this call; its quota is settled when it ends
+                charge, reservation = reservation, None
+                buffer.producer.add_done_callback(lambda _: self._release_rate_limit(charge, trace))
+                async for response in self._replay(buffer, 0, session_id, trace, context):
+                    yield response
+                return
+            
+            chunks = stream_with_deadline(chunks, time_remaining(context))
+            
+            parts = []
+            try:
+                async for chunk in chunks:
+                    if self.session_store is not None:
+                        parts.append(chunk)
+                    trace.on_chunk()
+                    yield ai_pb2.ProcessResponse(
+                        agent_name=agent.metadata.name,
+                        response=chunk,
+                        metadata={},
+                        is_streaming=True,
+                        session_id=session_id or ""
+                    )
+            finally:
+                # Abort the upstream stream right away if the client went away mid-stream
+                await chunks.aclose()
+            
+            await self._save_session(user_id, session_id, session_delta, message, "".join(parts))
+        
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected streaming request from user {request.user_id}: {e.reason} (retry after {e.retry_after:.2f}s)")
+            trace.status = "RESOURCE_EXHAUSTED"
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details(e.reason)
+            context.set_trailing_metadata(tuple(self._retry_after_metadata(e).items()))
+        
+        except ResumeError as e:
+            logger.warning(f"Cannot resume stream for user {request.user_id}: {e}")
+            trace.status = e.code
+            context.set_code(getattr(grpc.StatusCode, e.code))
+            context.set_details(str(e))
+        
+        except DeadlineExceeded as e:
+            logger.warning(f"Streaming request from user {request.user_id} exceeded its deadline: {e}")
+            trace.status = "DEADLINE_EXCEEDED"
+            context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+            context.set_details(str(e))
+        
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info(f"Streaming request from user {request.user_id} cancelled by the client")
+            trace.status = "CANCELLED"
+            raise
         
         except Exception as e:
             logger.error(f"Error in streaming request: {e}", exc_info=True)
+            trace.status = "INTERNAL"
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
+        
+        finally:
+            self._release_rate_limit(reservation, trace)
+            trace.finish()
     
     async def ListAgents(self, request, context):
         """
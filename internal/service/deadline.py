@@ -0,0 +1,102 @@
+"""Propagation of gRPC deadlines into agent calls and streams."""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the client's deadline passes before the agent finished."""
+
+
+def time_remaining(context) -> Optional[float]:
+    """
+    Get the seconds left before the RPC deadline.
+
+    Args:
+        context: gRPC servicer context
+
+    Returns:
+        Remaining seconds, or None when the client set no deadline
+    """
+    try:
+        remaining = context.time_remaining()
+    except Exception:
+        return None
+    # Without a deadline grpc reports an effectively infinite value
+    if remaining is None or remaining > 1e8:
+        return None
+    return max(remaining, 0.0)
+
+
+async def call_with_deadline(awaitable: Awaitable[T], remaining: Optional[float]) -> T:
+    """
+    Await a call, cancelling it (and its upstream request) at the deadline.
+
+    Args:
+        awaitable: Agent call
+        remaining: Seconds until the deadline (None = no deadline)
+
+    Returns:
+        Result of the call
+
+    Raises:
+        DeadlineExceeded: If the deadline passed first
+    """
+    if remaining is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Deadline exceeded after {remaining:.3f}s") from None
+
+
+async def stream_with_deadline(chunks: AsyncIterator[T], remaining: Optional[float]) -> AsyncIterator[T]:
+    """
+    Iterate a stream, cancelling the pending upstream read at the deadline.
+
+    One timer covers the whole stream. It is paused while an item is
+    handed to the consumer, so the deadline can only interrupt a read of
+    the wrapped stream, never the consumer's own awaits.
+
+    The wrapped stream is always closed on exit, so an abandoned or
+    expired stream releases its upstream request immediately instead of
+    when the generator is garbage collected.
+
+    Args:
+        chunks: Upstream stream
+        remaining: Seconds until the deadline (None = no deadline)
+
+    Yields:
+        Items of the upstream stream
+
+    Raises:
+        DeadlineExceeded: If the deadline passed first
+    """
+    iterator = chunks.__aiter__()
+    try:
+        if remaining is None:
+            async for item in iterator:
+                yield item
+            return
+        deadline = asyncio.get_running_loop().time() + remaining
+        try:
+            async with asyncio.timeout_at(deadline) as timeout:
+                while True:
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    timeout.reschedule(None)
+                    yield item
+                    timeout.reschedule(deadline)
+        except TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded after {remaining:.3f}s") from None
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,421 @@
+"""Per-user rate limiting: token buckets on requests and estimated LLM tokens."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+# Bucket name -> (refill rate per second, capacity)
+Limits = Dict[str, Tuple[float, float]]
+
+USAGE_COUNTERS = ("requests", "rejected", "tokens_estimated", "tokens_used")
+
+
+class RateLimited(AdmissionRejected):
+    """Raised when a user is over quota; handled like any other admission rejection."""
+
+
+def _refill(tokens: float, updated_at: float, rate: float, capacity: float, now: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _waits(costs: Dict[str, float], tokens: Dict[str, float], limits: Limits) -> Dict[str, float]:
+    """Seconds until each short bucket covers its cost (empty if all do)."""
+    return {
+        name: (cost - tokens[name]) / limits[name][0]
+        for name, cost in costs.items() if tokens[name] < cost
+    }
+
+
+class RateLimitStore(ABC):
+    """Bucket and usage counter storage."""
+
+    @abstractmethod
+    async def take(self, user_id: str, costs: Dict[str, float], limits: Limits) -> Dict[str, float]:
+        """
+        Take costs from the user's buckets, all or nothing.
+
+        Args:
+            user_id: User identifier
+            costs: Cost per bucket
+            limits: Refill rate and capacity per bucket
+
+        Returns:
+            Empty if taken, else seconds until the cost fits per short bucket
+        """
+
+    @abstractmethod
+    async def adjust(self, user_id: str, bucket: str, amount: float, limits: Limits) -> None:
+        """Add (or, if negative, remove) tokens; a bucket may go into debt."""
+
+    @abstractmethod
+    async def add_usage(self, user_id: str, counters: Dict[str, float]) -> None:
+        """Increment the user's usage counters."""
+
+    @abstractmethod
+    async def get_usage(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Usage counters of one user (or of all users), keyed by user."""
+
+    async def close(self) -> None:
+        """Release resources."""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Process-local store; the least recently seen users are evicted beyond max_users."""
+
+    def __init__(self, max_users: int = 100000):
+        """
+        Args:
+            max_users: Maximum users tracked
+        """
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, Dict[str, List[float]]]" = OrderedDict()
+        self._usage: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+
+    def _user_buckets(self, user_id: str) -> Dict[str, List[float]]:
+        buckets = self._buckets.get(user_id)
+        if buckets is None:
+            buckets = self._buckets[user_id] = {}
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(user_id)
+        return buckets
+
+    def _bucket(self, user_id: str, name: str, limits: Limits, now: float) -> List[float]:
+        rate, capacity = limits[name]
+        buckets = self._user_buckets(user_id)
+        bucket = buckets.get(name)
+        if bucket is None:
+            bucket = buckets[name] = [capacity, now]
+        bucket[0] = _refill(bucket[0], bucket[1], rate, capacity, now)
+        bucket[1] = now
+        return bucket
+
+    async def take(self, user_id: str, costs: Dict[str, float], limits: Limits) -> Dict[str, float]:
+        now = time.time()
+        buckets = {name: self._bucket(user_id, name, limits, now) for name in costs}
+        waits = _waits(costs, {name: bucket[0] for name, bucket in buckets.items()}, limits)
+        if not waits:
+            for name, bucket in buckets.items():
+                bucket[0] -= costs[name]
+        return waits
+
+    async def adjust(self, user_id: str, bucket: str, amount: float, limits: Limits) -> None:
+        state = self._bucket(user_id, bucket, limits, time.time())
+        state[0] = min(state[0] + amount, limits[bucket][1])
+
+    async def add_usage(self, user_id: str, counters: Dict[str, float]) -> None:
+        usage = self._usage.get(user_id)
+        if usage is None:
+            usage = self._usage[user_id] = dict.fromkeys(USAGE_COUNTERS, 0.0)
+            while len(self._usage) > self.max_users:
+                self._usage.popitem(last=False)
+        self._usage.move_to_end(user_id)
+        for name, value in counters.items():
+            usage[name] = usage.get(name, 0.0) + value
+
+    async def get_usage(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        if user_id is not None:
+            return {user_id: dict(self._usage[user_id])} if user_id in self._usage else {}
+        return {user: dict(usage) for user, usage in self._usage.items()}
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Store backed by a local SQLite file.
+
+    Worker processes on the same host share buckets and usage through the
+    file, so limits hold across WORKERS. Blocking SQLite calls run in a
+    worker thread.
+    """
+
+    def __init__(self, path: str = "ratelimit.db"):
+        """
+        Args:
+            path: Database file path
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " user_id TEXT NOT NULL, bucket TEXT NOT NULL, tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (user_id, bucket))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_usage ("
+            " user_id TEXT NOT NULL, counter TEXT NOT NULL, value REAL NOT NULL,"
+            " PRIMARY KEY (user_id, counter))"
+        )
+        self._lock = asyncio.Lock()
+
+    async def take(self, user_id: str, costs: Dict[str, float], limits: Limits) -> Dict[str, float]:
+        async with self._lock:
+            return await asyncio.to_thread(self._take, user_id, costs, limits)
+
+    async def adjust(self, user_id: str, bucket: str, amount: float, limits: Limits) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._adjust, user_id, bucket, amount, limits)
+
+    async def add_usage(self, user_id: str, counters: Dict[str, float]) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._add_usage, user_id, counters)
+
+    async def get_usage(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get_usage, user_id)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    def _load(self, user_id: str, name: str, limits: Limits, now: float) -> float:
+        rate, capacity = limits[name]
+        row = self._conn.execute(
+            "SELECT tokens, updated_at FROM rate_buckets WHERE user_id = ? AND bucket = ?", (user_id, name)
+        ).fetchone()
+        return capacity if row is None else _refill(row[0], row[1], rate, capacity, now)
+
+    def _store(self, user_id: str, name: str, tokens: float, now: float) -> None:
+        self._conn.execute(
+            "INSERT INTO rate_buckets (user_id, bucket, tokens, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id, bucket) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (user_id, name, tokens, now)
+        )
+
+    def _take(self, user_id: str, costs: Dict[str, float], limits: Limits) -> Dict[str, float]:
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            tokens = {name: self._load(user_id, name, limits, now) for name in costs}
+            waits = _waits(costs, tokens, limits)
+            if not waits:
+                for name in costs:
+                    self._store(user_id, name, tokens[name] - costs[name], now)
+            return waits
+
+    def _adjust(self, user_id: str, bucket: str, amount: float, limits: Limits) -> None:
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            tokens = self._load(user_id, bucket, limits, now)
+            self._store(user_id, bucket, min(tokens + amount, limits[bucket][1]), now)
+
+    def _add_usage(self, user_id: str, counters: Dict[str, float]) -> None:
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO rate_usage (user_id, counter, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, counter) DO UPDATE SET value = value + excluded.value",
+                [(user_id, name, value) for name, value in counters.items()]
+            )
+
+    def _get_usage(self, user_id: Optional[str]) -> Dict[str, Dict[str, float]]:
+        if user_id is None:
+            rows = self._conn.execute("SELECT user_id, counter, value FROM rate_usage").fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT user_id, counter, value FROM rate_usage WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        usage: Dict[str, Dict[str, float]] = {}
+        for user, counter, value in rows:
+            usage.setdefault(user, dict.fromkeys(USAGE_COUNTERS, 0.0))[counter] = value
+        return usage
+
+
+class Reservation:
+    """Tokens charged for one admitted request, settled when it completes."""
+
+    def __init__(self, user_id: str, prompt_tokens: int, estimated_tokens: int, charged_tokens: float = 0.0):
+        self.user_id = user_id
+        self.prompt_tokens = prompt_tokens
+        self.estimated_tokens = estimated_tokens
+        self.charged_tokens = charged_tokens  # Taken from the token bucket up front (capped at its size)
+
+
+class RateLimiter:
+    """
+    Token buckets per user on requests and on LLM tokens.
+
+    A request is charged one request token and its estimated LLM tokens
+    (prompt length plus an allowance for the completion) before any LLM
+    work; if either bucket is short, it is rejected at once with a retry
+    hint. When the request completes, the token bucket is corrected by the
+    difference between the estimate and the tokens actually generated.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        requests_per_minute: float = 0.0,
+        tokens_per_minute: float = 0.0,
+        request_burst: Optional[float] = None,
+        token_burst: Optional[float] = None,
+        completion_tokens_estimate: int = 256
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            store: Bucket and usage storage
+            requests_per_minute: Sustained requests per user (0 = unlimited)
+            tokens_per_minute: Sustained LLM tokens per user (0 = unlimited)
+            request_burst: Request bucket capacity (default: one minute's worth)
+            token_burst: Token bucket capacity (default: one minute's worth)
+            completion_tokens_estimate: Completion tokens charged up front per request
+        """
+        self.store = store
+        self.limits: Limits = {}
+        if requests_per_minute > 0:
+            self.limits["requests"] = (requests_per_minute / 60.0, request_burst or requests_per_minute)
+        if tokens_per_minute > 0:
+            self.limits["tokens"] = (tokens_per_minute / 60.0, token_burst or tokens_per_minute)
+        self.completion_tokens_estimate = completion_tokens_estimate
+        self._pending: set = set()
+        self._stats = {"allowed": 0, "rejected_requests": 0, "rejected_tokens": 0}
+
+    @staticmethod
+    def estimate_prompt_tokens(message: str, context: Optional[Dict[str, Any]] = None) -> int:
+        """Estimate prompt tokens from the message and the history sent with it (~4 chars per token)."""
+        chars = len(message)
+        messages = (context or {}).get("messages")
+        if isinstance(messages, list):
+            chars += sum(len(str(msg.get("content", ""))) for msg in messages if isinstance(msg, dict))
+        elif isinstance(messages, str):
+            # JSON-encoded history from the request context
+            chars += len(messages)
+        return (chars + 3) // 4
+
+    async def acquire(self, user_id: str, message: str, context: Optional[Dict[str, Any]] = None) -> Reservation:
+        """
+        Charge a request to the user's buckets.
+
+        Args:
+            user_id: User identifier ("" is limited as "anonymous")
+            message: User message
+            context: Request context (conversation history counts toward the estimate)
+
+        Returns:
+            Reservation to pass to release() when the request completes
+
+        Raises:
+            RateLimited: If the user is over quota
+        """
+        user_id = user_id or "anonymous"
+        prompt_tokens = self.estimate_prompt_tokens(message, context)
+        estimated = prompt_tokens + self.completion_tokens_estimate
+        costs = {}
+        if "requests" in self.limits:
+            costs["requests"] = 1.0
+        if "tokens" in self.limits:
+            # A request larger than the bucket takes all of it rather than never fitting
+            costs["tokens"] = min(float(estimated), self.limits["tokens"][1])
+        waits = await self.store.take(user_id, costs, self.limits) if costs else {}
+        if waits:
+            exhausted = max(waits, key=waits.get)
+            self._stats[f"rejected_{exhausted}"] += 1
+            await self.store.add_usage(user_id, {"rejected": 1})
+            raise RateLimited(f"Rate limit exceeded for user {user_id} ({exhausted} per minute)", waits[exhausted])
+        self._stats["allowed"] += 1
+        await self.store.add_usage(user_id, {"requests": 1, "tokens_estimated": estimated})
+        return Reservation(user_id, prompt_tokens, estimated, costs.get("tokens", 0.0))
+
+    def release(self, reservation: Reservation, completion_tokens: int) -> None:
+        """
+        Settle a completed (or failed) request in the background.
+
+        Args:
+            reservation: Reservation returned by acquire()
+            completion_tokens: Tokens actually generated
+        """
+        task = asyncio.ensure_future(self._settle(reservation, completion_tokens))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _settle(self, reservation: Reservation, completion_tokens: int) -> None:
+        used = reservation.prompt_tokens + completion_tokens
+        try:
+            # Settled against what was charged, which is less than the estimate for oversized requests
+            if "tokens" in self.limits and used != reservation.charged_tokens:
+                await self.store.adjust(
+                    reservation.user_id, "tokens", reservation.charged_tokens - used, self.limits
+                )
+            await self.store.add_usage(reservation.user_id, {"tokens_used": used})
+        except Exception as e:
+            logger.warning(f"Failed to settle rate limit usage for user {reservation.user_id}: {e}")
+
+    async def usage(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Get usage counters.
+
+        Args:
+            user_id: User to query (None = all users)
+
+        Returns:
+            Counters (requests, rejected, tokens_estimated, tokens_used) per user
+        """
+        return await self.store.get_usage(user_id)
+
+    async def http_handler(self, query: str):
+        """MetricsServer route serving usage as JSON (?user_id=... for one user)."""
+        user_id = parse_qs(query).get("user_id", [None])[0]
+        return 200, "application/json", json.dumps(await self.usage(user_id), indent=2) + "\n"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get rate limiting counters of this process.
+
+        Returns:
+            Dictionary with allowed and rejected counts
+        """
+        return dict(self._stats)
+
+    async def close(self) -> None:
+        """Wait for pending settlements and close the store."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.store.close()
+
+
+def create_rate_limiter(
+    backend: str,
+    requests_per_minute: float = 0.0,
+    tokens_per_minute: float = 0.0,
+    request_burst: Optional[float] = None,
+    token_burst: Optional[float] = None,
+    completion_tokens_estimate: int = 256,
+    sqlite_path: str = "ratelimit.db"
+) -> Optional[RateLimiter]:
+    """
+    Create a rate limiter from configuration.
+
+    Args:
+        backend: "memory" or "sqlite"
+        requests_per_minute: Sustained requests per user (0 = unlimited)
+        tokens_per_minute: Sustained LLM tokens per user (0 = unlimited)
+        request_burst: Request bucket capacity
+        token_burst: Token bucket capacity
+        completion_tokens_estimate: Completion tokens charged up front per request
+        sqlite_path: Database file (sqlite backend)
+
+    Returns:
+        Rate limiter, or None when no limit is set
+    """
+    if requests_per_minute <= 0 and tokens_per_minute <= 0:
+        return None
+    if backend == "memory":
+        store: RateLimitStore = InMemoryRateLimitStore()
+    elif backend == "sqlite":
+        store = SQLiteRateLimitStore(sqlite_path)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return RateLimiter(store, requests_per_minute, tokens_per_minute, request_burst, token_burst,
+                       completion_tokens_estimate)
@@ -0,0 +1,273 @@
+"""Resumable streams: recent chunks of each response kept for reconnecting clients."""
+
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeError(Exception):
+    """Raised when a stream cannot be resumed (unknown, expired or offset evicted)."""
+
+    def __init__(self, message: str, code: str):
+        """
+        Args:
+            message: Human readable reason
+            code: gRPC status name to report ("NOT_FOUND" or "OUT_OF_RANGE")
+        """
+        super().__init__(message)
+        self.code = code
+
+
+class StreamBuffer:
+    """
+    Ring buffer of the chunks of one response.
+
+    A producer task fills it from the upstream stream independently of the
+    clients reading it, so generation continues across a reconnect. Chunks
+    are numbered from 0; only the last max_chunks stay readable.
+    """
+
+    def __init__(self, stream_id: str, max_chunks: int, agent_name: str = "", user_id: str = ""):
+        self.stream_id = stream_id
+        self.agent_name = agent_name
+        self.user_id = user_id  # Only the user who started the stream may resume it
+        self._chunks: deque = deque(maxlen=max_chunks)
+        self.base_offset = 0  # Offset of the oldest chunk still buffered
+        self.bytes = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self.updated_at = time.monotonic()
+        self.detached_at = 0.0
+        self.producer: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def end_offset(self) -> int:
+        """Offset of the next chunk to be produced."""
+        return self.base_offset + len(self._chunks)
+
+    def _notify(self) -> None:
+        self.updated_at = time.monotonic()
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def append(self, chunk: str) -> None:
+        if len(self._chunks) == self._chunks.maxlen:
+            self.bytes -= len(self._chunks[0])
+            self.base_offset += 1
+        self._chunks.append(chunk)
+        self.bytes += len(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if not self.done:
+            self.done = True
+            self.error = error
+            self._notify()
+
+    async def read(self, offset: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Read chunks from an offset, following the producer until the stream ends.
+
+        Args:
+            offset: First chunk to read
+
+        Yields:
+            (offset, chunk) pairs
+
+        Raises:
+            ResumeError: If the offset is no longer (or not yet) buffered
+        """
+        if offset > self.end_offset:
+            raise ResumeError(f"Offset {offset} is beyond the end of stream {self.stream_id}", "OUT_OF_RANGE")
+        self.readers += 1
+        try:
+            while True:
+                if offset < self.base_offset:
+                    raise ResumeError(
+                        f"Chunks before offset {self.base_offset} of stream {self.stream_id} were evicted",
+                        "OUT_OF_RANGE"
+                    )
+                if offset < self.end_offset:
+                    yield offset, self._chunks[offset - self.base_offset]
+                    offset += 1
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self.readers -= 1
+            self.updated_at = self.detached_at = time.monotonic()
+
+
+class StreamBufferStore:
+    """
+    Recent response streams keyed by stream id.
+
+    Stream ids are random and issued by the server, and a stream can only be
+    resumed by the user who started it. A stream keeps being generated for
+    detach_grace seconds after its last reader went away; if nobody resumes
+    it in that time the upstream call is cancelled. Finished streams are
+    dropped ttl_seconds after their last activity, and the oldest finished
+    streams are evicted first when the buffered text exceeds max_bytes or
+    the stream count exceeds max_streams.
+    """
+
+    def __init__(
+        self,
+        max_chunks: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_streams: int = 10000,
+        ttl_seconds: float = 300.0,
+        detach_grace: float = 30.0
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            max_chunks: Chunks kept per stream (older ones are dropped)
+            max_bytes: Total buffered text across streams (characters)
+            max_streams: Maximum streams kept
+            ttl_seconds: Lifetime of a finished stream after its last activity
+            detach_grace: Seconds generation continues without any reader
+        """
+        self.max_chunks = max_chunks
+        self.max_bytes = max_bytes
+        self.max_streams = max_streams
+        self.ttl_seconds = ttl_seconds
+        self.detach_grace = detach_grace
+        self._streams: "OrderedDict[str, StreamBuffer]" = OrderedDict()
+        self._bytes = 0  # Buffered text across all streams
+        self._next_sweep = 0.0
+        self._stats = {"created": 0, "resumed": 0, "resume_failed": 0, "abandoned": 0, "evicted": 0}
+
+    def create(self, chunks: AsyncIterator[str], agent_name: str = "", user_id: str = "") -> StreamBuffer:
+        """
+        Start buffering a stream under a new, unguessable id.
+
+        Args:
+            chunks: Upstream chunks; consumed by a background task
+            agent_name: Agent producing the stream (reported on resume)
+            user_id: Owner of the stream
+
+        Returns:
+            The new buffer (its stream_id is sent to the client)
+        """
+        self._evict()
+        buffer = StreamBuffer(secrets.token_urlsafe(16), self.max_chunks, agent_name, user_id)
+        buffer.producer = asyncio.ensure_future(self._produce(buffer, chunks))
+        self._streams[buffer.stream_id] = buffer
+        self._stats["created"] += 1
+        return buffer
+
+    def get(self, stream_id: str, user_id: str = "") -> StreamBuffer:
+        """
+        Look up a stream to resume.
+
+        Args:
+            stream_id: Id sent with the stream's chunks
+            user_id: User asking to resume
+
+        Raises:
+            ResumeError: If the stream is unknown, expired or belongs to another user
+        """
+        self._evict()
+        buffer = self._streams.get(stream_id)
+        # Another user's stream is reported exactly like an unknown one
+        if buffer is None or buffer.user_id != user_id:
+            self._stats["resume_failed"] += 1
+            raise ResumeError(f"Stream {stream_id} is unknown or expired", "NOT_FOUND")
+        self._streams.move_to_end(stream_id)
+        self._stats["resumed"] += 1
+        return buffer
+
+    async def read(self, buffer: StreamBuffer, offset: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Read a buffered stream; when the last reader leaves, start the detach grace period.
+
+        Args:
+            buffer: Stream to read
+            offset: First chunk to read
+
+        Yields:
+            (offset, chunk) pairs
+        """
+        reader = buffer.read(offset)
+        try:
+            async for item in reader:
+                yield item
+        except ResumeError:
+            self._stats["resume_failed"] += 1
+            raise
+        finally:
+            await reader.aclose()
+            if buffer.readers == 0 and not buffer.done:
+                asyncio.get_running_loop().call_later(self.detach_grace, self._abandon_if_idle, buffer)
+
+    async def _produce(self, buffer: StreamBuffer, chunks: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in chunks:
+                size = buffer.bytes
+                buffer.append(chunk)
+                self._bytes += buffer.bytes - size
+            buffer.finish()
+        except asyncio.CancelledError:
+            buffer.finish(ResumeError(f"Generation of stream {buffer.stream_id} was cancelled", "NOT_FOUND"))
+            raise
+        except Exception as e:
+            buffer.finish(e)
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _abandon_if_idle(self, buffer: StreamBuffer) -> None:
+        # A reader that attached and left again in the meantime scheduled its own check
+        idle = time.monotonic() - buffer.detached_at
+        if buffer.readers == 0 and not buffer.done and idle >= self.detach_grace * 0.999:
+            logger.info(f"Stream {buffer.stream_id} abandoned, cancelling generation")
+            self._stats["abandoned"] += 1
+            buffer.producer.cancel()
+
+    def _remove(self, stream_id: str) -> None:
+        self._bytes -= self._streams.pop(stream_id).bytes
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            # Expiry needs a full scan, so it runs at most once per second
+            self._next_sweep = now + 1.0
+            for stream_id, buffer in list(self._streams.items()):
+                if buffer.done and buffer.readers == 0 and now - buffer.updated_at > self.ttl_seconds:
+                    self._remove(stream_id)
+        if self._bytes <= self.max_bytes and len(self._streams) < self.max_streams:
+            return
+        # Oldest first; streams still producing or being read are kept
+        for stream_id, buffer in list(self._streams.items()):
+            if self._bytes <= self.max_bytes and len(self._streams) < self.max_streams:
+                break
+            if buffer.done and buffer.readers == 0:
+                self._remove(stream_id)
+                self._stats["evicted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get buffer counters.
+
+        Returns:
+            Dictionary with stream counts, buffered bytes and resume outcomes
+        """
+        return {
+            **self._stats,
+            "streams": len(self._streams),
+            "active": sum(1 for buffer in self._streams.values() if not buffer.done),
+            "bytes": self._bytes,
+        }
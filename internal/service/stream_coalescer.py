@@ -0,0 +1,148 @@
+"""Coalescing of small streamed chunks into fewer, larger response messages."""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Queued by the pump after the last upstream chunk
+_END = object()
+# Upstream chunks read ahead of the consumer
+_QUEUE_CHUNKS = 16
+
+
+class StreamCoalescer:
+    """
+    Merge token-sized chunks before they are sent to the client.
+
+    The first chunk is always sent immediately so time to first token is
+    unchanged. After that, chunks are buffered until the buffer reaches
+    max_bytes or the oldest buffered chunk is max_delay old, whichever
+    comes first.
+
+    A single pump task reads upstream into a small bounded queue, so
+    upstream is pulled only a few chunks ahead of the consumer: while the
+    client is slow (the gRPC write is blocked on flow control) no further
+    chunks are read, so backpressure reaches the model backend instead of
+    piling up in server memory.
+    """
+
+    def __init__(self, max_bytes: int = 256, max_delay_ms: float = 20.0):
+        """
+        Initialize coalescer.
+
+        Args:
+            max_bytes: Flush when this many UTF-8 bytes are buffered
+            max_delay_ms: Flush when the oldest buffered chunk is this old
+        """
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = max_bytes
+        self.max_delay = max(max_delay_ms, 0.0) / 1000.0
+        self._stats = {"chunks_in": 0, "messages_out": 0, "size_flushes": 0, "time_flushes": 0}
+
+    async def coalesce(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Re-chunk a stream.
+
+        Args:
+            chunks: Upstream text chunks
+
+        Yields:
+            Merged chunks, in order and without loss
+        """
+        iterator = chunks.__aiter__()
+        # Bounded, so a slow client still throttles upstream
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=_QUEUE_CHUNKS)
+        pump = asyncio.ensure_future(self._pump(iterator, queue))
+        buffer = []
+        size = 0
+        deadline: Optional[float] = None
+        first = True
+        try:
+            while True:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                elif deadline is None:
+                    item = await queue.get()
+                else:
+                    # The flush timer only runs while something is buffered
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            item = await queue.get()
+                    except TimeoutError:
+                        # Window expired while upstream is still generating
+                        self._stats["time_flushes"] += 1
+                        yield self._flush(buffer)
+                        buffer, size, deadline = [], 0, None
+                        continue
+
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    # Deliver what was generated before the failure
+                    if buffer:
+                        yield self._flush(buffer)
+                        buffer = []
+                    raise item
+                if not item:
+                    continue
+                self._stats["chunks_in"] += 1
+                if first:
+                    first = False
+                    self._stats["messages_out"] += 1
+                    yield item
+                    continue
+
+                buffer.append(item)
+                size += len(item.encode("utf-8"))
+                if size >= self.max_bytes:
+                    self._stats["size_flushes"] += 1
+                    yield self._flush(buffer)
+                    buffer, size, deadline = [], 0, None
+                elif deadline is None:
+                    deadline = asyncio.get_running_loop().time() + self.max_delay
+
+            if buffer:
+                yield self._flush(buffer)
+        finally:
+            pump.cancel()
+            try:
+                await pump
+            except asyncio.CancelledError:
+                pass
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    @staticmethod
+    async def _pump(iterator: AsyncIterator[str], queue: "asyncio.Queue[Any]") -> None:
+        """Move upstream chunks into the queue, ending with _END or the upstream exception."""
+        while True:
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                await queue.put(_END)
+                return
+            except Exception as e:
+                await queue.put(e)
+                return
+            await queue.put(chunk)
+
+    def _flush(self, buffer: list) -> str:
+        self._stats["messages_out"] += 1
+        return "".join(buffer)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with chunk/message counts and the average merge factor
+        """
+        messages = self._stats["messages_out"]
+        return {
+            **self._stats,
+            "avg_chunks_per_message": self._stats["chunks_in"] / messages if messages else 0.0,
+        }
@@ -0,0 +1,6 @@
+"""Make the project packages importable when running pytest from the repository root."""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
@@ -0,0 +1,122 @@
+"""Tests for admission control."""
+
+import asyncio
+
+import pytest
+
+from internal.service.admission import AdmissionController, AdmissionRejected
+
+
+async def hold(controller, release, order, name, agent="chat", user_id="", priority=0):
+    async with controller.slot(agent, user_id, priority):
+        order.append(name)
+        await release.wait()
+
+
+def test_global_limit_queues_until_a_slot_frees():
+    async def run():
+        controller = AdmissionController(max_concurrency=1)
+        release, order = asyncio.Event(), []
+        first = asyncio.ensure_future(hold(controller, release, order, "first"))
+        second = asyncio.ensure_future(hold(controller, release, order, "second"))
+        await asyncio.sleep(0.01)
+        assert order == ["first"]
+        assert controller.stats()["waiting"] == 1
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert controller.stats()["running"] == 0
+        assert controller.stats()["queued"] == 1
+
+    asyncio.run(run())
+
+
+def test_per_agent_limit_does_not_block_other_agents():
+    async def run():
+        controller = AdmissionController(agent_limits={"code": 1})
+        release, order = asyncio.Event(), []
+        tasks = [asyncio.ensure_future(hold(controller, release, order, name, agent=agent))
+                 for name, agent in (("code1", "code"), ("code2", "code"), ("chat", "chat"))]
+        await asyncio.sleep(0.01)
+        assert order == ["code1", "chat"]
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_waiters_admitted_by_priority_then_fairness():
+    async def run():
+        controller = AdmissionController(max_concurrency=2)
+        release, order = asyncio.Event(), []
+        gate = asyncio.Event()
+        # "busy" keeps one slot for the whole test
+        blocker = asyncio.ensure_future(hold(controller, gate, order, "blocker", user_id="busy"))
+        filler = asyncio.ensure_future(hold(controller, release, order, "filler", user_id="other"))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(hold(controller, release, order, "busy-low", user_id="busy")),
+            asyncio.ensure_future(hold(controller, release, order, "idle-low", user_id="idle")),
+            asyncio.ensure_future(hold(controller, release, order, "high", user_id="busy", priority=5)),
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(filler, *waiters)
+        gate.set()
+        await blocker
+        assert order == ["blocker", "filler", "high", "idle-low", "busy-low"]
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_immediately():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        release, order = asyncio.Event(), []
+        tasks = [asyncio.ensure_future(hold(controller, release, order, name)) for name in ("a", "b")]
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected, match="queue is full") as rejected:
+            await hold(controller, release, order, "c")
+        assert rejected.value.retry_after > 0
+        assert controller.stats()["rejected"] == 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_queue_wait_times_out():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_wait=0.02)
+        release, order = asyncio.Event(), []
+        first = asyncio.ensure_future(hold(controller, release, order, "first"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            await hold(controller, release, order, "second")
+        stats = controller.stats()
+        assert stats["timed_out"] == 1
+        assert stats["waiting"] == 0
+        release.set()
+        await first
+        assert controller.stats()["running"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        controller = AdmissionController(max_concurrency=1)
+        release, order = asyncio.Event(), []
+        first = asyncio.ensure_future(hold(controller, release, order, "first"))
+        second = asyncio.ensure_future(hold(controller, release, order, "second"))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        assert controller.stats()["waiting"] == 0
+        release.set()
+        await first
+        assert order == ["first"]
+        assert controller.stats()["running"] == 0
+
+    asyncio.run(run())
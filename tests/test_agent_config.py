@@ -0,0 +1,94 @@
+"""Tests for the agents file loader."""
+
+import json
+import sys
+
+import pytest
+
+from internal.agents.agent_config import AgentSpec, create_agent, load_agents_file
+
+TOML = """
+[defaults]
+temperature = 0.3
+
+[[agents]]
+name = "fast"
+default = true
+model = "small"
+base_url = "http://localhost:11434/v1"
+
+[[agents]]
+name = "deep"
+model = "large"
+base_urls = "http://gpu-1/v1, http://gpu-2/v1"
+temperature = 0.1
+
+[[agents]]
+name = "off"
+enabled = false
+
+[[routing_rules]]
+agent = "deep"
+keywords = ["prove"]
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_toml_file_with_defaults_and_extra_sections(tmp_path):
+    document = load_agents_file(write(tmp_path, "agents.toml", TOML))
+    fast, deep = document["agents"]
+    assert [fast.name, deep.name] == ["fast", "deep"]
+    assert fast.temperature == 0.3 and deep.temperature == 0.1
+    assert fast.default and fast.type == "langchain"
+    assert deep.base_urls == ["http://gpu-1/v1", "http://gpu-2/v1"]
+    # Other sections are passed through for other components
+    assert document["routing_rules"] == [{"agent": "deep", "keywords": ["prove"]}]
+
+
+def test_json_file(tmp_path):
+    agents = {"agents": [{"name": "chat", "model": "gpt", "cache": {"enabled": True, "ttl_seconds": 60}}]}
+    document = load_agents_file(write(tmp_path, "agents.json", json.dumps(agents)))
+    (spec,) = document["agents"]
+    assert spec.model == "gpt"
+    assert spec.cache.enabled and spec.cache.ttl_seconds == 60
+
+
+def test_unknown_agent_type_is_rejected_with_the_agent_name(tmp_path):
+    path = write(tmp_path, "agents.json", json.dumps({"agents": [{"name": "x", "type": "magic"}]}))
+    with pytest.raises(ValueError, match="(?s)Invalid agent 'x'.*unknown agent type 'magic'"):
+        load_agents_file(path)
+
+
+def test_duplicate_names_are_rejected(tmp_path):
+    path = write(tmp_path, "agents.json", json.dumps({"agents": [{"name": "a"}, {"name": "a"}]}))
+    with pytest.raises(ValueError, match="Duplicate agent names"):
+        load_agents_file(path)
+
+
+def test_unsupported_extension_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported agents file format"):
+        load_agents_file(write(tmp_path, "agents.ini", ""))
+
+
+def test_missing_pyyaml_is_named(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "yaml", None)
+    with pytest.raises(RuntimeError, match="PyYAML"):
+        load_agents_file(write(tmp_path, "agents.yaml", "agents: []"))
+
+
+def test_api_key_from_environment(monkeypatch):
+    monkeypatch.setenv("TEAM_KEY", "secret")
+    assert AgentSpec(name="a", api_key="inline", api_key_env="TEAM_KEY").resolve_api_key("fallback") == "secret"
+    assert AgentSpec(name="a", api_key="inline").resolve_api_key("fallback") == "inline"
+    assert AgentSpec(name="a").resolve_api_key("fallback") == "fallback"
+
+
+def test_lazy_agent_keeps_the_spec_metadata():
+    spec = AgentSpec(name="chat", description="Chat agent", capabilities=["chat"], base_url="http://local/v1")
+    agent = create_agent(spec, config=None, shared={})
+    assert agent.metadata.name == "chat" and agent.metadata.capabilities == ["chat"]
@@ -0,0 +1,156 @@
+"""Tests for the backend load balancer."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.backend_pool import Backend, BackendPool
+
+
+def make_pool(count=3, **kwargs):
+    kwargs.setdefault("probe_interval", 0)
+    return BackendPool([Backend(f"http://replica{i}", client=None) for i in range(count)], **kwargs)
+
+
+async def fail(pool, backend=None):
+    exclude = [b for b in pool.backends if b is not backend] if backend is not None else ()
+    with pytest.raises(ConnectionError):
+        async with pool.acquire(exclude) as lease:
+            assert backend is None or lease.backend is backend
+            raise ConnectionError("refused")
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    async def run():
+        pool = make_pool()
+        release = asyncio.Event()
+        chosen = []
+
+        async def request():
+            async with pool.acquire() as lease:
+                chosen.append(lease.backend.url)
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(request()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert sorted(chosen) == ["http://replica0", "http://replica1", "http://replica2"]
+        assert [b.outstanding for b in pool.backends] == [1, 1, 1]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert [b.outstanding for b in pool.backends] == [0, 0, 0]
+
+    asyncio.run(run())
+
+
+def test_ewma_prefers_unmeasured_then_fastest_backend():
+    pool = make_pool(strategy="ewma")
+    pool.record_success(pool.backends[0], 0.5)
+    pool.record_success(pool.backends[1], 0.1)
+    assert pool.select() is pool.backends[2]
+    pool.record_success(pool.backends[2], 0.3)
+    assert pool.select() is pool.backends[1]
+    # Outstanding requests inflate the estimate
+    pool.backends[1].outstanding = 5
+    assert pool.select() is pool.backends[2]
+
+
+def test_ewma_is_smoothed():
+    pool = make_pool(count=1, ewma_alpha=0.5)
+    backend = pool.backends[0]
+    pool.record_success(backend, 1.0)
+    pool.record_success(backend, 3.0)
+    assert backend.ewma_latency == pytest.approx(2.0)
+
+
+def test_backend_ejected_after_max_failures_and_skipped():
+    async def run():
+        pool = make_pool(max_failures=2)
+        broken = pool.backends[0]
+        await fail(pool, broken)
+        assert not broken.ejected
+        await fail(pool, broken)
+        assert broken.ejected
+        for _ in range(5):
+            assert pool.select() is not broken
+        # Excluding every healthy backend still returns something
+        assert pool.select(exclude=pool.backends[1:]) is broken
+
+    asyncio.run(run())
+
+
+def test_success_resets_failures_and_restores():
+    async def run():
+        pool = make_pool(count=1, max_failures=1)
+        backend = pool.backends[0]
+        await fail(pool)
+        assert backend.ejected
+        async with pool.acquire() as lease:
+            assert lease.backend is backend
+        assert not backend.ejected and backend.consecutive_failures == 0
+        assert backend.failures == 1 and backend.requests == 2
+
+    asyncio.run(run())
+
+
+def test_cancellation_is_not_a_failure():
+    async def run():
+        pool = make_pool(count=1, max_failures=1)
+        backend = pool.backends[0]
+        started = asyncio.Event()
+
+        async def request():
+            async with pool.acquire():
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(request())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert backend.failures == 0 and not backend.ejected
+        # No latency sample either: the request never finished
+        assert backend.ewma_latency is None and backend.outstanding == 0
+
+    asyncio.run(run())
+
+
+def test_probe_readmits_ejected_backend():
+    async def run():
+        healthy = {"http://replica0": False}
+
+        async def probe(backend):
+            return healthy[backend.url]
+
+        pool = make_pool(count=1, max_failures=1, probe_interval=0.01, probe=probe)
+        backend = pool.backends[0]
+        try:
+            await fail(pool)
+            assert backend.ejected
+            await asyncio.sleep(0.03)
+            assert backend.ejected
+            healthy[backend.url] = True
+            await asyncio.sleep(0.03)
+            assert not backend.ejected and backend.consecutive_failures == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_default_probe_uses_the_shared_client():
+    class Client:
+        def __init__(self):
+            self.urls = []
+
+        async def get(self, url, timeout=None):
+            self.urls.append(url)
+            return type("Response", (), {"status_code": 401})()
+
+    async def run():
+        client = Client()
+        pool = make_pool(count=1, http_client=client)
+        assert await pool._probe(pool.backends[0])
+        assert client.urls == ["http://replica0/models"]
+
+    asyncio.run(run())
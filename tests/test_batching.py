@@ -0,0 +1,62 @@
+"""Tests for micro-batching."""
+
+import asyncio
+
+from internal.agents.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    batches = []
+
+    async def dispatch(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(dispatch, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i, f"user{i % 2}") for i in range(4)))
+        await batcher.close()
+        return results
+
+    assert asyncio.run(scenario()) == [0, 2, 4, 6]
+    assert len(batches) == 1 and sorted(batches[0]) == [0, 1, 2, 3]
+
+
+def test_dispatch_errors_reach_every_caller():
+    async def dispatch(items):
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        batcher = MicroBatcher(dispatch, max_batch_size=2, max_wait_ms=1)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    assert [str(result) for result in asyncio.run(scenario())] == ["upstream down", "upstream down"]
+
+
+def test_abandoned_batch_cancels_the_upstream_call():
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def dispatch(items):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return items
+
+        batcher = MicroBatcher(dispatch, max_batch_size=2, max_wait_ms=1)
+        callers = [asyncio.ensure_future(batcher.submit(i)) for i in range(2)]
+        await asyncio.sleep(0.02)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        # One caller still waits: the batch keeps running
+        assert not cancelled.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await batcher.close()
+        return batcher.stats()
+
+    assert asyncio.run(scenario())["abandoned_batches"] == 1
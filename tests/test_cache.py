@@ -0,0 +1,106 @@
+"""Tests for the response cache."""
+
+import pytest
+
+from internal.agents import cache as response_cache
+from internal.agents.cache import ResponseCache
+
+
+class Clock:
+    """Stands in for the cache module's time module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def store(cache, message, response, temperature=0.0, history=()):
+    key = cache.make_key("model", temperature, list(history), message)
+    cache.put(key, response, message)
+
+
+def lookup(cache, message, temperature=0.0, history=()):
+    return cache.get(cache.make_key("model", temperature, list(history), message), message)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = ResponseCache()
+    store(cache, "What is Python?", "A language")
+    assert lookup(cache, "  what is   python? ") == "A language"
+    assert lookup(cache, "What is Rust?") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_scope_separates_temperature_and_history():
+    cache = ResponseCache()
+    store(cache, "hi", "hello")
+    assert lookup(cache, "hi", temperature=0.7) is None
+    assert lookup(cache, "hi", history=[{"role": "user", "content": "earlier"}]) is None
+
+
+def test_entries_expire(clock):
+    cache = ResponseCache(ttl_seconds=10)
+    store(cache, "hi", "hello")
+    clock.now += 9
+    assert lookup(cache, "hi") == "hello"
+    clock.now += 2
+    assert lookup(cache, "hi") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    store(cache, "a", "1")
+    store(cache, "b", "2")
+    assert lookup(cache, "a") == "1"
+    store(cache, "c", "3")
+    assert lookup(cache, "b") is None
+    assert lookup(cache, "a") == "1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_semantic_hit_for_single_turn_prompt_at_temperature_zero():
+    cache = ResponseCache(semantic_threshold=0.8)
+    store(cache, "how do I reverse a list in python", "list.reverse()")
+    assert lookup(cache, "how do I reverse a list in python please") == "list.reverse()"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_no_semantic_hit_with_history_or_sampling():
+    cache = ResponseCache(semantic_threshold=0.8)
+    history = [{"role": "user", "content": "earlier"}]
+    store(cache, "how do I reverse a list in python", "answer", history=history)
+    store(cache, "how do I reverse a list in python", "answer", temperature=0.7)
+    assert lookup(cache, "how do I reverse a list in python please", history=history) is None
+    assert lookup(cache, "how do I reverse a list in python please", temperature=0.7) is None
+    assert cache.stats()["semantic_hits"] == 0
+
+
+def test_no_semantic_hit_when_numbers_differ():
+    cache = ResponseCache(semantic_threshold=0.5)
+    store(cache, "what is 12 times 34", "408")
+    assert lookup(cache, "what is 12 times 35") is None
+    assert lookup(cache, "what is 12 times 34 ?") == "408"
+
+
+def test_semantic_scopes_are_pruned_and_cleared():
+    cache = ResponseCache(max_entries=1, semantic_threshold=0.8)
+    for model in ("a", "b", "c"):
+        key = cache.make_key(model, 0.0, [], "hi")
+        cache.put(key, "hello", "hi")
+    # Only the scope of the entry still cached is tracked
+    assert len(cache._semantic_scopes) == 1
+    cache.clear()
+    assert not cache._semantic_scopes
+    assert lookup(cache, "hi") is None
@@ -0,0 +1,129 @@
+"""Tests for the model cascade agent."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.base import AgentMetadata, BaseAgent
+from internal.agents.cascade_agent import CascadeAgent, CascadeOptions
+
+
+class Tier(BaseAgent):
+    """Stub tier answering with fixed text, streamed in `chunk`-character pieces."""
+
+    def __init__(self, name, answer, chunk=10):
+        super().__init__(AgentMetadata(name=name, description=name))
+        self.answer = answer
+        self.chunk = chunk
+        self.prompts = []
+        self.streamed = 0
+        self.closed = False
+
+    async def process(self, message, context=None):
+        self.prompts.append(message)
+        return self.answer
+
+    async def process_stream(self, message, context=None):
+        self.prompts.append(message)
+        try:
+            for start in range(0, len(self.answer), self.chunk):
+                self.streamed += 1
+                yield self.answer[start:start + self.chunk]
+        finally:
+            self.closed = True
+
+
+def long_enough(message, answer):
+    return len(answer) > 20
+
+
+async def mentions_question(message, answer):
+    await asyncio.sleep(0)
+    return message.split()[0].lower() in answer.lower()
+
+
+def cascade(small_answer, large_answer="Large answer.", **options):
+    small, large = Tier("small", small_answer), Tier("large", large_answer)
+    agent = CascadeAgent([small, large], CascadeOptions(tiers=["small", "large"], **options))
+    return agent, small, large
+
+
+async def stream(agent, message="question"):
+    return [chunk async for chunk in agent.process_stream(message)]
+
+
+def test_good_answer_from_the_first_tier_is_kept():
+    agent, small, large = cascade("Small answer.")
+    assert asyncio.run(agent.process("question")) == "Small answer."
+    assert large.prompts == []
+    assert agent.stats()["served_tier0"] == 1
+
+
+@pytest.mark.parametrize("answer, options, reason", [
+    ("Error: upstream down", {}, "error"),
+    ("ok", {"min_chars": 5}, "short"),
+    ("I'm not sure what you mean.", {}, "refusal"),
+    ("抱歉，我无法回答。", {}, "refusal"),
+    ("Short.", {"validator": "test_cascade_agent:long_enough"}, "validator"),
+    ("Unrelated text.", {"validator": "test_cascade_agent:mentions_question"}, "validator"),
+])
+def test_failed_checks_escalate(answer, options, reason):
+    agent, small, large = cascade(answer, **options)
+    assert asyncio.run(agent.process("question")) == "Large answer."
+    assert agent.stats()[f"escalated_{reason}"] == 1
+    assert agent.stats()["served_tier1"] == 1
+
+
+def test_refusal_is_only_checked_at_the_start():
+    agent, _, _ = cascade("x" * 250 + " I cannot say more.")
+    assert asyncio.run(agent.process("question")).startswith("x")
+    assert agent.stats()["escalations"] == 0
+
+
+def test_confidence_line_is_stripped_and_checked():
+    agent, small, large = cascade("Paris.\nConfidence: 0.9", confidence_threshold=0.5)
+    assert asyncio.run(agent.process("capital?")) == "Paris."
+    assert small.prompts[0].endswith("Confidence: <number between 0 and 1>\" "
+                                     "saying how sure you are that the answer is correct and complete.")
+    # The last tier is not asked for a confidence
+    agent, small, large = cascade("Paris.\n**Confidence:** 40%", confidence_threshold=0.5)
+    assert asyncio.run(agent.process("capital?")) == "Large answer."
+    assert large.prompts == ["capital?"]
+    assert agent.stats()["escalated_low_confidence"] == 1
+
+
+@pytest.mark.parametrize("answer", ["Paris.\nConfidence: high", "Paris.\nConfidence -", "Paris."])
+def test_malformed_or_missing_confidence_counts_as_not_confident(answer):
+    assert CascadeAgent._split_confidence(answer) == (answer, None)
+    agent, _, _ = cascade(answer, confidence_threshold=0.5)
+    assert asyncio.run(agent.process("capital?")) == "Large answer."
+    assert agent.stats()["escalated_low_confidence"] == 1
+
+
+def test_stream_accepted_early_tier_is_sent_as_one_chunk():
+    agent, small, large = cascade("A good answer from the small model.")
+    assert asyncio.run(stream(agent)) == ["A good answer from the small model."]
+    assert small.closed and large.prompts == []
+
+
+def test_stream_escalation_sends_only_the_final_tier_chunk_by_chunk():
+    agent, small, large = cascade("ok", "The large model streams this.", min_chars=5)
+    chunks = asyncio.run(stream(agent))
+    assert chunks == ["The large ", "model stre", "ams this."]
+    assert agent.stats()["escalated_short"] == 1
+
+
+def test_stream_refusal_stops_the_early_tier_after_the_head():
+    agent, small, large = cascade("I cannot help with that. " + "filler " * 200)
+    chunks = asyncio.run(stream(agent))
+    assert "".join(chunks) == "Large answer."
+    # Cut off once the first 200 characters were checked
+    assert small.streamed == 20 and small.closed
+    assert agent.stats()["escalated_refusal"] == 1
+
+
+def test_unavailable_tiers_are_skipped():
+    agent, small, large = cascade("Small answer.")
+    small.metadata.is_active = False
+    assert asyncio.run(agent.process("question")) == "Large answer."
+    assert small.prompts == []
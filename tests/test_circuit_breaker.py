@@ -0,0 +1,166 @@
+"""Tests for the circuit breaker."""
+
+import asyncio
+
+import pytest
+
+from internal.agents import circuit_breaker as cb
+from internal.agents.base import AgentMetadata, BaseAgent
+from internal.agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from internal.agents.registry import AgentRegistry
+
+
+class Clock:
+    """Stands in for the breaker module's time module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cb, "time", clock)
+    return clock
+
+
+class ClientError(Exception):
+    status_code = 400
+
+
+async def call(breaker, error=None, duration=0.0, clock=None):
+    async with breaker.guard():
+        if clock is not None:
+            clock.now += duration
+        if error is not None:
+            raise error
+
+
+def fail(breaker, error=None):
+    error = error or RuntimeError("down")
+    with pytest.raises(type(error)):
+        asyncio.run(call(breaker, error))
+
+
+def test_consecutive_failures_open_then_probe_closes(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        fail(breaker)
+    assert breaker.state == OPEN and not breaker.available()
+    with pytest.raises(CircuitOpen):
+        asyncio.run(call(breaker))
+
+    clock.now += 10
+    assert breaker.available()
+    asyncio.run(call(breaker))
+    assert breaker.state == CLOSED
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_failed_probe_reopens_with_doubled_timeout(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=10, max_reset_timeout=15)
+    fail(breaker)
+    clock.now += 10
+    fail(breaker)
+    assert breaker.state == OPEN and breaker.reset_timeout == 15
+    clock.now += 10
+    assert not breaker.available()
+    clock.now += 5
+    asyncio.run(call(breaker))
+    assert breaker.state == CLOSED and breaker.reset_timeout == 10
+
+
+def test_client_errors_do_not_count(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=1)
+    fail(breaker, ClientError("bad request"))
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=2, slow_call_seconds=5)
+    asyncio.run(call(breaker, duration=6, clock=clock))
+    asyncio.run(call(breaker, duration=6, clock=clock))
+    assert breaker.state == OPEN and breaker.stats()["slow_calls"] == 2
+
+
+def test_cancelled_calls_count_only_when_already_slow(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=1, slow_call_seconds=5)
+
+    async def cancelled_after(duration):
+        async def hang():
+            async with breaker.guard():
+                clock.now += duration
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(hang())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_after(1))
+    assert breaker.state == CLOSED
+    asyncio.run(cancelled_after(6))
+    assert breaker.state == OPEN
+
+
+def test_failure_rate_over_full_window_opens(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=100, failure_rate=0.5, window=4)
+    for error in (None, RuntimeError("x"), None, RuntimeError("y")):
+        if error is None:
+            asyncio.run(call(breaker))
+        else:
+            fail(breaker, error)
+    assert breaker.state == OPEN
+
+
+def test_half_open_limits_concurrent_probes(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=1, reset_timeout=1, half_open_max_calls=1)
+    fail(breaker)
+    clock.now += 1
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def probe():
+            async with breaker.guard():
+                started.set()
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(probe())
+        await started.wait()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            await call(breaker)
+        await task
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+class GuardedAgent(BaseAgent):
+    def __init__(self, name, breaker):
+        super().__init__(AgentMetadata(name=name, description=name))
+        self.breaker = breaker
+
+    def is_available(self):
+        return self.metadata.is_active and self.breaker.available()
+
+    async def process(self, message, context=None):
+        return message
+
+    async def process_stream(self, message, context=None):
+        yield message
+
+
+def test_registry_reports_agents_failing_fast(clock):
+    breaker = CircuitBreaker("backend", failure_threshold=1)
+    registry = AgentRegistry()
+    registry.register(GuardedAgent("chat", breaker))
+    assert not registry.has_unavailable()
+    fail(breaker)
+    assert registry.has_unavailable() and registry.has_unavailable("chat")
+    assert not registry.has_unavailable("unknown")
@@ -0,0 +1,111 @@
+"""Tests for history compaction."""
+
+import asyncio
+
+from internal.agents.compaction import HistoryCompactor, TokenCounter
+from internal.memory.session_store import InMemorySessionStore
+
+
+class FixedCounter(TokenCounter):
+    """One token per character, without tiktoken."""
+
+    def count(self, text):
+        return len(text)
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, summary, turns):
+        self.calls.append((summary, turns))
+        return f"summary{len(self.calls)}"
+
+
+def turn(i):
+    return [{"role": "user", "content": f"question {i:03d} " + "x" * 40},
+            {"role": "assistant", "content": f"answer {i:03d} " + "y" * 40}]
+
+
+def make_compactor(summarizer, budget=600):
+    return HistoryCompactor(summarizer, budget, recent_ratio=0.5, counter=FixedCounter())
+
+
+def test_history_within_budget_is_untouched():
+    summarizer = RecordingSummarizer()
+    compactor = make_compactor(summarizer)
+    history = turn(0)
+    assert asyncio.run(compactor.compact(history, "hi")) == (None, history)
+    assert summarizer.calls == []
+
+
+def test_client_history_extends_previous_summary():
+    async def scenario():
+        summarizer = RecordingSummarizer()
+        compactor = make_compactor(summarizer)
+        history = []
+        for i in range(30):
+            summary, recent = await compactor.compact(history, "next")
+            history = history + turn(i)
+        return summarizer
+
+    summarizer = asyncio.run(scenario())
+    # Only the first compaction starts from scratch; later ones fold new turns only
+    assert [summary for summary, _ in summarizer.calls].count(None) == 1
+    assert all(turns for _, turns in summarizer.calls)
+
+
+def test_summary_survives_session_trimming():
+    async def scenario():
+        summarizer = RecordingSummarizer()
+        compactor = make_compactor(summarizer)
+        store = InMemorySessionStore(max_messages=20)
+        seen = []
+        for i in range(60):
+            session = await store.get_session("u", "s")
+            summary, recent = await compactor.compact(session.messages, "next", session.conversation_id)
+            seen.append(summary)
+            await store.append("u", "s", turn(i))
+        return summarizer, seen
+
+    summarizer, seen = asyncio.run(scenario())
+    assert [summary for summary, _ in summarizer.calls].count(None) == 1
+    assert all(turns for _, turns in summarizer.calls)
+    # No message is folded twice although the store kept dropping the oldest ones
+    folded = [msg["content"] for _, turns in summarizer.calls for msg in turns]
+    assert len(folded) == len(set(folded))
+    # Once compaction started, every prompt carries a summary
+    first = next(i for i, summary in enumerate(seen) if summary is not None)
+    assert all(summary is not None for summary in seen[first:])
+
+
+def test_cleared_session_does_not_reuse_summary():
+    async def scenario():
+        summarizer = RecordingSummarizer()
+        compactor = make_compactor(summarizer)
+        store = InMemorySessionStore(max_messages=20)
+        for i in range(12):
+            await store.append("u", "s", turn(i))
+        session = await store.get_session("u", "s")
+        await compactor.compact(session.messages, "next", session.conversation_id)
+        await store.clear("u", "s")
+        for i in range(12):
+            await store.append("u", "s", turn(100 + i))
+        session = await store.get_session("u", "s")
+        await compactor.compact(session.messages, "next", session.conversation_id)
+        return summarizer
+
+    summarizer = asyncio.run(scenario())
+    assert [summary for summary, _ in summarizer.calls] == [None, None]
+
+
+def test_failed_summary_truncates_history():
+    async def failing(summary, turns):
+        raise RuntimeError("upstream down")
+
+    compactor = make_compactor(failing)
+    history = [msg for i in range(12) for msg in turn(i)]
+    summary, recent = asyncio.run(compactor.compact(history, "next"))
+    assert summary is None
+    assert recent == history[-len(recent):] and len(recent) < len(history)
+    assert compactor.stats()["summary_failures"] == 1
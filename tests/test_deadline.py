@@ -0,0 +1,72 @@
+"""Tests for deadline propagation."""
+
+import asyncio
+
+import pytest
+
+from internal.service.deadline import DeadlineExceeded, call_with_deadline, stream_with_deadline
+
+
+class SlowStream:
+    """Async iterator yielding items after a delay, recording whether it was closed."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.delays:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delays.pop(0))
+        return "chunk"
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_stream_without_deadline_passes_items_through():
+    async def scenario():
+        upstream = SlowStream([0, 0, 0])
+        items = [item async for item in stream_with_deadline(upstream, None)]
+        return items, upstream.closed
+
+    assert asyncio.run(scenario()) == (["chunk"] * 3, True)
+
+
+def test_stream_deadline_interrupts_upstream_read():
+    async def scenario():
+        upstream = SlowStream([0, 0, 5])
+        items = []
+        with pytest.raises(DeadlineExceeded):
+            async for item in stream_with_deadline(upstream, 0.05):
+                items.append(item)
+        return items, upstream.closed
+
+    assert asyncio.run(scenario()) == (["chunk", "chunk"], True)
+
+
+def test_stream_deadline_never_cancels_the_consumer():
+    async def scenario():
+        upstream = SlowStream([0, 0])
+        items = []
+        with pytest.raises(DeadlineExceeded):
+            async for item in stream_with_deadline(upstream, 0.02):
+                # The consumer's own work outlives the deadline without being interrupted
+                await asyncio.sleep(0.05)
+                items.append(item)
+        return items
+
+    # The expired deadline is reported by the next upstream read
+    assert asyncio.run(scenario()) == ["chunk"]
+
+
+def test_call_with_deadline():
+    async def scenario():
+        assert await call_with_deadline(asyncio.sleep(0, "done"), 1.0) == "done"
+        with pytest.raises(DeadlineExceeded):
+            await call_with_deadline(asyncio.sleep(5), 0.01)
+
+    asyncio.run(scenario())
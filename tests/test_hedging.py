@@ -0,0 +1,167 @@
+"""Tests for hedged requests."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.hedging import HedgePolicy, hedged_call, hedged_stream
+
+
+def policy(delay=0.02, tokens=10.0, **kwargs):
+    """Policy whose hedge delay is `delay` seconds, with hedge budget available."""
+    hedge_policy = HedgePolicy(min_delay_ms=0, min_samples=1, budget_ratio=1.0, max_tokens=tokens, **kwargs)
+    hedge_policy.record(delay)
+    hedge_policy._tokens = tokens
+    return hedge_policy
+
+
+def attempts(*behaviours):
+    """make_call for hedged_call: each attempt sleeps, then returns or raises."""
+    started = []
+
+    async def make_call(index):
+        started.append(index)
+        seconds, outcome = behaviours[index]
+        await asyncio.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return make_call, started
+
+
+def test_delay_is_a_percentile_of_recent_latencies():
+    hedge_policy = HedgePolicy(percentile=90, min_delay_ms=5, min_samples=10)
+    for ms in range(1, 10):
+        hedge_policy.record(ms / 1000.0)
+    assert hedge_policy.delay() is None
+    hedge_policy.record(0.1)
+    assert hedge_policy.delay() == pytest.approx(0.1)
+    hedge_policy = HedgePolicy(min_delay_ms=50, min_samples=1)
+    hedge_policy.record(0.001)
+    assert hedge_policy.delay() == pytest.approx(0.05)
+
+
+def test_fast_primary_is_not_hedged():
+    async def run():
+        hedge_policy = policy()
+        make_call, started = attempts((0.0, "primary"), (0.0, "hedge"))
+        assert await hedged_call(hedge_policy, make_call) == "primary"
+        assert started == [0]
+        assert hedge_policy.stats()["hedges"] == 0
+
+    asyncio.run(run())
+
+
+def test_slow_primary_is_hedged_and_the_hedge_wins():
+    async def run():
+        hedge_policy = policy(delay=0.01)
+        make_call, started = attempts((1.0, "primary"), (0.0, "hedge"))
+        assert await hedged_call(hedge_policy, make_call) == "hedge"
+        assert started == [0, 1]
+        stats = hedge_policy.stats()
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+        # The hedged call's latency is recorded too
+        assert len(hedge_policy._samples) == 2 and hedge_policy._samples[-1] >= 0.01
+
+    asyncio.run(run())
+
+
+def test_no_hedge_when_budget_is_exhausted():
+    async def run():
+        hedge_policy = policy(delay=0.01, tokens=0.0)
+        hedge_policy.budget_ratio = 0.0
+        make_call, started = attempts((0.03, "primary"), (0.0, "hedge"))
+        assert await hedged_call(hedge_policy, make_call) == "primary"
+        assert started == [0]
+        assert hedge_policy.stats()["budget_exhausted"] == 1
+
+    asyncio.run(run())
+
+
+def test_early_primary_failure_fails_over_to_the_hedge():
+    async def run():
+        hedge_policy = policy(delay=1.0)
+        make_call, started = attempts((0.0, ConnectionError("down")), (0.0, "hedge"))
+        assert await hedged_call(hedge_policy, make_call) == "hedge"
+        assert started == [0, 1]
+        assert hedge_policy.stats()["hedge_wins"] == 1
+
+    asyncio.run(run())
+
+
+def test_primary_error_is_raised_when_both_attempts_fail():
+    async def run():
+        hedge_policy = policy(delay=0.01)
+        make_call, started = attempts((0.02, ValueError("primary")), (0.0, ConnectionError("hedge")))
+        with pytest.raises(ValueError, match="primary"):
+            await hedged_call(hedge_policy, make_call)
+        assert started == [0, 1]
+        # Failures are not latency samples
+        assert len(hedge_policy._samples) == 1
+
+    asyncio.run(run())
+
+
+def test_slow_primary_is_cancelled_when_the_hedge_wins():
+    async def run():
+        cancelled = asyncio.Event()
+
+        async def make_call(index):
+            if index == 1:
+                return "hedge"
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        assert await hedged_call(policy(delay=0.01), make_call) == "hedge"
+        assert cancelled.is_set()
+
+    asyncio.run(run())
+
+
+def streams(*behaviours):
+    """make_stream for hedged_stream: each stream waits, then yields its chunks or raises."""
+    async def make_stream(index):
+        seconds, outcome = behaviours[index]
+        await asyncio.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        for chunk in outcome:
+            yield chunk
+
+    return make_stream
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_stream_hedge_wins_on_first_chunk():
+    async def run():
+        hedge_policy = policy(delay=0.01)
+        chunks = await collect(hedged_stream(hedge_policy, streams((1.0, ["slow"]), (0.0, ["a", "b"]))))
+        assert chunks == ["a", "b"]
+        assert hedge_policy.stats()["hedge_wins"] == 1
+
+    asyncio.run(run())
+
+
+def test_stream_fails_over_after_early_error():
+    async def run():
+        hedge_policy = policy(delay=1.0)
+        make_stream = streams((0.0, ConnectionError("down")), (0.0, ["a"]))
+        assert await collect(hedged_stream(hedge_policy, make_stream)) == ["a"]
+
+    asyncio.run(run())
+
+
+def test_stream_raises_when_both_attempts_fail():
+    async def run():
+        make_stream = streams((0.02, ValueError("primary")), (0.0, ConnectionError("hedge")))
+        with pytest.raises((ValueError, ConnectionError)):
+            await collect(hedged_stream(policy(delay=0.01), make_stream))
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+"""Tests for the shared HTTP connection pool."""
+
+import asyncio
+
+from internal.agents.http_pool import HTTPClientPool
+from internal.metrics.tracing import start_trace
+
+
+async def serve_ok(reader, writer):
+    while True:
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+
+
+def test_connect_stage_recorded_for_new_connections_only():
+    async def run():
+        server = await asyncio.start_server(serve_ok, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+        pool = HTTPClientPool()
+        try:
+            trace = start_trace("test")
+            assert (await pool.client.get(url)).text == "ok"
+            assert trace.stages["upstream_connect"] > 0
+            assert pool.stats()["connections_opened"] == 1
+
+            # The second request reuses the pooled connection
+            trace = start_trace("test")
+            assert (await pool.client.get(url)).text == "ok"
+            assert "upstream_connect" not in trace.stages
+            assert pool.stats()["requests"] == 2
+        finally:
+            await pool.aclose()
+            server.close()
+
+    asyncio.run(run())
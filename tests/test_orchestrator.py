@@ -0,0 +1,101 @@
+"""Tests for multi-agent orchestration."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.base import AgentMetadata, BaseAgent
+from internal.agents.registry import AgentRegistry
+from internal.agents.router import AgentRouter
+from internal.graph.orchestrator import Orchestrator, split_subtasks
+from internal.service.admission import AdmissionController
+
+
+class EchoAgent(BaseAgent):
+    def __init__(self, name="chat"):
+        super().__init__(AgentMetadata(name=name, description=name))
+        self.calls = []
+
+    async def process(self, message, context=None):
+        self.calls.append(message)
+        return f"answer to {message}"
+
+    async def process_stream(self, message, context=None):
+        yield await self.process(message, context)
+
+
+@pytest.mark.parametrize("message", [
+    "Summarize this; keep it short",
+    "What is a closure? How do I write one in Python?",
+    "Explain recursion to me.",
+    "- just one bullet",
+])
+def test_ordinary_sentences_are_left_whole(message):
+    assert split_subtasks(message) == [message]
+
+
+def test_list_items_are_split():
+    message = "Please help with:\n1. Sort a list\n2) Reverse a string\n- Parse JSON"
+    assert split_subtasks(message) == ["Sort a list", "Reverse a string", "Parse JSON"]
+    assert split_subtasks(message, max_subtasks=2) == ["Sort a list", "Reverse a string"]
+
+
+def test_questions_and_semicolons_split_only_when_asked():
+    assert split_subtasks("What is a closure? What is a generator?", sentences=True) == [
+        "What is a closure?", "What is a generator?"
+    ]
+    assert split_subtasks("Sort this list; reverse that string", sentences=True) == [
+        "Sort this list", "reverse that string"
+    ]
+
+
+def make_orchestrator(agent):
+    registry = AgentRegistry()
+    registry.register(agent)
+    return Orchestrator(AgentRouter(registry), enabled=True)
+
+
+def test_use_orchestration_honours_context_flags():
+    orchestrator = make_orchestrator(EchoAgent())
+    listed = "1. Sort a list\n2. Reverse a string"
+    assert orchestrator.use_orchestration(listed)
+    assert not orchestrator.use_orchestration(listed, {"orchestrate": "false"})
+    assert not orchestrator.use_orchestration("Summarize this; keep it short")
+    assert orchestrator.use_orchestration("Summarize this; keep it short", {"orchestrate": "sentences"})
+
+
+def test_each_subtask_goes_through_the_runner():
+    async def run():
+        agent = EchoAgent()
+        orchestrator = make_orchestrator(agent)
+        admission = AdmissionController(agent_limits={"chat": 1})
+        running, peak, calls = 0, 0, []
+
+        async def runner(target, subtask, context):
+            nonlocal running, peak
+            async with admission.slot(target.metadata.name, "user"):
+                running += 1
+                peak = max(peak, running)
+                calls.append(subtask)
+                await asyncio.sleep(0.01)
+                running -= 1
+                return await target.process(subtask, context)
+
+        response = await orchestrator.orchestrate("1. Sort a list\n2. Reverse a string", {}, runner)
+        assert sorted(calls) == ["Reverse a string", "Sort a list"]
+        # The per-agent limit applies to every sub-task
+        assert peak == 1
+        assert response == "1. Sort a list\nanswer to Sort a list\n\n2. Reverse a string\nanswer to Reverse a string"
+        assert admission.stats()["admitted"] == 2
+
+    asyncio.run(run())
+
+
+def test_without_runner_agents_are_called_directly():
+    async def run():
+        agent = EchoAgent()
+        response = await make_orchestrator(agent).orchestrate("1. Sort a list\n2. Reverse a string")
+        assert agent.calls == ["Sort a list", "Reverse a string"]
+        assert response.startswith("1. Sort a list\nanswer to Sort a list")
+
+    asyncio.run(run())
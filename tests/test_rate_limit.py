@@ -0,0 +1,87 @@
+"""Tests for per-user rate limiting."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.singleflight import SingleFlight
+from internal.metrics.tracing import add_tokens, start_trace
+from internal.service.rate_limit import InMemoryRateLimitStore, RateLimited, RateLimiter
+
+
+def limiter(**kwargs):
+    return RateLimiter(InMemoryRateLimitStore(), completion_tokens_estimate=100, **kwargs)
+
+
+def test_requests_over_quota_are_rejected_with_a_retry_hint():
+    async def scenario():
+        rate_limiter = limiter(requests_per_minute=60, request_burst=2)
+        await rate_limiter.acquire("alice", "hi")
+        await rate_limiter.acquire("alice", "hi")
+        with pytest.raises(RateLimited) as error:
+            await rate_limiter.acquire("alice", "hi")
+        # Other users have their own buckets
+        await rate_limiter.acquire("bob", "hi")
+        return error.value.retry_after
+
+    assert 0 < asyncio.run(scenario()) <= 1.0
+
+
+def test_settlement_refunds_unused_estimate_and_charges_overruns():
+    async def scenario():
+        rate_limiter = limiter(tokens_per_minute=1000)
+        store = rate_limiter.store
+        # 400 characters of message and history: 100 prompt tokens, 200 charged up front
+        reservation = await rate_limiter.acquire("alice", "x" * 200, {"messages": [{"content": "y" * 200}]})
+        assert reservation.estimated_tokens == 200
+        rate_limiter.release(reservation, completion_tokens=20)
+        await rate_limiter.close()
+        refunded = store._bucket("alice", "tokens", rate_limiter.limits, 0)[0]
+
+        reservation = await rate_limiter.acquire("bob", "x" * 400)
+        rate_limiter.release(reservation, completion_tokens=500)
+        await rate_limiter.close()
+        charged = store._bucket("bob", "tokens", rate_limiter.limits, 0)[0]
+        return refunded, charged, await rate_limiter.usage("alice")
+
+    refunded, charged, usage = asyncio.run(scenario())
+    assert refunded == pytest.approx(1000 - 120, abs=1)
+    assert charged == pytest.approx(1000 - 600, abs=1)
+    assert usage["alice"]["tokens_estimated"] == 200 and usage["alice"]["tokens_used"] == 120
+
+
+def test_request_larger_than_the_burst_pays_for_what_it_used():
+    async def scenario():
+        rate_limiter = limiter(tokens_per_minute=1000)
+        # 2000 prompt tokens plus 100 estimated: more than the whole bucket
+        reservation = await rate_limiter.acquire("alice", "x" * 8000)
+        assert reservation.estimated_tokens == 2100
+        assert reservation.charged_tokens == 1000
+        rate_limiter.release(reservation, completion_tokens=50)
+        await rate_limiter.close()
+        with pytest.raises(RateLimited):
+            await rate_limiter.acquire("alice", "hi")
+        return rate_limiter.store._bucket("alice", "tokens", rate_limiter.limits, 0)[0]
+
+    # Charged 1000 up front, settled against the 2050 used: 1050 tokens in debt
+    assert asyncio.run(scenario()) == pytest.approx(-1050, abs=1)
+
+
+def test_coalesced_callers_are_each_charged_for_the_shared_answer():
+    group = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        add_tokens(30)
+        return "answer"
+
+    async def caller(user_id):
+        trace = start_trace("Process", user_id)
+        result = await group.do("key", generate)
+        return result, trace.tokens
+
+    async def scenario():
+        return await asyncio.gather(caller("alice"), caller("bob"))
+
+    assert asyncio.run(scenario()) == [("answer", 30), ("answer", 30)]
+    assert group.stats()["coalesced"] == 1
@@ -0,0 +1,103 @@
+"""Tests for agent routing."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.base import AgentMetadata, BaseAgent
+from internal.agents.capability_index import CapabilityIndex
+from internal.agents.registry import AgentRegistry
+from internal.agents.router import AgentRouter
+from internal.agents.rules import RuleEngine, RoutingRule
+
+
+class Agent(BaseAgent):
+    def __init__(self, name, description, capabilities=()):
+        super().__init__(AgentMetadata(name=name, description=description, capabilities=list(capabilities)))
+
+    async def process(self, message, context=None):
+        return message
+
+    async def process_stream(self, message, context=None):
+        yield message
+
+
+def semantic_router(min_score=0.1, **kwargs):
+    registry = AgentRegistry(CapabilityIndex(), default_agent="chat")
+    registry.register(Agent("chat", "General conversation and small talk", ["chat"]))
+    registry.register(Agent("code", "Writes and debugs Python code", ["python", "programming", "debugging"]))
+    registry.register(Agent("translate", "Translates text between languages", ["translation", "languages"]))
+    return AgentRouter(registry, strategy="semantic", semantic_min_score=min_score, **kwargs), registry
+
+
+def route(router, message, context=None, explicit=None):
+    agent = asyncio.run(router.route(message, context, explicit))
+    return agent.metadata.name if agent else None
+
+
+def test_index_ranks_agents_by_similarity():
+    index = CapabilityIndex()
+    index.add(AgentMetadata(name="code", description="Writes Python code", capabilities=["python"]))
+    index.add(AgentMetadata(name="chat", description="General conversation", capabilities=["chat"]))
+    ranked = index.rank("fix my python code")
+    assert [name for name, _ in ranked] == ["code", "chat"]
+    assert ranked[0][1] > ranked[1][1]
+    version = index.version
+    index.remove("code")
+    assert index.version == version + 1 and len(index) == 1
+    index.remove("code")
+    assert index.version == version + 1
+
+
+def test_semantic_routing_picks_the_closest_agent():
+    router, _ = semantic_router()
+    assert route(router, "please debug this python programming error") == "code"
+    assert route(router, "translate this text between languages") == "translate"
+
+
+def test_low_scores_fall_back_to_the_default_agent():
+    router, _ = semantic_router(min_score=0.99)
+    assert route(router, "please debug this python programming error") == "chat"
+
+
+def test_unavailable_match_falls_through_to_the_next_best():
+    router, registry = semantic_router()
+    registry.get("code").metadata.is_active = False
+    assert route(router, "please debug this python programming error") != "code"
+
+
+def test_explicit_agent_and_rules_win_over_the_strategy():
+    router, _ = semantic_router()
+    assert route(router, "debug my python code", explicit="translate") == "translate"
+    router.rules = RuleEngine([RoutingRule(agent="translate", keywords=["python"])])
+    assert route(router, "debug my python code") == "translate"
+
+
+def test_routing_decisions_are_memoized_per_index_version():
+    router, registry = semantic_router(route_cache_size=2)
+    index = registry.capability_index
+    calls = 0
+    rank = index.rank
+
+    def counting_rank(message):
+        nonlocal calls
+        calls += 1
+        return rank(message)
+
+    index.rank = counting_rank
+    assert route(router, "debug my python code") == "code"
+    assert route(router, "  Debug my PYTHON code ") == "code"
+    assert calls == 1
+    # Registering an agent changes the index version, so the memo is bypassed
+    registry.register(Agent("python", "Python code debugging expert", ["python", "debugging", "code"]))
+    assert route(router, "debug my python code") == "python"
+    assert calls == 2
+    # The memo keeps at most route_cache_size decisions
+    route(router, "translate this")
+    route(router, "hello there")
+    assert len(router._route_cache) == 2
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        AgentRouter(AgentRegistry(), strategy="random")
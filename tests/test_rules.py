@@ -0,0 +1,53 @@
+"""Tests for compiled routing rules."""
+
+import pytest
+
+from internal.agents.rules import RoutingRule, RuleEngine
+
+
+def engine(*rules):
+    return RuleEngine.from_document({"routing_rules": list(rules)})
+
+
+def names(rules):
+    return [rule.name for rule in rules]
+
+
+def test_keywords_match_case_insensitively_including_prefixes():
+    rules = engine(
+        {"name": "code", "agent": "coder", "keywords": ["code"]},
+        {"name": "codegen", "agent": "generator", "keywords": ["CodeGen"], "priority": 5},
+        {"name": "weather", "agent": "weather", "keywords": ["天气"]},
+    )
+    assert names(rules.match("please run CODEGEN now")) == ["codegen", "code"]
+    assert names(rules.match("今天天气怎么样")) == ["weather"]
+    assert rules.match("nothing here") == []
+
+
+def test_patterns_and_context_conditions():
+    rules = engine(
+        {"name": "sql", "agent": "db", "patterns": [r"\bselect\b.+\bfrom\b"], "context": {"tier": ["pro", "team"]}},
+        {"name": "fallback", "agent": "chat", "priority": -1},
+    )
+    chosen = rules.select("SELECT * FROM users", {"tier": "pro"}, lambda agent: True)
+    assert chosen.name == "sql"
+    assert rules.select("SELECT * FROM users", {"tier": "free"}, lambda agent: True).name == "fallback"
+    # An unavailable agent passes the request on to the next rule
+    assert rules.select("SELECT * FROM users", {"tier": "pro"}, lambda agent: agent != "db").name == "fallback"
+    assert rules.hits == {"sql": 1, "fallback": 2}
+
+
+def test_scoped_flags_are_accepted():
+    rules = engine({"name": "multiline", "agent": "a", "patterns": ["(?s:begin.*end)"]})
+    assert names(rules.match("begin\nend")) == ["multiline"]
+
+
+@pytest.mark.parametrize("pattern", ["(?i)foo", r"(a)\1", "(?P<word>a)(?P=word)", "(unclosed"])
+def test_patterns_that_cannot_be_combined_are_rejected_with_the_rule_name(pattern):
+    with pytest.raises(ValueError, match="Invalid routing rule 'bad'"):
+        engine({"name": "ok", "agent": "a", "patterns": ["fine"]}, {"name": "bad", "agent": "b", "patterns": [pattern]})
+
+
+def test_duplicate_rule_names_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate"):
+        RuleEngine([RoutingRule(agent="a", name="x"), RoutingRule(agent="b", name="x")])
@@ -0,0 +1,74 @@
+"""Tests for the server-side session stores."""
+
+import asyncio
+
+import pytest
+
+from internal.memory.session_store import InMemorySessionStore, SQLiteSessionStore, parse_messages
+
+
+def turn(i):
+    return [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemorySessionStore(max_messages=6)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_messages=6)
+    yield store
+    asyncio.run(store.close())
+
+
+def test_sessions_are_private_to_their_user(store):
+    async def scenario():
+        await store.append("alice", "s1", turn(1))
+        assert await store.get_history("alice", "s1") == turn(1)
+        # Same session id, different user: a separate, empty session
+        assert await store.get_history("mallory", "s1") == []
+        await store.append("mallory", "s1", turn(2))
+        assert await store.get_history("alice", "s1") == turn(1)
+        await store.clear("mallory", "s1")
+        assert await store.get_history("alice", "s1") == turn(1)
+
+    asyncio.run(scenario())
+
+
+def test_history_is_trimmed_to_max_messages(store):
+    async def scenario():
+        for i in range(5):
+            await store.append("u", "s", turn(i))
+        history = await store.get_history("u", "s")
+        assert history == turn(2) + turn(3) + turn(4)
+
+    asyncio.run(scenario())
+
+
+def test_clear_removes_history(store):
+    async def scenario():
+        await store.append("u", "s", turn(1))
+        await store.clear("u", "s")
+        assert await store.get_history("u", "s") == []
+
+    asyncio.run(scenario())
+
+
+def test_parse_messages_accepts_json_and_drops_invalid_items():
+    assert parse_messages('[{"role": "user", "content": "hi"}, 3]') == [{"role": "user", "content": "hi"}]
+    assert parse_messages("not json") == []
+    assert parse_messages(None) == []
+
+
+def test_conversation_id_is_stable_until_the_session_is_cleared(store):
+    async def scenario():
+        assert (await store.get_session("u", "s")).conversation_id == ""
+        await store.append("u", "s", turn(1))
+        first = (await store.get_session("u", "s")).conversation_id
+        await store.append("u", "s", turn(2))
+        assert (await store.get_session("u", "s")).conversation_id == first
+        await store.clear("u", "s")
+        await store.append("u", "s", turn(3))
+        assert (await store.get_session("u", "s")).conversation_id not in ("", first)
+
+    asyncio.run(scenario())
@@ -0,0 +1,143 @@
+"""Tests for request coalescing."""
+
+import asyncio
+
+import pytest
+
+from internal.agents.singleflight import SingleFlight
+
+
+def test_make_key_ignores_caller_context():
+    group = SingleFlight()
+    key = group.make_key("chat", "hi", {"user_id": "a", "temperature": "0"})
+    assert key == group.make_key("chat", "hi", {"user_id": "b", "temperature": "0"})
+    assert key != group.make_key("chat", "hi", {"user_id": "a", "temperature": "1"})
+    assert key != group.make_key("code", "hi", {"user_id": "a", "temperature": "0"})
+
+
+def test_do_shares_one_call():
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        group = SingleFlight()
+        results = await asyncio.gather(*(group.do("k", upstream) for _ in range(5)))
+        assert results == ["answer"] * 5
+        assert group.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+    asyncio.run(run())
+    assert calls == 1
+
+
+def test_do_propagates_error_to_every_caller():
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        group = SingleFlight()
+        results = await asyncio.gather(*(group.do("k", upstream) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The failed call is forgotten, so the next request retries
+        with pytest.raises(RuntimeError):
+            await group.do("k", upstream)
+        assert group.stats()["leaders"] == 2
+
+    asyncio.run(run())
+
+
+def test_do_cancels_upstream_when_all_callers_leave():
+    async def run():
+        upstream_cancelled = asyncio.Event()
+
+        async def upstream():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        group = SingleFlight()
+        callers = [asyncio.ensure_future(group.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not upstream_cancelled.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(upstream_cancelled.wait(), 1.0)
+        assert group.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_stream_fans_out_and_replays_for_late_joiners():
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def collect(group, delay=0.0):
+        await asyncio.sleep(delay)
+        return [chunk async for chunk in group.stream("k", upstream)]
+
+    async def run():
+        group = SingleFlight()
+        results = await asyncio.gather(collect(group), collect(group, delay=0.015))
+        assert results == [["a", "b", "c"], ["a", "b", "c"]]
+
+    asyncio.run(run())
+    assert calls == 1
+
+
+def test_stream_propagates_error_after_chunks():
+    async def upstream():
+        yield "partial"
+        raise RuntimeError("upstream down")
+
+    async def collect(group, received):
+        async for chunk in group.stream("k", upstream):
+            received.append(chunk)
+
+    async def run():
+        group = SingleFlight()
+        received = [[], []]
+        results = await asyncio.gather(*(collect(group, r) for r in received), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert received == [["partial"], ["partial"]]
+
+    asyncio.run(run())
+
+
+def test_stream_closes_upstream_when_all_subscribers_leave():
+    async def run():
+        closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                while True:
+                    yield "x"
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        group = SingleFlight()
+        streams = [group.stream("k", upstream) for _ in range(2)]
+        for stream in streams:
+            assert await stream.__anext__() == "x"
+        await streams[0].aclose()
+        await asyncio.sleep(0.02)
+        assert not closed.is_set()
+        await streams[1].aclose()
+        await asyncio.wait_for(closed.wait(), 1.0)
+        assert group.stats()["in_flight"] == 0
+
+    asyncio.run(run())
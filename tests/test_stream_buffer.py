@@ -0,0 +1,95 @@
+"""Tests for resumable stream buffers."""
+
+import asyncio
+
+import pytest
+
+from internal.service.stream_buffer import ResumeError, StreamBufferStore
+
+
+async def produce(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def read_all(store, buffer, offset=0):
+    return [item async for item in store.read(buffer, offset)]
+
+
+def test_resume_from_offset_replays_the_rest():
+    async def scenario():
+        store = StreamBufferStore()
+        buffer = store.create(produce(["a", "b", "c"]), "agent", "alice")
+        first = await read_all(store, buffer)
+        resumed = store.get(buffer.stream_id, "alice")
+        return first, await read_all(store, resumed, 1)
+
+    first, resumed = asyncio.run(scenario())
+    assert first == [(0, "a"), (1, "b"), (2, "c")]
+    assert resumed == [(1, "b"), (2, "c")]
+
+
+def test_streams_are_private_and_ids_unique():
+    async def scenario():
+        store = StreamBufferStore()
+        first = store.create(produce(["a"]), "agent", "alice")
+        second = store.create(produce(["b"]), "agent", "alice")
+        assert first.stream_id != second.stream_id
+        with pytest.raises(ResumeError) as error:
+            store.get(first.stream_id, "mallory")
+        assert error.value.code == "NOT_FOUND"
+        # A second stream of the same user does not disturb the first
+        assert await read_all(store, store.get(first.stream_id, "alice")) == [(0, "a")]
+        assert await read_all(store, store.get(second.stream_id, "alice")) == [(0, "b")]
+
+    asyncio.run(scenario())
+
+
+def test_evicted_offset_is_out_of_range():
+    async def scenario():
+        store = StreamBufferStore(max_chunks=2)
+        buffer = store.create(produce(["a", "b", "c"]), "agent", "u")
+        await buffer.producer
+        with pytest.raises(ResumeError) as error:
+            await read_all(store, buffer, 0)
+        assert error.value.code == "OUT_OF_RANGE"
+        assert await read_all(store, buffer, 1) == [(1, "b"), (2, "c")]
+
+    asyncio.run(scenario())
+
+
+def test_finished_streams_are_evicted_beyond_max_bytes():
+    async def scenario():
+        store = StreamBufferStore(max_bytes=10)
+        old = store.create(produce(["x" * 8]), "agent", "u")
+        await old.producer
+        assert store.stats()["bytes"] == 8
+        new = store.create(produce(["y" * 8]), "agent", "u")
+        await new.producer
+        store.create(produce([]), "agent", "u")
+        with pytest.raises(ResumeError):
+            store.get(old.stream_id, "u")
+        assert store.get(new.stream_id, "u") is new
+        return store.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["evicted"] == 1 and stats["bytes"] == 8
+
+
+def test_abandoned_stream_is_cancelled_after_grace():
+    async def slow():
+        yield "a"
+        await asyncio.sleep(10)
+        yield "b"
+
+    async def scenario():
+        store = StreamBufferStore(detach_grace=0.01)
+        buffer = store.create(slow(), "agent", "u")
+        reader = store.read(buffer)
+        assert await reader.__anext__() == (0, "a")
+        await reader.aclose()
+        await asyncio.sleep(0.05)
+        return buffer, store.stats()
+
+    buffer, stats = asyncio.run(scenario())
+    assert buffer.producer.cancelled() and stats["abandoned"] == 1
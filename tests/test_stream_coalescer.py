@@ -0,0 +1,70 @@
+"""Tests for stream chunk coalescing."""
+
+import asyncio
+
+import pytest
+
+from internal.service.stream_coalescer import _QUEUE_CHUNKS, StreamCoalescer
+
+
+async def produce(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_first_chunk_is_sent_alone_and_the_rest_merged_by_size():
+    coalescer = StreamCoalescer(max_bytes=4, max_delay_ms=1000)
+    out = asyncio.run(collect(coalescer.coalesce(produce(["a", "b", "c", "d", "e", "f"]))))
+    assert out == ["a", "bcde", "f"]
+    assert coalescer.stats()["size_flushes"] == 1
+
+
+def test_slow_upstream_flushes_after_max_delay():
+    coalescer = StreamCoalescer(max_bytes=1024, max_delay_ms=5)
+    out = asyncio.run(collect(coalescer.coalesce(produce(["a", "b", "c"], delay=0.02))))
+    assert out == ["a", "b", "c"]
+    assert coalescer.stats()["time_flushes"] == 1
+
+
+def test_upstream_error_delivers_buffered_text_first():
+    async def failing():
+        yield "a"
+        yield "b"
+        raise RuntimeError("backend gone")
+
+    async def scenario():
+        out = []
+        with pytest.raises(RuntimeError, match="backend gone"):
+            async for chunk in StreamCoalescer(max_bytes=1024, max_delay_ms=1000).coalesce(failing()):
+                out.append(chunk)
+        return out
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_closing_early_stops_reading_upstream():
+    pulled = []
+
+    async def endless():
+        i = 0
+        while True:
+            pulled.append(i)
+            yield str(i)
+            i += 1
+            await asyncio.sleep(0)
+
+    async def scenario():
+        stream = StreamCoalescer(max_bytes=1, max_delay_ms=1000).coalesce(endless())
+        assert await stream.__anext__() == "0"
+        await asyncio.sleep(0.01)
+        # The slow consumer holds upstream back instead of buffering it
+        assert len(pulled) <= _QUEUE_CHUNKS + 2
+        await stream.aclose()
+
+    asyncio.run(scenario())
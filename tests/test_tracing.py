@@ -0,0 +1,130 @@
+"""Tests for request tracing and metric aggregation."""
+
+import asyncio
+
+import pytest
+
+from internal.metrics.aggregate import merge_expositions
+from internal.metrics.registry import MetricsRegistry
+from internal.metrics.tracing import (
+    RequestTrace, add_tokens, current_trace, observe_stage, start_shared_task, start_trace,
+)
+
+
+def test_stages_accumulate_and_feed_the_histogram():
+    registry = MetricsRegistry()
+    trace = RequestTrace("Process", registry=registry)
+    trace.record("routing", 0.25)
+    trace.record("routing", 0.5)
+    trace.record("queue_wait", 1.0)
+    assert trace.stages == {"routing": 0.75, "queue_wait": 1.0}
+    stage = registry.histogram("assistant_stage_duration_seconds", "")
+    assert stage.count("routing") == 2 and stage.count("queue_wait") == 1
+
+
+def test_finish_is_idempotent():
+    registry = MetricsRegistry()
+    trace = RequestTrace("Process", registry=registry)
+    trace.agent = "chat"
+    trace.add_tokens(10)
+    first = trace.finish()
+    second = trace.finish("INTERNAL")
+    assert first["status"] == "OK" and second["status"] == "INTERNAL"
+    requests = registry.counter("assistant_requests_total", "")
+    assert requests.value("Process", "OK") == 1
+    assert requests.value("Process", "INTERNAL") == 0
+    assert registry.counter("assistant_completion_tokens_total", "").value("chat") == 10
+    assert registry.histogram("assistant_request_duration_seconds", "").count("Process", "chat") == 1
+
+
+def test_cancelled_requests_credit_the_tokens_they_did_not_generate():
+    registry = MetricsRegistry()
+    for tokens in (100, 300):
+        trace = RequestTrace("ProcessStream", registry=registry)
+        trace.agent = "chat"
+        trace.add_tokens(tokens)
+        trace.finish()
+    # The average completed answer is 200 tokens; this one stopped after 50
+    trace = RequestTrace("ProcessStream", registry=registry)
+    trace.agent = "chat"
+    trace.add_tokens(50)
+    trace.finish("CANCELLED")
+    saved = registry.counter("assistant_cancelled_tokens_saved_total", "")
+    assert saved.value("chat") == pytest.approx(150)
+
+
+def test_chunks_record_first_chunk_and_gaps():
+    registry = MetricsRegistry()
+    trace = RequestTrace("ProcessStream", registry=registry)
+    trace.agent = "chat"
+    for _ in range(3):
+        trace.on_chunk()
+    assert trace.chunks == 3
+    assert registry.histogram("assistant_time_to_first_chunk_seconds", "").count("ProcessStream", "chat") == 1
+    assert registry.histogram("assistant_inter_chunk_gap_seconds", "").count("chat") == 2
+    assert "time_to_first_chunk_s" in trace.summary()
+
+
+def test_shared_task_has_its_own_trace():
+    async def run():
+        request = start_trace("Process")
+
+        async def shared_work():
+            add_tokens(7)
+            observe_stage("upstream_total", 0.1)
+            return current_trace()
+
+        task, shared = start_shared_task(shared_work(), "singleflight")
+        assert await task is shared
+        # Nothing leaks into the request that started the shared work
+        assert current_trace() is request
+        assert request.tokens == 0 and "upstream_total" not in request.stages
+        assert shared.tokens == 7 and shared.rpc == "singleflight"
+
+    asyncio.run(run())
+
+
+WORKER = """# HELP requests_total Requests
+# TYPE requests_total counter
+requests_total{{rpc="Process"}} {requests}
+# TYPE latency_seconds histogram
+latency_seconds_bucket{{le="1"}} {requests}
+latency_seconds_bucket{{le="+Inf"}} {requests}
+latency_seconds_sum {requests}
+latency_seconds_count {requests}
+# TYPE queue_waiting gauge
+queue_waiting {waiting}
+"""
+
+
+def test_merge_sums_counters_and_histograms_and_labels_gauges():
+    merged = merge_expositions({
+        "0": WORKER.format(requests=2, waiting=1),
+        "1": WORKER.format(requests=3, waiting=4),
+    })
+    lines = merged.splitlines()
+    assert 'requests_total{rpc="Process"} 5' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 5' in lines
+    assert "latency_seconds_count 5" in lines
+    assert 'queue_waiting{worker="0"} 1' in lines
+    assert 'queue_waiting{worker="1"} 4' in lines
+    assert lines.count("# TYPE requests_total counter") == 1
+    assert "# HELP requests_total Requests" in lines
+
+
+def test_merge_keeps_existing_gauge_labels():
+    merged = merge_expositions({"2": '# TYPE cache_size gauge\ncache_size{agent="chat"} 7\n'})
+    assert 'cache_size{worker="2",agent="chat"} 7' in merged.splitlines()
+
+
+def test_merge_of_real_registries():
+    texts = {}
+    for worker in ("0", "1"):
+        registry = MetricsRegistry()
+        trace = RequestTrace("Process", registry=registry)
+        trace.finish()
+        registry.register_collector("assistant_admission", lambda: {"running": 1})
+        texts[worker] = registry.render()
+    lines = merge_expositions(texts).splitlines()
+    assert 'assistant_requests_total{rpc="Process",status="OK"} 2' in lines
+    assert 'assistant_admission_running{worker="0"} 1' in lines
@@ -0,0 +1,101 @@
+"""Tests for model warmup and readiness."""
+
+import asyncio
+
+from internal.agents.base import AgentMetadata
+from internal.agents.cascade_agent import CascadeAgent, CascadeOptions
+from internal.agents.warmup import ModelWarmer
+
+
+class LocalAgent:
+    """Local-model agent whose warm() fails until `failures` attempts have been made."""
+
+    is_local = True
+
+    def __init__(self, name, failures=0):
+        self.metadata = AgentMetadata(name=name, description=name)
+        self.failures = failures
+        self.attempts = 0
+        self.last_used_at = 0.0
+
+    async def warm(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("model server not up")
+
+
+def test_ready_after_all_agents_warm():
+    async def run():
+        warmer = ModelWarmer(warmup_timeout=1.0, retry_interval=0.01)
+        agents = [LocalAgent("a"), LocalAgent("b", failures=2)]
+        assert await warmer.warm(agents)
+        assert warmer.ready.is_set()
+        assert warmer.readyz_handler("")[0] == 200
+        assert warmer.stats()["warmed"] == 2
+
+    asyncio.run(run())
+
+
+def test_not_ready_after_timeout():
+    async def run():
+        warmer = ModelWarmer(warmup_timeout=0.02, retry_interval=0.01)
+        assert not await warmer.warm([LocalAgent("ok"), LocalAgent("cold", failures=100)])
+        assert not warmer.ready.is_set()
+        assert warmer.readyz_handler("")[0] == 503
+        assert warmer.stats()["cold"] == 1
+
+    asyncio.run(run())
+
+
+def test_keepalive_retries_cold_agents_until_ready():
+    async def run():
+        warmer = ModelWarmer(keepalive_interval=0, warmup_timeout=0.02, retry_interval=0.01)
+        cold = LocalAgent("cold", failures=5)
+        assert not await warmer.warm([cold])
+        await asyncio.wait_for(warmer.keepalive(), 1.0)
+        assert warmer.ready.is_set()
+        assert warmer.stats()["cold"] == 0
+
+    asyncio.run(run())
+
+
+def test_inactive_and_remote_agents_are_skipped():
+    async def run():
+        warmer = ModelWarmer(warmup_timeout=0.02, retry_interval=0.01)
+        remote = LocalAgent("remote", failures=100)
+        remote.is_local = False
+        inactive = LocalAgent("inactive", failures=100)
+        inactive.metadata.is_active = False
+        assert await warmer.warm([remote, inactive])
+        assert remote.attempts == inactive.attempts == 0
+
+    asyncio.run(run())
+
+
+def test_cascade_tiers_are_warmed_separately():
+    async def run():
+        warmer = ModelWarmer(warmup_timeout=0.02, retry_interval=0.01)
+        small, large = LocalAgent("small"), LocalAgent("large")
+        small.is_available = large.is_available = lambda: True
+        cascade = CascadeAgent([small, large], CascadeOptions(tiers=["small", "large"]))
+        # The large tier is also registered on its own; it is warmed once
+        assert await warmer.warm([cascade, large])
+        assert warmer.agents == [small, large]
+        assert small.attempts == large.attempts == 1
+
+    asyncio.run(run())
+
+
+def test_cascade_warm_runs_tiers_concurrently():
+    class SlowAgent(LocalAgent):
+        async def warm(self):
+            await asyncio.sleep(0.05)
+
+    async def run():
+        cascade = CascadeAgent([SlowAgent("small"), SlowAgent("large")], CascadeOptions(tiers=["small", "large"]))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await cascade.warm()
+        assert loop.time() - started < 0.09
+
+    asyncio.run(run())